@@ -1,14 +1,48 @@
 """
 IKIGAI Price Prediction — Model Evaluation Script
 
-Evaluates the trained LightGBM model against benchmark datasets.
-Generates accuracy metrics, SHAP explanations, and comparison reports.
+Evaluates a trained LightGBM model against a parquet test set.
+Generates accuracy metrics, per-region breakdowns, feature importance and a
+performance profile (model load time, inference throughput, peak memory).
+
+    python ml/evaluation/evaluate.py --model model.joblib --test-data data/test.parquet
+    python ml/evaluation/evaluate.py --model registry/2024q4 --test-data data/test.parquet
+    python ml/evaluation/evaluate.py --model model.joblib --comps comps.npz --test-data data/test.parquet
+
+The test set is streamed in record batches and features are built with the
+pricing service's own feature code (services/pricing-model/features.py and
+encoders.py), so evaluation sees exactly what serving sees. Models that use
+price_per_sqm_area_avg get it from the comparable-sales index (comps.npz next
+to the model, or --comps), as the service does. Metrics for all
+regions come from one pass of bincount/lexsort group-bys over the collected
+predictions.
 """
 
+import argparse
 import json
-from dataclasses import dataclass
-from typing import Optional
+import os
+import resource
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
 
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "services", "pricing-model")
+sys.path.insert(0, _service_dir)
+
+from comps import CompsIndex
+from encoders import EncoderPipeline
+from explain import feature_label, source_features
+from features import (
+    CBD_COORDINATES, COMPS_FEATURE, feature_matrix, model_feature_columns, nearest_cbd, source_columns,
+)
+from registry import COMPS_FILE
+
+LABEL_COLUMN = "price"
+REGION_COLUMN = "region"
+REGIONS = list(CBD_COORDINATES)  # tokyo, osaka, nagoya
 
 @dataclass
 class EvaluationMetrics:
@@ -30,87 +64,261 @@ class RegionBreakdown:
     metrics: EvaluationMetrics
 
 
+@dataclass
+class PerformanceProfile:
+    """How expensive the model is to load and run."""
+    model_load_seconds: float
+    feature_seconds: float  # building feature matrices
+    predict_seconds: float  # model.predict only
+    rows_per_sec: float  # end-to-end: features + predict
+    batch_size: int
+    peak_rss_mb: float
+
+
+def load_model(model_path: str):
+    """
+    Load a model file, or a registry version directory (model.joblib plus
+    optional encoders.json). Returns (model, encoder, load seconds).
+    """
+    import joblib
+    import lightgbm  # noqa: F401  (import cost is not model load time)
+
+    directory = model_path if os.path.isdir(model_path) else os.path.dirname(model_path)
+    if os.path.isdir(model_path):
+        model_path = os.path.join(model_path, "model.joblib")
+    start = time.perf_counter()
+    model = joblib.load(model_path)
+    encoder_path = os.path.join(directory, "encoders.json")
+    encoder = EncoderPipeline.load(encoder_path) if os.path.exists(encoder_path) else None
+    return model, encoder, time.perf_counter() - start
+
+
+def load_comps(model_path: str, comps_path: Optional[str] = None) -> Optional[CompsIndex]:
+    """
+    The comparable-sales index at comps_path, else the one next to the model
+    (comps.npz, as train.py writes it and ModelRegistry.publish stores it
+    with a version); None if absent.
+    """
+    if comps_path is None:
+        directory = model_path if os.path.isdir(model_path) else os.path.dirname(model_path)
+        comps_path = os.path.join(directory, COMPS_FILE)
+        if not os.path.exists(comps_path):
+            return None
+    return CompsIndex.load(comps_path)
+
+
+def predict_parquet(
+    model, encoder, test_data_path: str, batch_size: int = 100_000, comps: Optional[CompsIndex] = None
+):
+    """
+    Stream the test set through the model. Returns (predictions, actuals,
+    region codes, feature seconds, predict seconds).
+
+    price_per_sqm_area_avg is computed from ``comps`` when given, else read
+    from the test set; a model that needs it without either is an error.
+    """
+    import pyarrow.parquet as pq
+
+    names = model_feature_columns(model, encoder)
+    parquet = pq.ParquetFile(test_data_path)
+    available = parquet.schema_arrow.names
+    has_region = REGION_COLUMN in available
+    needed = set(source_columns(names, encoder)) | {LABEL_COLUMN}
+    needed |= {REGION_COLUMN} if has_region else {"latitude", "longitude"}
+    with_comps = COMPS_FEATURE in names and comps is not None
+    if with_comps:
+        needed = (needed - {COMPS_FEATURE}) | {"latitude", "longitude"}
+    elif COMPS_FEATURE in names and COMPS_FEATURE not in available:
+        raise ValueError(
+            f"The model uses {COMPS_FEATURE}, which {test_data_path} does not have: "
+            "pass the comparable-sales index (--comps, or comps.npz next to the model)"
+        )
+    # Missing categoricals are encoded as unknown rather than failing the run
+    read = [column for column in available if column in needed]
+
+    predictions, actuals, regions = [], [], []
+    feature_seconds = predict_seconds = 0.0
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=read):
+        columns = {name: batch.column(name).to_numpy(zero_copy_only=False) for name in batch.schema.names}
+        n = batch.num_rows
+        if encoder is not None:
+            for column in encoder.input_columns:
+                columns.setdefault(column, np.full(n, None, dtype=object))
+        start = time.perf_counter()
+        if with_comps:
+            columns[COMPS_FEATURE] = comps.area_average(
+                columns["latitude"].astype(np.float64), columns["longitude"].astype(np.float64)
+            )
+        X = feature_matrix(columns, names, encoder)
+        feature_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        predictions.append(np.asarray(model.predict(X), dtype=np.float64))
+        predict_seconds += time.perf_counter() - start
+
+        actuals.append(columns[LABEL_COLUMN].astype(np.float64))
+        if has_region:
+            # Unlisted regions get code len(REGIONS) and only count overall
+            names_in_batch = columns[REGION_COLUMN].astype(str)
+            codes = np.full(n, len(REGIONS), dtype=np.intp)
+            for g, region in enumerate(REGIONS):
+                codes[names_in_batch == region] = g
+            regions.append(codes)
+        else:
+            regions.append(nearest_cbd(columns["latitude"], columns["longitude"]))
+
+    if not predictions:
+        raise ValueError(f"No rows in {test_data_path}")
+    return np.concatenate(predictions), np.concatenate(actuals), np.concatenate(regions), feature_seconds, predict_seconds
+
+
+def grouped_metrics(predictions: np.ndarray, actuals: np.ndarray, groups: np.ndarray, n_groups: int) -> List[Optional[EvaluationMetrics]]:
+    """EvaluationMetrics per group code in [0, n_groups); None for empty groups."""
+    errors = predictions - actuals
+    abs_errors = np.abs(errors)
+    pct_errors = abs_errors / np.abs(actuals)
+
+    counts = np.bincount(groups, minlength=n_groups)
+
+    def group_sum(values):
+        return np.bincount(groups, weights=values, minlength=n_groups)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = group_sum(actuals) / counts
+        sse = group_sum(errors ** 2)
+        sst = group_sum((actuals - means[groups]) ** 2)
+        mape = 100 * group_sum(pct_errors) / counts
+        mae = group_sum(abs_errors) / counts
+        rmse = np.sqrt(sse / counts)
+        r2 = 1 - sse / sst
+        within_5 = 100 * group_sum((pct_errors <= 0.05).astype(np.float64)) / counts
+        within_10 = 100 * group_sum((pct_errors <= 0.10).astype(np.float64)) / counts
+
+    # Medians: sort by (group, error) once, then take each group's middle element(s)
+    ordered = abs_errors[np.lexsort((abs_errors, groups))]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    lower_mid = starts + np.maximum(counts - 1, 0) // 2
+    upper_mid = starts + counts // 2
+    safe = counts > 0
+    medians = np.full(n_groups, np.nan)
+    medians[safe] = (ordered[lower_mid[safe]] + ordered[upper_mid[safe]]) / 2
+
+    return [
+        EvaluationMetrics(
+            mape=float(mape[g]), mae=float(mae[g]), rmse=float(rmse[g]), r2=float(r2[g]),
+            median_error=float(medians[g]), within_5_pct=float(within_5[g]), within_10_pct=float(within_10[g]),
+        ) if counts[g] else None
+        for g in range(n_groups)
+    ]
+
+
+def top_features(model, encoder, limit: int = 10) -> List[Dict]:
+    """Normalized gain importance of the model's input columns."""
+    if not hasattr(model, "feature_importance"):
+        return []
+    # Encoded columns (building_type=mansion, ...) are summed onto their source feature
+    sources, index = source_features(model_feature_columns(model, encoder), encoder)
+    gain = np.bincount(index, weights=model.feature_importance(importance_type="gain"), minlength=len(sources))
+    share = gain / gain.sum() if gain.sum() else gain
+    order = np.argsort(-share, kind="stable")[:limit]
+    return [
+        {"feature": sources[i], "importance": round(float(share[i]), 4), "label_ja": feature_label(sources[i], "ja")}
+        for i in order
+    ]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_markdown(report: dict, path: str):
+    overall = report["overall_metrics"]
+    perf = report["performance"]
+    lines = [
+        f"# Evaluation: model {report['model_version']}",
+        "",
+        f"{report['test_samples']:,} test rows",
+        "",
+        "| region | n | MAPE % | MAE ¥ | RMSE ¥ | R² | within 10% |",
+        "|---|---:|---:|---:|---:|---:|---:|",
+        f"| all | {report['test_samples']:,} | {overall['mape']:.2f} | {overall['mae_yen']:,.0f} | "
+        f"{overall['rmse_yen']:,.0f} | {overall['r2']:.3f} | {overall['within_10_pct']:.1f} |",
+    ]
+    for r in report["region_breakdown"]:
+        lines.append(
+            f"| {r['region']} | {r['n_samples']:,} | {r['mape']:.2f} | {r['mae_yen']:,.0f} | "
+            f"{r['rmse_yen']:,.0f} | {r['r2']:.3f} | {r['within_10_pct']:.1f} |"
+        )
+    lines += [
+        "",
+        "## Performance",
+        "",
+        f"- model load: {perf['model_load_seconds'] * 1000:.1f} ms",
+        f"- throughput: {perf['rows_per_sec']:,.0f} rows/s (batch {perf['batch_size']:,})",
+        f"- peak RSS: {perf['peak_rss_mb']:.0f} MB",
+        "",
+    ]
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+
+
 def evaluate_model(
     model_path: str,
     test_data_path: str,
     output_dir: str = "results",
+    batch_size: int = 100_000,
+    model_version: Optional[str] = None,
+    comps_path: Optional[str] = None,
 ) -> dict:
     """
     Run full model evaluation pipeline.
 
     Steps:
-    1. Load model from MLflow registry or local path
-    2. Load test dataset (DVC-tracked)
-    3. Generate predictions
+    1. Load model (and encoders, comps index) from a local path or registry version directory
+    2. Stream the test dataset (DVC-tracked parquet) in record batches
+    3. Generate batched predictions
     4. Calculate overall metrics
     5. Calculate per-region breakdown (tokyo, osaka, nagoya)
-    6. Generate SHAP importance plots
-    7. Output evaluation report (JSON + markdown)
+    6. Rank features by gain importance
+    7. Output evaluation report (JSON + markdown) with a performance profile
     """
-    # Portfolio mode: return mock evaluation results
-    # Production: use joblib.load(model_path) and real test data
-
-    overall = EvaluationMetrics(
-        mape=8.3,
-        mae=4_200_000,
-        rmse=6_100_000,
-        r2=0.87,
-        median_error=3_100_000,
-        within_5_pct=42.5,
-        within_10_pct=71.3,
+    model, encoder, load_seconds = load_model(model_path)
+    comps = load_comps(model_path, comps_path)
+    predictions, actuals, regions, feature_seconds, predict_seconds = predict_parquet(
+        model, encoder, test_data_path, batch_size, comps
     )
+    n = len(predictions)
 
-    regions = [
-        RegionBreakdown(
-            region="tokyo",
-            n_samples=2500,
-            metrics=EvaluationMetrics(
-                mape=7.1, mae=5_500_000, rmse=7_200_000,
-                r2=0.89, median_error=4_000_000,
-                within_5_pct=45.0, within_10_pct=73.5,
-            ),
-        ),
-        RegionBreakdown(
-            region="osaka",
-            n_samples=1200,
-            metrics=EvaluationMetrics(
-                mape=9.0, mae=3_200_000, rmse=4_800_000,
-                r2=0.85, median_error=2_400_000,
-                within_5_pct=40.0, within_10_pct=69.0,
-            ),
-        ),
-        RegionBreakdown(
-            region="nagoya",
-            n_samples=800,
-            metrics=EvaluationMetrics(
-                mape=10.2, mae=2_800_000, rmse=4_100_000,
-                r2=0.82, median_error=2_100_000,
-                within_5_pct=38.0, within_10_pct=65.0,
-            ),
-        ),
+    overall = grouped_metrics(predictions, actuals, np.zeros(n, dtype=np.intp), 1)[0]
+    by_region = grouped_metrics(predictions, actuals, regions, len(REGIONS) + 1)
+    breakdown = [
+        RegionBreakdown(region=region, n_samples=int(np.count_nonzero(regions == g)), metrics=by_region[g])
+        for g, region in enumerate(REGIONS)
+        if by_region[g] is not None
     ]
+    performance = PerformanceProfile(
+        model_load_seconds=load_seconds,
+        feature_seconds=feature_seconds,
+        predict_seconds=predict_seconds,
+        rows_per_sec=n / max(feature_seconds + predict_seconds, 1e-9),
+        batch_size=batch_size,
+        peak_rss_mb=peak_rss_mb(),
+    )
 
-    top_features = [
-        {"feature": "total_area_sqm", "importance": 0.28, "label_ja": "専有面積"},
-        {"feature": "nearest_station_walk_minutes", "importance": 0.18, "label_ja": "駅徒歩分"},
-        {"feature": "prefecture", "importance": 0.15, "label_ja": "都道府県"},
-        {"feature": "building_age_years", "importance": 0.12, "label_ja": "築年数"},
-        {"feature": "earthquake_standard", "importance": 0.09, "label_ja": "耐震基準"},
-        {"feature": "rosenka_value", "importance": 0.07, "label_ja": "路線価"},
-        {"feature": "floor_plan_type", "importance": 0.05, "label_ja": "間取り"},
-        {"feature": "floor_level", "importance": 0.03, "label_ja": "階数"},
-        {"feature": "liquefaction_risk", "importance": 0.02, "label_ja": "液状化リスク"},
-        {"feature": "management_fee_monthly", "importance": 0.01, "label_ja": "管理費"},
-    ]
+    if model_version is None:
+        # Registry layout: <root>/<version>/model.joblib
+        directory = model_path if os.path.isdir(model_path) else os.path.dirname(os.path.abspath(model_path))
+        model_version = os.path.basename(os.path.normpath(directory))
 
     report = {
-        "model_version": "0.1.0",
-        "test_samples": sum(r.n_samples for r in regions),
+        "model_version": model_version,
+        "test_samples": n,
         "overall_metrics": {
             "mape": overall.mape,
             "mae_yen": overall.mae,
             "rmse_yen": overall.rmse,
             "r2": overall.r2,
+            "median_error_yen": overall.median_error,
             "within_5_pct": overall.within_5_pct,
             "within_10_pct": overall.within_10_pct,
         },
@@ -119,22 +327,48 @@ def evaluate_model(
                 "region": r.region,
                 "n_samples": r.n_samples,
                 "mape": r.metrics.mape,
+                "mae_yen": r.metrics.mae,
+                "rmse_yen": r.metrics.rmse,
                 "r2": r.metrics.r2,
+                "median_error_yen": r.metrics.median_error,
+                "within_5_pct": r.metrics.within_5_pct,
+                "within_10_pct": r.metrics.within_10_pct,
             }
-            for r in regions
+            for r in breakdown
         ],
-        "top_features": top_features,
+        "top_features": top_features(model, encoder),
+        "performance": asdict(performance),
     }
 
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, "evaluation_report.json"), "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        write_markdown(report, os.path.join(output_dir, "evaluation_report.md"))
+
     return report
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="model.joblib", help="Model file or registry version directory")
+    parser.add_argument("--test-data", default="data/test.parquet")
+    parser.add_argument("--output-dir", default="results")
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--model-version")
+    parser.add_argument("--comps", help="Comparable-sales index (default: comps.npz next to the model)")
+    args = parser.parse_args()
+
     report = evaluate_model(
-        model_path="model.joblib",
-        test_data_path="data/test.parquet",
+        model_path=args.model,
+        test_data_path=args.test_data,
+        output_dir=args.output_dir,
+        batch_size=args.batch_size,
+        model_version=args.model_version,
+        comps_path=args.comps,
     )
     print(json.dumps(report, indent=2, ensure_ascii=False))
-    print(f"\nOverall MAPE: {report['overall_metrics']['mape']}%")
-    print(f"R²: {report['overall_metrics']['r2']}")
-    print(f"Within 10%: {report['overall_metrics']['within_10_pct']}%")
+    print(f"\nOverall MAPE: {report['overall_metrics']['mape']:.2f}%")
+    print(f"R²: {report['overall_metrics']['r2']:.3f}")
+    print(f"Within 10%: {report['overall_metrics']['within_10_pct']:.1f}%")
+    print(f"Throughput: {report['performance']['rows_per_sec']:,.0f} rows/s")
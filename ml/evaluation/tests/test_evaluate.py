@@ -0,0 +1,182 @@
+"""
+Tests for batched model evaluation on parquet test sets.
+"""
+import sys
+import os
+import json
+import shutil
+
+import pytest
+
+np = pytest.importorskip("numpy")
+lgb = pytest.importorskip("lightgbm")
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+joblib = pytest.importorskip("joblib")
+
+_evaluation_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _evaluation_dir)
+
+import evaluate
+from features import COMPS_FEATURE, TRAINING_FEATURES, feature_matrix, model_feature_columns
+import train
+
+
+def _naive_metrics(predictions, actuals):
+    errors = np.abs(predictions - actuals)
+    pct = errors / np.abs(actuals)
+    sse = np.sum((predictions - actuals) ** 2)
+    return {
+        "mape": 100 * pct.mean(),
+        "mae": errors.mean(),
+        "rmse": np.sqrt(sse / len(actuals)),
+        "r2": 1 - sse / np.sum((actuals - actuals.mean()) ** 2),
+        "median_error": np.median(errors),
+        "within_5_pct": 100 * np.mean(pct <= 0.05),
+        "within_10_pct": 100 * np.mean(pct <= 0.10),
+    }
+
+
+@pytest.fixture(scope="module")
+def model():
+    columns = train.mock_columns(400, np.random.default_rng(0))
+    X = feature_matrix(columns, TRAINING_FEATURES)
+    data = lgb.Dataset(X, label=columns["price"], feature_name=TRAINING_FEATURES)
+    return lgb.train({"objective": "regression", "verbose": -1, "num_leaves": 8}, data, num_boost_round=10)
+
+
+def _write_test_set(path, n=300, with_region=True):
+    columns = train.mock_columns(n, np.random.default_rng(1))
+    if with_region:
+        columns["region"] = np.array(["tokyo", "osaka", "nagoya", "sapporo"])[np.arange(n) % 4]
+    pq.write_table(pa.table(columns), path, row_group_size=100)
+    return columns
+
+
+class TestGroupedMetrics:
+    def test_matches_per_group_computation(self):
+        rng = np.random.default_rng(2)
+        actuals = rng.uniform(1e7, 1e8, 101)
+        predictions = actuals * rng.uniform(0.8, 1.2, 101)
+        groups = rng.integers(0, 3, 101)
+        groups[groups == 1] = 3  # leave group 1 empty
+        metrics = evaluate.grouped_metrics(predictions, actuals, groups, 4)
+
+        assert metrics[1] is None
+        for g in (0, 2, 3):
+            rows = groups == g
+            expected = _naive_metrics(predictions[rows], actuals[rows])
+            for name, value in expected.items():
+                assert getattr(metrics[g], name) == pytest.approx(value, rel=1e-9), (g, name)
+
+    def test_single_group_is_overall(self):
+        actuals = np.array([100.0, 200.0, 300.0, 400.0])
+        predictions = np.array([110.0, 190.0, 300.0, 480.0])
+        [overall] = evaluate.grouped_metrics(predictions, actuals, np.zeros(4, dtype=np.intp), 1)
+        assert overall.mae == pytest.approx(25.0)
+        assert overall.median_error == pytest.approx(10.0)  # even count: mean of the middle two
+        assert overall.within_5_pct == pytest.approx(50.0)
+        assert overall.within_10_pct == pytest.approx(75.0)
+
+
+class TestPredictParquet:
+    def test_batches_match_one_shot_prediction(self, tmp_path, model):
+        path = str(tmp_path / "test.parquet")
+        columns = _write_test_set(path)
+        predictions, actuals, regions, _, _ = evaluate.predict_parquet(model, None, path, batch_size=64)
+
+        expected = model.predict(feature_matrix(columns, TRAINING_FEATURES))
+        np.testing.assert_allclose(predictions, expected)
+        np.testing.assert_array_equal(actuals, columns["price"])
+        # tokyo, osaka, nagoya, then the unlisted region
+        np.testing.assert_array_equal(regions[:4], [0, 1, 2, len(evaluate.REGIONS)])
+
+    def test_regions_from_coordinates_without_region_column(self, tmp_path, model):
+        path = str(tmp_path / "test.parquet")
+        _write_test_set(path, with_region=False)
+        _, _, regions, _, _ = evaluate.predict_parquet(model, None, path)
+        assert (regions == evaluate.REGIONS.index("tokyo")).all()  # mock listings are in Tokyo
+
+    def test_empty_test_set_is_an_error(self, tmp_path, model):
+        path = str(tmp_path / "empty.parquet")
+        columns = train.mock_columns(0, np.random.default_rng(0))
+        pq.write_table(pa.table(columns), path)
+        with pytest.raises(ValueError):
+            evaluate.predict_parquet(model, None, path)
+
+
+def test_evaluate_model_writes_reports(tmp_path, model):
+    version_dir = tmp_path / "registry" / "2024q4"
+    version_dir.mkdir(parents=True)
+    joblib.dump(model, version_dir / "model.joblib")
+    test_path = str(tmp_path / "test.parquet")
+    _write_test_set(test_path)
+
+    report = evaluate.evaluate_model(str(version_dir), test_path, output_dir=str(tmp_path / "results"))
+    assert report["model_version"] == "2024q4"
+    assert report["test_samples"] == 300
+    assert [r["region"] for r in report["region_breakdown"]] == ["tokyo", "osaka", "nagoya"]
+    assert sum(r["n_samples"] for r in report["region_breakdown"]) == 225
+    assert report["top_features"][0]["feature"] == "total_area_sqm"
+    with open(tmp_path / "results" / "evaluation_report.json") as f:
+        assert json.load(f)["test_samples"] == 300
+    assert (tmp_path / "results" / "evaluation_report.md").exists()
+
+
+@pytest.fixture(scope="module")
+def published(tmp_path_factory):
+    """A mock-trained comps model published to a registry as train.py does it."""
+    from registry import ModelRegistry
+
+    output = tmp_path_factory.mktemp("train")
+    result = train.train_from_mock(n=400, rounds=5)
+    joblib.dump(result.model, output / "model.joblib")
+    result.encoder.save(str(output / "encoders.json"))
+    result.comps.save(str(output / "comps.npz"))
+    registry = ModelRegistry(str(tmp_path_factory.mktemp("registry")))
+    registry.publish(
+        "mock", str(output / "model.joblib"), encoder_path=str(output / "encoders.json"),
+        comps_path=str(output / "comps.npz"),
+    )
+    return os.path.join(registry.root, "mock"), result
+
+
+class TestCompsFeature:
+    def test_published_version_evaluates_with_its_comps(self, tmp_path, published):
+        directory, result = published
+        test_path = str(tmp_path / "test.parquet")
+        columns = _write_test_set(test_path)
+        report = evaluate.evaluate_model(directory, test_path, output_dir=None)
+        assert report["test_samples"] == 300
+
+        # Same feature as serving: the comps average around each listing
+        model, encoder, _ = evaluate.load_model(directory)
+        predictions, _, _, _, _ = evaluate.predict_parquet(
+            model, encoder, test_path, batch_size=64, comps=evaluate.load_comps(directory)
+        )
+        columns[COMPS_FEATURE] = result.comps.area_average(columns["latitude"], columns["longitude"])
+        for column in encoder.input_columns:
+            columns.setdefault(column, np.full(300, None, dtype=object))
+        X = feature_matrix(columns, model_feature_columns(model, encoder), encoder)
+        np.testing.assert_allclose(predictions, model.predict(X))
+
+    def test_model_file_with_explicit_comps(self, tmp_path, published):
+        directory, _ = published
+        model_path = str(tmp_path / "model.joblib")
+        for name in ("model.joblib", "encoders.json"):
+            shutil.copy2(os.path.join(directory, name), tmp_path / name)
+        test_path = str(tmp_path / "test.parquet")
+        _write_test_set(test_path)
+        with pytest.raises(ValueError, match=COMPS_FEATURE):
+            evaluate.evaluate_model(model_path, test_path, output_dir=None)
+        comps_path = os.path.join(directory, "comps.npz")
+        report = evaluate.evaluate_model(model_path, test_path, output_dir=None, comps_path=comps_path)
+        assert report["test_samples"] == 300
+
+    def test_missing_comps_is_a_clear_error(self, tmp_path, published):
+        directory, _ = published
+        test_path = str(tmp_path / "test.parquet")
+        _write_test_set(test_path)
+        model, encoder, _ = evaluate.load_model(directory)
+        with pytest.raises(ValueError, match=COMPS_FEATURE):
+            evaluate.predict_parquet(model, encoder, test_path)
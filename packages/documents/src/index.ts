@@ -41,6 +41,17 @@ export const riskFlagSchema = z.object({
 });
 export type RiskFlag = z.infer<typeof riskFlagSchema>;
 
+/** Where a risk, document-type or key-fact keyword occurs, for highlighting. */
+export const keywordHitSchema = z.object({
+    keyword: z.string(),
+    kind: z.enum(["risk", "document_type", "key_fact"]),
+    category: z.string(),
+    page: z.number(), // 1-based
+    start: z.number(), // character offsets within the page's text
+    end: z.number(),
+});
+export type KeywordHit = z.infer<typeof keywordHitSchema>;
+
 export const analysisResultSchema = z.object({
     filename: z.string(),
     document_type: documentTypeSchema,
@@ -48,10 +59,57 @@ export const analysisResultSchema = z.object({
     page_count: z.number(),
     risk_flags: z.array(riskFlagSchema),
     key_facts: z.record(z.boolean()),
+    matches: z.array(keywordHitSchema).optional(),
     status: z.string(),
 });
 export type AnalysisResult = z.infer<typeof analysisResultSchema>;
 
+/** Events from POST /analyze/stream, one NDJSON line each. */
+export const analysisEventSchema = z.discriminatedUnion("event", [
+    z.object({ event: z.literal("start"), filename: z.string(), page_count: z.number() }),
+    z.object({ event: z.literal("page"), page: z.number(), text: z.string(), matches: z.array(keywordHitSchema) }),
+    z.object({ event: z.literal("risk_flag"), page: z.number(), flag: riskFlagSchema }),
+    z.object({
+        event: z.literal("summary"),
+        filename: z.string(),
+        document_type: documentTypeSchema,
+        page_count: z.number(),
+        risk_flags: z.array(riskFlagSchema),
+        key_facts: z.record(z.boolean()),
+        status: z.string(),
+    }),
+    z.object({ event: z.literal("error"), detail: z.string() }),
+]);
+export type AnalysisEvent = z.infer<typeof analysisEventSchema>;
+
+export const jobStatusSchema = z.enum(["queued", "running", "completed", "completed_with_errors"]);
+export const jobFileStatusSchema = z.enum(["queued", "running", "completed", "failed"]);
+
+/** One file of a bulk analysis job; identical uploads share one analysis. */
+export const jobFileSchema = z.object({
+    file_id: z.number(),
+    filename: z.string(),
+    sha256: z.string(),
+    deduplicated: z.boolean(),
+    status: jobFileStatusSchema,
+    error: z.string().nullable(),
+});
+export type JobFile = z.infer<typeof jobFileSchema>;
+
+export const jobSchema = z.object({
+    job_id: z.string(),
+    created_at: z.number(),
+    status: jobStatusSchema,
+    counts: z.record(z.number()),
+    files: z.array(jobFileSchema),
+});
+export type Job = z.infer<typeof jobSchema>;
+
+export const jobFileResultSchema = jobFileSchema.extend({
+    result: analysisResultSchema.nullable(),
+});
+export type JobFileResult = z.infer<typeof jobFileResultSchema>;
+
 // ─── Client ──────────────────────────────────────────────────────────────────
 
 export interface DocumentClientConfig {
@@ -108,6 +166,79 @@ export class DocumentClient {
         return result;
     }
 
+    /**
+     * Upload a PDF and yield analysis events page by page: risk flags arrive
+     * as soon as the page containing them is read, the summary last.
+     */
+    async *analyzeStream(file: File | Blob, filename: string): AsyncGenerator<AnalysisEvent> {
+        const formData = new FormData();
+        formData.append("file", file, filename);
+
+        const response = await fetch(`${this.baseUrl}/analyze/stream`, {
+            method: "POST",
+            body: formData,
+            signal: AbortSignal.timeout(this.timeout),
+        });
+        if (!response.ok || !response.body) {
+            const error = await response.text().catch(() => "Unknown error");
+            log.error({ status: response.status, error }, "Streaming document analysis failed");
+            throw new Error(`Document analysis failed: ${response.status} ${error}`);
+        }
+
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffered = "";
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (value) buffered += value;
+            const lines = buffered.split("\n");
+            buffered = done ? "" : (lines.pop() ?? "");
+            for (const line of lines) {
+                if (line.trim()) yield analysisEventSchema.parse(JSON.parse(line));
+            }
+            if (done) return;
+        }
+    }
+
+    /**
+     * Queue a bundle of PDFs for analysis; returns the job id at once.
+     */
+    async createJob(files: Array<{ file: File | Blob; filename: string }>): Promise<string> {
+        const formData = new FormData();
+        for (const { file, filename } of files) formData.append("files", file, filename);
+
+        const response = await fetch(`${this.baseUrl}/jobs`, {
+            method: "POST",
+            body: formData,
+            signal: AbortSignal.timeout(this.timeout),
+        });
+        if (!response.ok) {
+            const error = await response.text().catch(() => "Unknown error");
+            log.error({ status: response.status, error }, "Creating analysis job failed");
+            throw new Error(`Creating analysis job failed: ${response.status} ${error}`);
+        }
+        const { job_id } = await response.json();
+        log.info({ jobId: job_id, files: files.length }, "Analysis job queued");
+        return job_id;
+    }
+
+    /**
+     * Overall status of a job and of each of its files.
+     */
+    async getJob(jobId: string): Promise<Job> {
+        const response = await fetch(`${this.baseUrl}/jobs/${jobId}`);
+        if (!response.ok) throw new Error(`Fetching job failed: ${response.status}`);
+        return jobSchema.parse(await response.json());
+    }
+
+    /**
+     * One file's status, with its analysis once completed.
+     */
+    async getJobFile(jobId: string, fileId: number): Promise<JobFileResult> {
+        const response = await fetch(`${this.baseUrl}/jobs/${jobId}/files/${fileId}`);
+        if (!response.ok) throw new Error(`Fetching job file failed: ${response.status}`);
+        return jobFileResultSchema.parse(await response.json());
+    }
+
     /**
      * Health check for the document-ocr service.
      */
@@ -28,6 +28,17 @@ export const predictionResponseSchema = z.object({
     predicted_price: z.number(),
     confidence_interval: z.array(z.number()).length(2),
     explanation: z.string(),
+    explanation_ja: z.string().nullish(),
+    factors: z
+        .array(
+            z.object({
+                feature: z.string(),
+                label_ja: z.string(),
+                label_en: z.string(),
+                contribution: z.number(),
+            })
+        )
+        .nullish(),
 });
 export type PredictionResponse = z.infer<typeof predictionResponseSchema>;
 
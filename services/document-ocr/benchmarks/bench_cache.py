@@ -0,0 +1,71 @@
+"""
+Benchmark: repeat /analyze of the same generated PDF with the content-hash
+result cache.
+
+Times, through the in-process ASGI app, the first (cold) analysis, repeats
+answered from the in-memory LRU, and repeats answered from the compressed
+disk store after a restart (a fresh cache over the same directory, so the
+first repeat reads the file and the rest hit memory again). Also reports
+the compressed entry size against the JSON result size.
+
+Usage:
+    python benchmarks/bench_cache.py [--pages 100] [--repeats 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx
+import numpy as np
+
+import main
+from cache import AnalysisCache
+from extraction import PageExtractor, default_workers
+from synthetic_pdf import build_pdf, document_pages
+
+
+async def _analyze_times(pdf, repeats):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        ms = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            response = await client.post("/analyze", files={"file": ("doc.pdf", pdf, "application/pdf")})
+            ms.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+        return np.array(ms)
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    pdf = build_pdf(document_pages(args.pages))
+    main.page_extractor = PageExtractor(default_workers(), main.MAX_PAGE_PARALLELISM, main.MIN_PAGES_PER_TASK)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        main.analysis_cache = AnalysisCache(main.RULES_VERSION, cache_dir)
+        cold = asyncio.run(_analyze_times(pdf, 1))
+        memory = asyncio.run(_analyze_times(pdf, args.repeats))
+        main.analysis_cache = AnalysisCache(main.RULES_VERSION, cache_dir)
+        disk = asyncio.run(_analyze_times(pdf, 1))
+        stats = main.analysis_cache.stats()
+    main.page_extractor.shutdown(wait=True)
+
+    print(f"{args.pages} pages, {len(pdf) / 2**20:.1f} MB PDF, "
+          f"result {stats['memory_bytes'] / 1024:.0f} KB JSON, {stats['disk_bytes'] / 1024:.0f} KB on disk")
+    print(f"{'analysis':>14s} {'p50 ms':>9s} {'p99 ms':>9s}")
+    for name, ms in (("cold", cold), ("memory hit", memory), ("disk hit", disk)):
+        print(f"{name:>14s} {np.percentile(ms, 50):9.1f} {np.percentile(ms, 99):9.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
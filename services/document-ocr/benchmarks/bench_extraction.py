@@ -0,0 +1,111 @@
+"""
+Benchmark: process-pool PDF extraction on a generated 300-page PDF.
+
+1. Throughput: pages/sec extracting the whole document serially and with a
+   PageExtractor of 1, 2, 4, ... workers (each allowed to use all of them
+   for one document). Pools are warmed up first, so process start-up is not
+   counted.
+2. Responsiveness: /analyze runs on the document while /health is polled
+   every 20 ms through the same in-process ASGI app, with extraction
+   (a) inline in the handler, as before, (b) on a thread (workers=0) and
+   (c) on the process pool. Reports /health latency while extraction runs
+   and the longest stall between two answers.
+
+Usage:
+    python benchmarks/bench_extraction.py [--pages 300] [--workers 1,2,4]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx
+import numpy as np
+
+import main
+from extraction import PageExtractor, count_pages, default_workers, extract_page_range
+from synthetic_pdf import build_pdf, document_pages
+
+
+class _InlineExtractor:
+    """Extraction inside the async handler, blocking the event loop (the old /analyze)."""
+
+    async def extract(self, path):
+        return extract_page_range(path, 0, count_pages(path))
+
+
+def _throughput(path, pages, worker_counts):
+    print(f"{'workers':>8s} {'seconds':>8s} {'pages/s':>8s} {'speedup':>8s}")
+    start = time.perf_counter()
+    extract_page_range(path, 0, pages)
+    serial = time.perf_counter() - start
+    print(f"{'serial':>8s} {serial:8.2f} {pages / serial:8.1f} {1.0:8.2f}")
+    for workers in worker_counts:
+        extractor = PageExtractor(workers, max_parallel_pages=workers, min_pages_per_task=1)
+        asyncio.run(extractor.extract(path))  # start the worker processes
+        start = time.perf_counter()
+        asyncio.run(extractor.extract(path))
+        elapsed = time.perf_counter() - start
+        extractor.shutdown(wait=True)
+        print(f"{workers:8d} {elapsed:8.2f} {pages / elapsed:8.1f} {serial / elapsed:8.2f}")
+
+
+async def _health_during_analyze(pdf):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        analyze = asyncio.ensure_future(
+            client.post("/analyze", files={"file": ("doc.pdf", pdf, "application/pdf")})
+        )
+        latencies, answered = [], [time.perf_counter()]
+        while not analyze.done():
+            start = time.perf_counter()
+            await client.get("/health")
+            answered.append(time.perf_counter())
+            latencies.append((answered[-1] - start) * 1000)
+            await asyncio.sleep(0.02)
+        (await analyze).raise_for_status()
+    # Longest stretch without a /health answer, polling interval included
+    return np.array(latencies), np.diff(answered).max() * 1000
+
+
+def _responsiveness(pdf, workers):
+    print(f"{'extraction':>14s} {'polls':>6s} {'p50 ms':>8s} {'p99 ms':>8s} {'stall ms':>9s}")
+    modes = [
+        ("inline", _InlineExtractor()),
+        ("thread", PageExtractor(0)),
+        (f"pool x{workers}", PageExtractor(workers, max_parallel_pages=workers)),
+    ]
+    for name, extractor in modes:
+        main.page_extractor = extractor
+        asyncio.run(_health_during_analyze(build_pdf([["warm-up"]])))
+        ms, stall = asyncio.run(_health_during_analyze(pdf))
+        print(f"{name:>14s} {len(ms):6d} {np.percentile(ms, 50):8.1f} {np.percentile(ms, 99):8.1f} {stall:9.1f}")
+        if isinstance(extractor, PageExtractor):
+            extractor.shutdown(wait=True)
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", default=",".join(str(w) for w in (1, 2, 4, 8) if w <= max(default_workers(), 2)))
+    args = parser.parse_args()
+    worker_counts = [int(w) for w in args.workers.split(",")]
+
+    import logging
+    logging.disable(logging.INFO)
+    pdf = build_pdf(document_pages(args.pages))
+    print(f"{args.pages} pages, {len(pdf) / 2**20:.1f} MB, {default_workers()} CPUs available")
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+        f.write(pdf)
+        f.flush()
+        _throughput(f.name, args.pages, worker_counts)
+    print()
+    _responsiveness(pdf, max(worker_counts))
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,100 @@
+"""
+Benchmark: a bundle of generated PDFs through POST /jobs versus one
+/analyze call after another.
+
+The bundle mixes document sizes (the slowest file dominates) and includes
+duplicate uploads. Reports wall time for sequential /analyze, the /jobs
+bundle (submit until every file is completed) with OCR_JOB_WORKERS of 1
+and --workers (polled every 100 ms), and the slowest single file alone for
+reference. Each mode gets a fresh queue and result cache, so nothing is
+reused from an earlier run (duplicates within a run are).
+
+Usage:
+    python benchmarks/bench_jobs.py [--files 8] [--pages 20,40,80,160] [--duplicates 2] [--workers 4]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx
+
+import main
+from extraction import PageExtractor, default_workers
+from synthetic_pdf import build_pdf, document_pages
+
+
+def _bundle(files, page_sizes, duplicates):
+    pdfs = [
+        (f"doc{i}.pdf", build_pdf(document_pages(page_sizes[i % len(page_sizes)], seed=i)))
+        for i in range(files - duplicates)
+    ]
+    return pdfs + [(f"copy{i}.pdf", pdfs[i][1]) for i in range(duplicates)]
+
+
+async def _sequential(client, pdfs):
+    for filename, pdf in pdfs:
+        (await client.post("/analyze", files={"file": (filename, pdf, "application/pdf")})).raise_for_status()
+
+
+async def _job(client, pdfs):
+    response = await client.post("/jobs", files=[("files", (name, pdf, "application/pdf")) for name, pdf in pdfs])
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+    while True:
+        job = (await client.get(f"/jobs/{job_id}")).json()
+        if job["status"] not in ("queued", "running"):
+            assert job["status"] == "completed", job
+            return
+        await asyncio.sleep(0.1)
+
+
+async def _timed(run, pdfs, job_workers, extract_workers):
+    main.page_extractor = PageExtractor(extract_workers, main.MAX_PAGE_PARALLELISM, main.MIN_PAGES_PER_TASK)
+    main.JOB_WORKERS = job_workers
+    with tempfile.TemporaryDirectory() as jobs_dir:
+        main.JOBS_DIR = jobs_dir
+        main.CACHE_DIR = os.path.join(jobs_dir, "cache")
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                await _sequential(client, [("warm-up.pdf", build_pdf([["warm-up"]]))])
+                start = time.perf_counter()
+                await run(client, pdfs)
+                return time.perf_counter() - start
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", default="20,40,80,160")
+    parser.add_argument("--duplicates", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    page_sizes = [int(p) for p in args.pages.split(",")]
+    pdfs = _bundle(args.files, page_sizes, args.duplicates)
+    slowest = max(pdfs, key=lambda item: len(item[1]))
+    extract_workers = default_workers()
+    print(f"{len(pdfs)} files ({args.duplicates} duplicates), pages {page_sizes}, {extract_workers} CPUs available")
+
+    modes = [
+        ("slowest file alone", _sequential, [slowest], 1),
+        ("sequential /analyze", _sequential, pdfs, 1),
+        ("/jobs, 1 worker", _job, pdfs, 1),
+        (f"/jobs, {args.workers} workers", _job, pdfs, args.workers),
+    ]
+    print(f"{'mode':>22s} {'seconds':>8s}")
+    for name, run, files, job_workers in modes:
+        elapsed = asyncio.run(_timed(run, files, job_workers, extract_workers))
+        print(f"{name:>22s} {elapsed:8.2f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
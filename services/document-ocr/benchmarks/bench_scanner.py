@@ -0,0 +1,121 @@
+"""
+Benchmark: keyword analysis of large synthetic Japanese documents.
+
+Compares, per document, the text analysis /analyze runs after extraction:
+
+    substring   the previous approach: one ``keyword in text`` search per
+                risk, document-type and key-fact keyword (no offsets)
+    find loops  the same keywords with offsets, one str.find loop each
+    scanner     one KeywordScanner pass per page (offsets included), then
+                flags, document type and key facts from its matches
+
+Documents are built from 重要事項説明書 and 管理規約 style clauses; "sparse"
+plants a few risk keywords, "dense" has key-fact keywords on every line.
+
+Usage:
+    python benchmarks/bench_scanner.py [--pages 20,200,1000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import main
+
+PLAIN_CLAUSES = [
+    "第{n}条　本契約に定めのない事項については、民法その他関係法令及び商慣習に従い、誠実に協議のうえ定めるものとする。",
+    "区分所有者は、円滑な共同生活を維持するため、法令、規約及び総会の決議を誠実に遵守しなければならない。",
+    "理事長は、毎会計年度の収支決算案を通常総会に報告し、その承認を得なければならない。",
+    "令和{n}年度の長期修繕計画は、建物の劣化状況を踏まえ、概ね五年ごとに見直すものとする。",
+    "専用使用権を有する者は、その部分を通常の用法に従って使用しなければならない。",
+]
+FACT_CLAUSES = [
+    "所在　東京都渋谷区神宮前{n}丁目　地番{n}番　地目　宅地　地積　{n}.52㎡",
+    "専有部分の床面積は壁芯で{n}.40㎡、登記簿面積は内法で算定する。",
+    "所有者及び権利者の氏名又は名称並びに住所は別紙のとおりとする。",
+]
+RISK_CLAUSES = ["本建物は昭和56年以前に着工された旧耐震基準の建物です。", "当該地域は浸水想定区域に該当します。", "石綿使用調査の結果は別紙参照。"]
+
+
+def _document(pages, dense, rng):
+    out = []
+    for page in range(pages):
+        lines = [rng.choice(PLAIN_CLAUSES).format(n=page + i) for i in range(24)]
+        if dense:
+            lines += [clause.format(n=page) for clause in FACT_CLAUSES]
+        if page % 50 == 7:
+            lines.append(rng.choice(RISK_CLAUSES))
+        out.append("\n".join(lines))
+    out[0] = "重要事項説明書\n" + out[0]
+    return out
+
+
+def _substring(pages, filename):
+    text = "".join(page + "\n" for page in pages)
+    flags = [p["flag"] for p in main.RISK_PATTERNS if any(keyword in text for keyword in p["keywords"])]
+    doc_type = main.DocumentType.other
+    for rule in main.DOCUMENT_TYPE_RULES:
+        if any(keyword in text for keyword in rule["keywords"]) or rule.get("filename_hint", "\0") in filename:
+            doc_type = rule["type"]
+            break
+    facts = {f: True for f, keywords in main.KEY_FACT_KEYWORDS.items() if any(k in text for k in keywords)}
+    return flags, doc_type, facts
+
+
+def _find_loops(pages, filename):
+    hits = []
+    for number, page in enumerate(pages, start=1):
+        for keyword in main.KEYWORD_SCANNER.keywords:
+            i = page.find(keyword)
+            while i != -1:
+                hits.append((keyword, number, i))
+                i = page.find(keyword, i + 1)
+    return hits
+
+
+def _scanner(pages, filename):
+    text = "".join(page + "\n" for page in pages)
+    matches = main.scan_keywords(pages)
+    return (
+        main.detect_risk_flags(text, matches),
+        main.classify_document_type(text, filename, matches),
+        main.extract_key_facts(text, matches),
+        matches,
+    )
+
+
+def _median_ms(fn, *args, repeat=7):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2] * 1000
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", default="20,200,1000")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{len(main.KEYWORD_SCANNER.keywords)} keywords")
+    print(f"{'pages':>6s} {'kind':>7s} {'chars':>10s} {'matches':>8s} {'substring ms':>13s} {'find loops ms':>14s} {'scanner ms':>11s}")
+    for pages in (int(p) for p in args.pages.split(",")):
+        for kind in ("sparse", "dense"):
+            document = _document(pages, kind == "dense", rng)
+            assert _substring(document, "doc.pdf") == _scanner(document, "doc.pdf")[:3]
+            matches = len(_scanner(document, "doc.pdf")[3])
+            print(
+                f"{pages:6d} {kind:>7s} {sum(map(len, document)):10,d} {matches:8,d} "
+                f"{_median_ms(_substring, document, 'doc.pdf'):13.2f} "
+                f"{_median_ms(_find_loops, document, 'doc.pdf'):14.2f} "
+                f"{_median_ms(_scanner, document, 'doc.pdf'):11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,96 @@
+"""
+Benchmark: /analyze vs /analyze/stream on large synthetic PDFs.
+
+Runs the service-side work of each endpoint in a fresh process per
+document size (no HTTP client buffering in the way):
+
+    analyze   extract every page, then build one response
+    stream    spool the upload, then iterate the event generator
+
+and reports time to the first risk flag, total time and how much the
+process's peak RSS grew while analyzing. Risk clauses are planted on pages
+50, 100, ...
+
+Usage:
+    python benchmarks/bench_streaming.py [--pages 300,1000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from synthetic_pdf import build_pdf, document_pages
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_analyze(main, pdf):
+    from starlette.datastructures import UploadFile
+
+    start = time.perf_counter()
+    response = asyncio.run(main.analyze_document(UploadFile(pdf, filename="doc.pdf")))
+    elapsed = time.perf_counter() - start
+    # The first flag is only known once the whole response is
+    return (elapsed if response.risk_flags else None), elapsed
+
+
+def _run_stream(main, pdf):
+    start = time.perf_counter()
+    first_flag = None
+    path = main.spool_upload(pdf)
+    for line in main.analysis_events(path, "doc.pdf"):
+        if first_flag is None and json.loads(line)["event"] == "risk_flag":
+            first_flag = time.perf_counter() - start
+    return first_flag, time.perf_counter() - start
+
+
+def _child(mode, path):
+    """Analyze the PDF at path as an upload would arrive: an open file, not bytes in memory."""
+    import logging
+
+    import main
+
+    logging.disable(logging.INFO)
+    with open(path, "rb") as pdf:
+        baseline = _peak_rss_mb()
+        first_flag, total = (_run_analyze if mode == "analyze" else _run_stream)(main, pdf)
+    print(json.dumps({"first_flag": first_flag, "total": total, "rss_growth": _peak_rss_mb() - baseline}))
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", default="300,1000")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(*args.child)
+        return
+
+    print(f"{'pages':>6s} {'PDF MB':>7s} {'mode':>8s} {'1st flag s':>11s} {'total s':>8s} {'RSS +MB':>8s}")
+    for pages in (int(p) for p in args.pages.split(",")):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf:
+            pdf.write(build_pdf(document_pages(pages)))
+            pdf.flush()
+            for mode in ("analyze", "stream"):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", mode, pdf.name],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                r = json.loads(output.strip().splitlines()[-1])
+                print(
+                    f"{pages:6d} {os.path.getsize(pdf.name) / 2**20:7.1f} {mode:>8s} "
+                    f"{r['first_flag']:11.2f} {r['total']:8.2f} {r['rss_growth']:8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,99 @@
+"""
+Synthetic Japanese PDFs for the document-ocr benchmarks.
+
+Builds a text-only PDF whose pages pypdf extracts back to the given lines:
+one Type0 font with Identity-H encoding, where each glyph id is the
+character's code point and a ToUnicode CMap maps the characters used
+straight back. No glyphs
+are embedded, so the files are small and only meant for text extraction.
+"""
+import random
+from typing import List, Sequence
+
+CLAUSES = [
+    "第{n}条　本契約に定めのない事項については、民法その他関係法令及び商慣習に従い、誠実に協議のうえ定めるものとする。",
+    "区分所有者は、円滑な共同生活を維持するため、法令、規約及び総会の決議を誠実に遵守しなければならない。",
+    "理事長は、毎会計年度の収支決算案を通常総会に報告し、その承認を得なければならない。",
+    "令和{n}年度の長期修繕計画は、建物の劣化状況を踏まえ、概ね五年ごとに見直すものとする。",
+    "所在　東京都渋谷区神宮前{n}丁目　地番{n}番　地目　宅地　地積　{n}.52㎡",
+    "専用使用権を有する者は、その部分を通常の用法に従って使用しなければならない。",
+]
+RISK_CLAUSES = ["本建物は昭和56年以前に着工された旧耐震基準の建物です。", "当該地域は浸水想定区域に該当します。", "石綿使用調査の結果は別紙参照。"]
+
+
+def document_pages(pages: int, lines_per_page: int = 40, risk_every: int = 50, seed: int = 0) -> List[List[str]]:
+    """Lines of a 重要事項説明書-like document, with a risk clause every risk_every pages."""
+    rng = random.Random(seed)
+    out = []
+    for page in range(pages):
+        lines = [rng.choice(CLAUSES).format(n=page + i) for i in range(lines_per_page)]
+        if page % risk_every == risk_every - 1:
+            lines[lines_per_page // 2] = rng.choice(RISK_CLAUSES)
+        out.append(lines)
+    out[0][0] = "重要事項説明書"
+    return out
+
+
+def _to_unicode_cmap(chars: Sequence[str]) -> bytes:
+    """ToUnicode CMap for the characters used, like a subset font's."""
+    entries = [f"<{ord(char):04X}> <{ord(char):04X}>" for char in sorted(chars)]
+    blocks = []
+    for i in range(0, len(entries), 100):
+        chunk = entries[i:i + 100]
+        blocks.append(f"{len(chunk)} beginbfchar\n" + "\n".join(chunk) + "\nendbfchar")
+    return (
+        "/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+        "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+        "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+        + "\n".join(blocks)
+        + "\nendcmap\nCMapName currentdict /CMap defineresource pop\nend\nend"
+    ).encode("ascii")
+
+
+def _content(lines: Sequence[str]) -> bytes:
+    ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+    for line in lines:
+        ops.append("<" + "".join(f"{ord(char):04X}" for char in line) + "> Tj T*")
+    ops.append("ET")
+    return "\n".join(ops).encode("ascii")
+
+
+def build_pdf(pages: Sequence[Sequence[str]]) -> bytes:
+    """A PDF with one page per entry of pages, each a list of text lines."""
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type0 /BaseFont /IkigaiSynthetic /Encoding /Identity-H "
+           b"/DescendantFonts [4 0 R] /ToUnicode 5 0 R >>",
+        4: b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /IkigaiSynthetic "
+           b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+           b"/FontDescriptor 6 0 R /DW 1000 /CIDToGIDMap /Identity >>",
+        6: b"<< /Type /FontDescriptor /FontName /IkigaiSynthetic /Flags 4 /FontBBox [0 -200 1000 900] "
+           b"/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 700 /StemV 80 >>",
+    }
+    cmap = _to_unicode_cmap({char for lines in pages for line in lines for char in line})
+    objects[5] = b"<< /Length %d >>\nstream\n" % len(cmap) + cmap + b"\nendstream"
+    kids = []
+    for i, lines in enumerate(pages):
+        page_id, content_id = 7 + 2 * i, 8 + 2 * i
+        content = _content(lines)
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream"
+        kids.append(b"%d 0 R" % page_id)
+    objects[2] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % len(kids)
+
+    out = bytearray(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n" % number + objects[number] + b"\nendobj\n"
+    xref = len(out)
+    size = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for number in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[number]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    return bytes(out)
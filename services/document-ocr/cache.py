@@ -0,0 +1,144 @@
+"""
+Content-addressed cache of analysis results.
+
+Results are keyed by the SHA-256 of the uploaded bytes plus a version of
+the analysis rules, so a document uploaded again (the same 管理規約 by every
+buyer in a building) is answered without parsing it, and changing the rules
+simply stops old entries from matching. Entries live in an in-memory LRU
+of serialized JSON (decoded on each hit, so the budget is the memory really
+held) and, optionally, as zlib-compressed JSON files on disk; both are
+bounded by size and evict least recently used entries first. Stale entries from older
+rule versions are never read again, so they are the first to go.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+
+def rules_version(*rules) -> str:
+    """Short hash of rule tables (JSON-serializable, or with a default=) for cache keys."""
+    encoded = json.dumps(rules, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+class AnalysisCache:
+    """
+    Result dicts keyed by `key(sha256)`, kept as at most `memory_bytes` of
+    UTF-8 JSON in memory and `disk_bytes` of compressed files under `directory` (None
+    keeps the cache in memory only). Safe to call from any thread.
+    """
+
+    def __init__(self, version: str, directory: Optional[str] = None,
+                 memory_bytes: int = 64 << 20, disk_bytes: int = 1 << 30):
+        self.version = version
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()  # key -> JSON
+        self._memory_used = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> file size, oldest first
+        self._disk_used = 0
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(directory):
+                if name.endswith(".json.z"):
+                    stat = os.stat(os.path.join(directory, name))
+                    entries.append((stat.st_mtime, name[: -len(".json.z")], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_used += size
+
+    def key(self, sha256: str) -> str:
+        return f"{sha256}-{self.version}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json.z")
+
+    def get(self, sha256: str) -> Optional[dict]:
+        key = self.key(sha256)
+        with self._lock:
+            encoded = self._memory.get(key)
+            if encoded is not None:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+            on_disk = key in self._disk
+        if encoded is not None:
+            return json.loads(encoded)
+        if on_disk:
+            try:
+                with open(self._path(key), "rb") as f:
+                    encoded = zlib.decompress(f.read())
+                os.utime(self._path(key))
+            except (OSError, zlib.error):
+                self._forget_file(key)
+            else:
+                result = json.loads(encoded)
+                with self._lock:
+                    self._disk.move_to_end(key)
+                    self.hits["disk"] += 1
+                    self._remember(key, encoded)
+                return result
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, sha256: str, result: dict):
+        key = self.key(sha256)
+        encoded = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._remember(key, encoded)
+        if self.directory and self.disk_bytes > 0:
+            compressed = zlib.compress(encoded, 6)
+            # Write then rename, so a reader never sees a partial file
+            with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".part", delete=False) as f:
+                f.write(compressed)
+            os.replace(f.name, self._path(key))
+            with self._lock:
+                self._disk_used += len(compressed) - self._disk.pop(key, 0)
+                self._disk[key] = len(compressed)
+                evicted = []
+                while self._disk_used > self.disk_bytes and len(self._disk) > 1:
+                    old, size = self._disk.popitem(last=False)
+                    self._disk_used -= size
+                    evicted.append(old)
+            for old in evicted:
+                try:
+                    os.remove(self._path(old))
+                except FileNotFoundError:
+                    pass
+
+    def _remember(self, key: str, encoded: bytes):
+        """Add to the memory LRU (lock held); results larger than the whole budget are not kept."""
+        if len(encoded) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_used -= len(self._memory.pop(key))
+        self._memory[key] = encoded
+        self._memory_used += len(encoded)
+        while self._memory_used > self.memory_bytes:
+            self._memory_used -= len(self._memory.popitem(last=False)[1])
+
+    def _forget_file(self, key: str):
+        with self._lock:
+            self._disk_used -= self._disk.pop(key, 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_used,
+                "hits": dict(self.hits),
+                "misses": self.misses,
+            }
@@ -0,0 +1,84 @@
+"""
+Parallel PDF text extraction across a process pool.
+
+pypdf extraction is pure-Python and CPU-bound, so threads cannot speed it
+up and running it in the request handler stalls the event loop. A
+PageExtractor splits a document into contiguous page ranges, extracts each
+range in a worker process (which opens the spooled file itself, so only
+the path and page numbers cross the process boundary) and reassembles the
+pages in order. The event loop only awaits the futures.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from pypdf import PdfReader
+
+
+def page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Split pages [0, page_count) into at most `parts` contiguous, near-equal ranges."""
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges, start = [], 0
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return [r for r in ranges if r[0] < r[1]]
+
+
+def count_pages(path: str) -> int:
+    with open(path, "rb") as pdf_file:
+        return len(PdfReader(pdf_file).pages)
+
+
+def extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop) of the PDF at path. Runs in a worker process."""
+    with open(path, "rb") as pdf_file:
+        reader = PdfReader(pdf_file)
+        pages = []
+        for number in range(start, stop):
+            pages.append(reader.pages[number].extract_text())
+            # Keep worker memory flat on long ranges (see analysis_events)
+            reader.resolved_objects.clear()
+        return pages
+
+
+class PageExtractor:
+    """
+    Extracts documents on a shared pool of `workers` processes, using at most
+    `max_parallel_pages` of them per document so one large upload cannot
+    occupy the whole pool. Documents shorter than `min_pages_per_task` per
+    extra worker are not split further. With workers=0, extraction runs
+    serially on the default thread pool instead.
+    """
+
+    def __init__(self, workers: int, max_parallel_pages: int = 4, min_pages_per_task: int = 8):
+        self.workers = workers
+        self.max_parallel_pages = max(1, max_parallel_pages)
+        self.min_pages_per_task = max(1, min_pages_per_task)
+        self._pool: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(workers) if workers > 0 else None
+
+    def plan(self, page_count: int) -> List[Tuple[int, int]]:
+        """Page ranges a document of page_count pages is split into."""
+        parts = min(self.workers or 1, self.max_parallel_pages, -(-page_count // self.min_pages_per_task))
+        return page_ranges(page_count, parts)
+
+    async def extract(self, path: str) -> List[str]:
+        """Text of every page of the PDF at path, in page order."""
+        loop = asyncio.get_running_loop()
+        page_count = await loop.run_in_executor(None, count_pages, path)
+        ranges = self.plan(page_count)
+        chunks = await asyncio.gather(
+            *(loop.run_in_executor(self._pool, extract_page_range, path, start, stop) for start, stop in ranges)
+        )
+        return [page for chunk in chunks for page in chunk]
+
+    def shutdown(self, wait: bool = False):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def default_workers() -> int:
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
@@ -0,0 +1,326 @@
+"""
+Persistent bulk-analysis jobs: a SQLite work queue plus a bounded pool of
+asyncio workers.
+
+A job is a bundle of uploaded files. Each file's content is stored once,
+under its SHA-256, and analyzed once: identical uploads (within a bundle,
+across bundles, or of a document already analyzed) share one `documents`
+row and its result. Documents move queued -> running -> completed/failed;
+a document left running by a crash is queued again on start-up. Each result
+records the analysis rules version it was computed with, and a completed
+document from other rules is queued again when its content is uploaded.
+
+Workers are coroutines in the service's event loop; the CPU-bound work is
+whatever `process` awaits (the page extractor's process pool), so up to
+`workers` documents are analyzed at once and a bundle takes about as long
+as its slowest file when there are cores to spare.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    sha256 TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    rules_version TEXT,
+    queued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS documents_queue ON documents (status, queued_at);
+CREATE TABLE IF NOT EXISTS files (
+    job_id TEXT NOT NULL REFERENCES jobs (id),
+    file_id INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES documents (sha256),
+    deduplicated INTEGER NOT NULL,
+    PRIMARY KEY (job_id, file_id)
+);
+"""
+
+# Copy size when hashing and storing uploads
+CHUNK_BYTES = 1 << 20
+
+# Pause before a worker retries after failing to claim a document
+CLAIM_RETRY_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """
+    SQLite-backed jobs, files and per-content documents; safe to call from
+    any thread. Results are recorded with `rules_version`, the version of
+    the analysis rules the caller's `process` applies.
+    """
+
+    def __init__(self, db_path: str, files_dir: str, rules_version: str = ""):
+        self.files_dir = files_dir
+        self.rules_version = rules_version
+        os.makedirs(files_dir, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(documents)")}
+        if "rules_version" not in columns:
+            # Stores created before results were versioned; their results count as stale
+            self._db.execute("ALTER TABLE documents ADD COLUMN rules_version TEXT")
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._db.close()
+
+    def document_path(self, sha256: str) -> str:
+        return os.path.join(self.files_dir, f"{sha256}.pdf")
+
+    def store_upload(self, upload) -> Tuple[str, str]:
+        """Hash an upload while copying it into files_dir; returns (sha256, temporary path)."""
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.files_dir, suffix=".part", delete=False) as out:
+            for chunk in iter(lambda: upload.read(CHUNK_BYTES), b""):
+                digest.update(chunk)
+                out.write(chunk)
+        return digest.hexdigest(), out.name
+
+    def submit(self, uploads: List[Tuple[str, str, str]]) -> Tuple[str, List[dict], int]:
+        """
+        Record a job for (filename, sha256, temporary path) uploads. New
+        content is queued and its file kept, as is content that failed or was
+        completed under other rules; content already queued, running or
+        completed under the current rules is reused and the upload discarded. Uploads are only
+        moved or removed once the job is committed, so a failed submit leaves
+        every temporary path for the caller to clean up. Returns the job id,
+        its files and how many documents were newly queued.
+        """
+        job_id, now = uuid.uuid4().hex, time.time()
+        files, queued = [], 0
+        keep, discard = [], []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("INSERT INTO jobs (id, created_at) VALUES (?, ?)", (job_id, now))
+                for file_id, (filename, sha256, path) in enumerate(uploads):
+                    row = self._db.execute(
+                        "SELECT status, rules_version FROM documents WHERE sha256 = ?", (sha256,)
+                    ).fetchone()
+                    if (
+                        row is None
+                        or row["status"] == "failed"
+                        or (row["status"] == "completed" and row["rules_version"] != self.rules_version)
+                    ):
+                        # New content, a failed document worth another try, or a stale result
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO documents (sha256, filename, status, queued_at) "
+                            "VALUES (?, ?, 'queued', ?)",
+                            (sha256, filename, now),
+                        )
+                        keep.append((sha256, path))
+                        deduplicated = False
+                        queued += 1
+                    else:
+                        discard.append(path)
+                        deduplicated = True
+                    self._db.execute(
+                        "INSERT INTO files (job_id, file_id, filename, sha256, deduplicated) VALUES (?, ?, ?, ?, ?)",
+                        (job_id, file_id, filename, sha256, int(deduplicated)),
+                    )
+                    files.append({"file_id": file_id, "filename": filename, "sha256": sha256,
+                                  "deduplicated": deduplicated})
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            # Still under the lock, so no worker claims a document before its file is in place
+            for sha256, path in keep:
+                try:
+                    os.replace(path, self.document_path(sha256))
+                except OSError as e:
+                    logger.error(f"Could not store upload {path}: {e}")
+                    self._db.execute(
+                        "UPDATE documents SET status = 'failed', error = ?, finished_at = ? WHERE sha256 = ?",
+                        (f"Could not store upload: {e}", time.time(), sha256),
+                    )
+                    queued -= 1
+                    discard.append(path)
+        for path in discard:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove upload {path}: {e}")
+        return job_id, files, queued
+
+    def claim_next(self) -> Optional[Tuple[str, str]]:
+        """Mark the oldest queued document running; returns (sha256, filename) or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256, filename FROM documents WHERE status = 'queued' ORDER BY queued_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE documents SET status = 'running', started_at = ? WHERE sha256 = ?",
+                (time.time(), row["sha256"]),
+            )
+            return row["sha256"], row["filename"]
+
+    def finish(self, sha256: str, result: Optional[dict] = None, error: Optional[str] = None):
+        """Record a document's result (or error) and drop its stored file."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE documents SET status = ?, result = ?, error = ?, rules_version = ?, finished_at = ? "
+                "WHERE sha256 = ?",
+                (
+                    "failed" if error is not None else "completed",
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    self.rules_version,
+                    time.time(),
+                    sha256,
+                ),
+            )
+        try:
+            os.remove(self.document_path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def recover(self) -> int:
+        """Requeue documents left running by a previous process; returns how many are queued."""
+        with self._lock:
+            self._db.execute("UPDATE documents SET status = 'queued' WHERE status = 'running'")
+            return self._db.execute("SELECT COUNT(*) FROM documents WHERE status = 'queued'").fetchone()[0]
+
+    def _file_rows(self, job_id: str, file_id: Optional[int] = None) -> List[sqlite3.Row]:
+        # Results are only read for a single file; job status polls skip them
+        query = (
+            "SELECT f.file_id, f.filename, f.sha256, f.deduplicated, d.status, d.error"
+            + (", d.result" if file_id is not None else "")
+            + " FROM files f JOIN documents d ON d.sha256 = f.sha256 WHERE f.job_id = ?"
+        )
+        params: tuple = (job_id,)
+        if file_id is not None:
+            query += " AND f.file_id = ?"
+            params += (file_id,)
+        with self._lock:
+            return self._db.execute(query + " ORDER BY f.file_id", params).fetchall()
+
+    def job(self, job_id: str) -> Optional[dict]:
+        """A job's overall status and the status of each file, or None if unknown."""
+        with self._lock:
+            job = self._db.execute("SELECT id, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        files = [
+            {
+                "file_id": row["file_id"],
+                "filename": row["filename"],
+                "sha256": row["sha256"],
+                "deduplicated": bool(row["deduplicated"]),
+                "status": row["status"],
+                "error": row["error"],
+            }
+            for row in self._file_rows(job_id)
+        ]
+        counts = {status: 0 for status in ("queued", "running", "completed", "failed")}
+        for file in files:
+            counts[file["status"]] += 1
+        if counts["queued"] + counts["running"]:
+            status = "queued" if counts["queued"] == len(files) else "running"
+        else:
+            status = "completed" if not counts["failed"] else "completed_with_errors"
+        return {"job_id": job_id, "created_at": job["created_at"], "status": status, "counts": counts, "files": files}
+
+    def file(self, job_id: str, file_id: int) -> Optional[dict]:
+        """One file's status, with its analysis result once completed."""
+        rows = self._file_rows(job_id, file_id)
+        if not rows:
+            return None
+        row = rows[0]
+        return {
+            "file_id": row["file_id"],
+            "filename": row["filename"],
+            "sha256": row["sha256"],
+            "deduplicated": bool(row["deduplicated"]),
+            "status": row["status"],
+            "error": row["error"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+        }
+
+
+class JobRunner:
+    """
+    Runs `workers` coroutines that take queued documents from the store and
+    await `process(path, sha256, filename) -> result dict` for each. Every queued
+    document has one token on an asyncio queue, so idle workers sleep until
+    there is work rather than polling the database.
+    """
+
+    def __init__(self, store: JobStore, process: Callable[[str, str, str], Awaitable[dict]], workers: int = 4):
+        self.store = store
+        self.process = process
+        self.workers = max(1, workers)
+        self._tokens: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._tokens = asyncio.Queue()
+        for _ in range(self.store.recover()):
+            self._tokens.put_nowait(None)
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+
+    def notify(self, queued: int):
+        """Wake workers for newly queued documents."""
+        for _ in range(queued):
+            self._tokens.put_nowait(None)
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._tokens.get()
+            try:
+                claimed = await loop.run_in_executor(None, self.store.claim_next)
+            except Exception as e:
+                # e.g. the database is locked or the disk is full; the document stays queued
+                logger.error(f"Could not claim a queued document: {e}")
+                await asyncio.sleep(CLAIM_RETRY_SECONDS)
+                self._tokens.put_nowait(None)
+                continue
+            if claimed is None:
+                continue
+            sha256, filename = claimed
+            try:
+                result = await self.process(self.store.document_path(sha256), sha256, filename)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result, error = None, str(e)
+            else:
+                error = None
+            try:
+                await loop.run_in_executor(None, lambda: self.store.finish(sha256, result=result, error=error))
+            except Exception as e:
+                # Left running; recover() queues it again on the next start-up
+                logger.error(f"Could not record the analysis of {sha256[:12]}: {e}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -1,17 +1,45 @@
+import hashlib
+import json
 import logging
+import os
+import shutil
+import tempfile
 from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pypdf import PdfReader
-from io import BytesIO
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from pydantic import BaseModel
 from enum import Enum
 
+from cache import AnalysisCache, rules_version
+from extraction import PageExtractor, default_workers
+from jobs import JobRunner, JobStore
+from scanner import KeywordMatch, KeywordScanner
+
 app = FastAPI(title="IKIGAI Document Intelligence Service")
 
 # Simple logger setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Text extraction for /analyze runs in a process pool (see extraction.py):
+# worker processes shared by all requests (0 extracts serially in a thread),
+# how many of them one document may use, and the fewest pages worth a task
+EXTRACT_WORKERS = int(os.getenv("OCR_EXTRACT_WORKERS", str(default_workers())))
+MAX_PAGE_PARALLELISM = int(os.getenv("OCR_MAX_PAGE_PARALLELISM", "4"))
+MIN_PAGES_PER_TASK = int(os.getenv("OCR_MIN_PAGES_PER_TASK", "8"))
+page_extractor = PageExtractor(EXTRACT_WORKERS, MAX_PAGE_PARALLELISM, MIN_PAGES_PER_TASK)
+
+# Results of /analyze and jobs are cached by content hash (see cache.py):
+# where compressed entries are kept (empty keeps the cache in memory only)
+# and how much memory and disk it may use
+CACHE_DIR = os.getenv("OCR_CACHE_DIR", "analysis-cache")
+CACHE_MEMORY_MB = int(os.getenv("OCR_CACHE_MEMORY_MB", "64"))
+CACHE_DISK_MB = int(os.getenv("OCR_CACHE_DISK_MB", "1024"))
+analysis_cache: Optional[AnalysisCache] = None
+
 
 class DocumentType(str, Enum):
     """Japanese real estate document types."""
@@ -39,6 +67,16 @@ class RiskFlag(BaseModel):
     action: str
 
 
+class KeywordHit(BaseModel):
+    """Where a risk, document-type or key-fact keyword occurs, for highlighting."""
+    keyword: str
+    kind: str  # risk, document_type, key_fact
+    category: str  # risk category, document type or key fact name
+    page: int  # 1-based
+    start: int  # character offsets within the page's text
+    end: int
+
+
 class DocumentAnalysisResponse(BaseModel):
     filename: str
     document_type: DocumentType
@@ -46,6 +84,7 @@ class DocumentAnalysisResponse(BaseModel):
     page_count: int
     risk_flags: List[RiskFlag]
     key_facts: dict
+    matches: List[KeywordHit] = []
     status: str = "completed"
 
 
@@ -124,54 +163,222 @@ RISK_PATTERNS = [
 ]
 
 
-def detect_risk_flags(text: str) -> List[RiskFlag]:
-    """Scan document text for risk patterns."""
-    flags = []
-    for pattern in RISK_PATTERNS:
-        for keyword in pattern["keywords"]:
-            if keyword in text:
-                flags.append(pattern["flag"])
-                break  # Don't duplicate flags from same pattern
-    return flags
+# Document type cues, checked in order; the first rule with a keyword in the
+# text (or a hint in the filename) wins
+DOCUMENT_TYPE_RULES = [
+    {"type": DocumentType.registry_transcript, "keywords": ["登記"], "filename_hint": "registry"},
+    {"type": DocumentType.important_matter, "keywords": ["重要事項", "重説"]},
+    {"type": DocumentType.sale_contract, "keywords": ["売買契約"]},
+    {"type": DocumentType.building_inspection, "keywords": ["建物状況"], "filename_hint": "inspection"},
+    {"type": DocumentType.management_rules, "keywords": ["管理規約"]},
+]
+
+# Key facts and the keywords that indicate them
+KEY_FACT_KEYWORDS = {
+    "has_location": ["所在"],
+    "has_area_info": ["面積", "㎡"],
+    "has_owner_info": ["所有者", "権利者"],
+    "has_mortgage_info": ["抵当権"],
+}
+
+# Every keyword above, found in one pass over each page
+# Part of every cache key: editing any rule table makes old results miss
+RULES_VERSION = rules_version(jsonable_encoder([RISK_PATTERNS, DOCUMENT_TYPE_RULES, KEY_FACT_KEYWORDS]))
 
+KEYWORD_SCANNER = KeywordScanner(
+    [keyword for pattern in RISK_PATTERNS for keyword in pattern["keywords"]]
+    + [keyword for rule in DOCUMENT_TYPE_RULES for keyword in rule["keywords"]]
+    + [keyword for keywords in KEY_FACT_KEYWORDS.values() for keyword in keywords]
+)
 
-def classify_document_type(text: str, filename: str) -> DocumentType:
+
+def scan_keywords(pages: List[str]) -> List[KeywordMatch]:
+    """All keyword occurrences in a document's pages, ordered by page and offset."""
+    return KEYWORD_SCANNER.scan(pages)
+
+
+def _found_keywords(text: str, matches: Optional[List[KeywordMatch]]) -> set:
+    if matches is None:
+        matches = KEYWORD_SCANNER.scan_page(text)
+    return {match.keyword for match in matches}
+
+
+def detect_risk_flags(text: str, matches: Optional[List[KeywordMatch]] = None) -> List[RiskFlag]:
+    """Scan document text for risk patterns (or use matches already scanned from it)."""
+    found = _found_keywords(text, matches)
+    return [
+        pattern["flag"]  # one flag per pattern, however many of its keywords occur
+        for pattern in RISK_PATTERNS
+        if any(keyword in found for keyword in pattern["keywords"])
+    ]
+
+
+def classify_document_type(
+    text: str, filename: str, matches: Optional[List[KeywordMatch]] = None
+) -> DocumentType:
     """Classify the document type from text content and filename."""
-    text_lower = text.lower()
+    found = _found_keywords(text, matches)
     filename_lower = filename.lower()
-
-    if "登記" in text or "registry" in filename_lower:
-        return DocumentType.registry_transcript
-    if "重要事項" in text or "重説" in text:
-        return DocumentType.important_matter
-    if "売買契約" in text:
-        return DocumentType.sale_contract
-    if "建物状況" in text or "inspection" in filename_lower:
-        return DocumentType.building_inspection
-    if "管理規約" in text:
-        return DocumentType.management_rules
+    for rule in DOCUMENT_TYPE_RULES:
+        hint = rule.get("filename_hint")
+        if any(keyword in found for keyword in rule["keywords"]) or (hint and hint in filename_lower):
+            return rule["type"]
     return DocumentType.other
 
 
-def extract_key_facts(text: str) -> dict:
+def extract_key_facts(text: str, matches: Optional[List[KeywordMatch]] = None) -> dict:
     """Extract structured key facts from document text."""
-    facts = {}
+    found = _found_keywords(text, matches)
     # Simple keyword-based extraction for demo purposes
     # In production, this would use Claude for complex extraction
-    if "所在" in text:
-        facts["has_location"] = True
-    if "面積" in text or "㎡" in text:
-        facts["has_area_info"] = True
-    if "所有者" in text or "権利者" in text:
-        facts["has_owner_info"] = True
-    if "抵当権" in text:
-        facts["has_mortgage_info"] = True
-    return facts
+    return {
+        fact: True
+        for fact, keywords in KEY_FACT_KEYWORDS.items()
+        if any(keyword in found for keyword in keywords)
+    }
+
+
+def _keyword_labels() -> dict:
+    """keyword -> [(kind, category)] for every rule the keyword belongs to."""
+    labels = {}
+    for pattern in RISK_PATTERNS:
+        for keyword in pattern["keywords"]:
+            labels.setdefault(keyword, []).append(("risk", pattern["flag"].category))
+    for rule in DOCUMENT_TYPE_RULES:
+        for keyword in rule["keywords"]:
+            labels.setdefault(keyword, []).append(("document_type", rule["type"].value))
+    for fact, keywords in KEY_FACT_KEYWORDS.items():
+        for keyword in keywords:
+            labels.setdefault(keyword, []).append(("key_fact", fact))
+    return labels
+
+
+KEYWORD_LABELS = _keyword_labels()
+
+
+def keyword_hits(matches: List[KeywordMatch]) -> List[KeywordHit]:
+    """Label scanner matches with the rules they belong to, for the response."""
+    return [
+        KeywordHit(keyword=m.keyword, kind=kind, category=category, page=m.page, start=m.start, end=m.end)
+        for m in matches
+        for kind, category in KEYWORD_LABELS[m.keyword]
+    ]
+
+
+def analyze_pages(pages: List[str], filename: str) -> DocumentAnalysisResponse:
+    """Classify, flag and extract facts from a document's extracted pages."""
+    text = "".join(page + "\n" for page in pages)
+
+    logger.info(
+        f"Extracted {len(text)} characters from {len(pages)} pages."
+    )
+
+    # One pass over the pages finds every keyword used below
+    matches = scan_keywords(pages)
+
+    # Classify document type
+    doc_type = classify_document_type(text, filename, matches)
+
+    # Detect risk flags
+    risk_flags = detect_risk_flags(text, matches)
+
+    # Extract key facts
+    key_facts = extract_key_facts(text, matches)
+
+    logger.info(
+        f"Analysis complete: type={doc_type.value}, "
+        f"risks={len(risk_flags)}, facts={len(key_facts)}"
+    )
+
+    return DocumentAnalysisResponse(
+        filename=filename,
+        document_type=doc_type,
+        text_content=text,
+        page_count=len(pages),
+        risk_flags=risk_flags,
+        key_facts=key_facts,
+        matches=keyword_hits(matches),
+    )
+
+
+@app.on_event("startup")
+def start_cache():
+    global analysis_cache
+    analysis_cache = AnalysisCache(RULES_VERSION, CACHE_DIR or None, CACHE_MEMORY_MB << 20, CACHE_DISK_MB << 20)
+
+
+@app.on_event("shutdown")
+async def stop_extractor():
+    # Stop the job workers first: a document they are running when the pool
+    # goes away stays "running" and is requeued on restart instead of failing
+    await stop_jobs()
+    page_extractor.shutdown()
 
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "service": "document-ocr"}
+    health = {"status": "ok", "service": "document-ocr"}
+    if analysis_cache is not None:
+        health["cache"] = analysis_cache.stats()
+    return health
+
+
+# Copy size when spooling uploads to temporary files
+SPOOL_CHUNK_BYTES = 1 << 20
+
+
+def spool_upload(upload, digest=None) -> str:
+    """
+    Copy an upload to a temporary file in fixed-size chunks, feeding digest
+    (a hashlib object) along the way if given; returns the file's path.
+    """
+    with tempfile.NamedTemporaryFile(prefix="ikigai-doc-", suffix=".pdf", delete=False) as spool:
+        if digest is None:
+            shutil.copyfileobj(upload, spool, SPOOL_CHUNK_BYTES)
+        else:
+            for chunk in iter(lambda: upload.read(SPOOL_CHUNK_BYTES), b""):
+                digest.update(chunk)
+                spool.write(chunk)
+    return spool.name
+
+
+def _check_pdf_filename(filename: Optional[str]):
+    if not filename or not filename.lower().endswith(".pdf"):
+        raise HTTPException(
+            status_code=400, detail="Only PDF files are supported currently."
+        )
+
+
+def _as_uploaded(result: dict, filename: str) -> dict:
+    """
+    A stored result as it applies to one upload of that content: identical
+    files share one analysis, but the filename can still decide the type.
+    """
+    if result["filename"] == filename:
+        return result
+    matches = [KeywordMatch(m["keyword"], m["page"], m["start"], m["end"]) for m in result["matches"]]
+    return {
+        **result,
+        "filename": filename,
+        "document_type": classify_document_type("", filename, matches).value,
+    }
+
+
+async def analyze_spooled(path: str, sha256: str, filename: str) -> dict:
+    """
+    Analysis of the PDF at path whose content hashes to sha256, from the
+    cache when the same bytes were analyzed under the current rules.
+    """
+    if analysis_cache is not None:
+        cached = await run_in_threadpool(analysis_cache.get, sha256)
+        if cached is not None:
+            logger.info(f"Cache hit for {filename} ({sha256[:12]})")
+            return _as_uploaded(cached, filename)
+    pages = await page_extractor.extract(path)
+    result = jsonable_encoder(analyze_pages(pages, filename))
+    if analysis_cache is not None:
+        await run_in_threadpool(analysis_cache.put, sha256, result)
+    return result
 
 
 @app.post("/analyze", response_model=DocumentAnalysisResponse)
@@ -183,52 +390,182 @@ async def analyze_document(file: UploadFile = File(...)):
     """
     try:
         logger.info(f"Received file: {file.filename}")
+        _check_pdf_filename(file.filename)
 
-        if not file.filename or not file.filename.lower().endswith(".pdf"):
-            raise HTTPException(
-                status_code=400, detail="Only PDF files are supported currently."
-            )
+        # Worker processes read the upload from a file of its own; its hash
+        # finds earlier analyses of the same bytes
+        digest = hashlib.sha256()
+        path = await run_in_threadpool(spool_upload, file.file, digest)
+        try:
+            return await analyze_spooled(path, digest.hexdigest(), file.filename)
+        finally:
+            os.remove(path)
 
-        content = await file.read()
-        pdf_file = BytesIO(content)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing document: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        reader = PdfReader(pdf_file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
 
-        logger.info(
-            f"Extracted {len(text)} characters from {len(reader.pages)} pages."
-        )
+# Response formats for /analyze/stream
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
 
-        # Classify document type
-        doc_type = classify_document_type(text, file.filename)
 
-        # Detect risk flags
-        risk_flags = detect_risk_flags(text)
+def encode_event(event: str, data: dict, stream_format: str = "ndjson") -> str:
+    """One event as an NDJSON line or a Server-Sent Events message."""
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return json.dumps({"event": event, **data}, ensure_ascii=False) + "\n"
 
-        # Extract key facts
-        key_facts = extract_key_facts(text)
 
-        logger.info(
-            f"Analysis complete: type={doc_type.value}, "
-            f"risks={len(risk_flags)}, facts={len(key_facts)}"
-        )
+def analysis_events(path: str, filename: str, stream_format: str = "ndjson") -> Iterator[str]:
+    """
+    Analyze the spooled PDF at path one page at a time, yielding events as
+    they are found: "start", then per page "page" (its text and keyword
+    matches) followed by a "risk_flag" for each flag not seen on an earlier
+    page, then "summary". Only the current page's text is held in memory.
+    Removes the file when done.
+    """
+    try:
+        with open(path, "rb") as pdf_file:
+            reader = PdfReader(pdf_file)
+            page_count = len(reader.pages)
+            yield encode_event("start", {"filename": filename, "page_count": page_count}, stream_format)
+            matches: List[KeywordMatch] = []
+            flagged = set()
+            for number, page in enumerate(reader.pages, start=1):
+                text = page.extract_text()
+                page_matches = KEYWORD_SCANNER.scan_page(text, number)
+                matches.extend(page_matches)
+                yield encode_event(
+                    "page",
+                    {"page": number, "text": text, "matches": jsonable_encoder(keyword_hits(page_matches))},
+                    stream_format,
+                )
+                for flag in detect_risk_flags(text, page_matches):
+                    if flag.category not in flagged:
+                        flagged.add(flag.category)
+                        yield encode_event("risk_flag", {"page": number, "flag": jsonable_encoder(flag)}, stream_format)
+                # pypdf caches every object it has parsed; drop them so memory
+                # stays flat however many pages the document has
+                reader.resolved_objects.clear()
+            summary = {
+                "filename": filename,
+                "document_type": classify_document_type("", filename, matches).value,
+                "page_count": page_count,
+                "risk_flags": jsonable_encoder(detect_risk_flags("", matches)),
+                "key_facts": extract_key_facts("", matches),
+                "status": "completed",
+            }
+            logger.info(
+                f"Streamed analysis of {filename}: {page_count} pages, "
+                f"type={summary['document_type']}, risks={len(summary['risk_flags'])}"
+            )
+            yield encode_event("summary", summary, stream_format)
+    except Exception as e:
+        # The response has already started, so errors are reported in-band
+        logger.error(f"Error streaming document analysis: {e}")
+        yield encode_event("error", {"detail": str(e)}, stream_format)
+    finally:
+        os.remove(path)
 
-        return DocumentAnalysisResponse(
-            filename=file.filename,
-            document_type=doc_type,
-            text_content=text,
-            page_count=len(reader.pages),
-            risk_flags=risk_flags,
-            key_facts=key_facts,
-        )
 
-    except HTTPException:
-        raise
+@app.post("/analyze/stream")
+async def analyze_document_stream(file: UploadFile = File(...), format: str = "ndjson"):
+    """
+    Analyze a document page by page, streaming NDJSON (or SSE with
+    format=sse) events: page text and keyword matches, risk flags as soon as
+    the page containing them is read, and a final summary.
+    """
+    logger.info(f"Received file for streaming analysis: {file.filename}")
+    _check_pdf_filename(file.filename)
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(STREAM_MEDIA_TYPES)}")
+    path = await run_in_threadpool(spool_upload, file.file)
+    return StreamingResponse(
+        analysis_events(path, file.filename, format), media_type=STREAM_MEDIA_TYPES[format]
+    )
+
+# Bulk analysis jobs (see jobs.py): where the queue database and queued
+# files live (mount a volume here to keep jobs across restarts), how many
+# documents are analyzed at once, and the most files one job may hold
+JOBS_DIR = os.getenv("OCR_JOBS_DIR", "job-data")
+JOB_WORKERS = int(os.getenv("OCR_JOB_WORKERS", "4"))
+JOB_MAX_FILES = int(os.getenv("OCR_JOB_MAX_FILES", "100"))
+job_store: Optional[JobStore] = None
+job_runner: Optional[JobRunner] = None
+
+
+@app.on_event("startup")
+def start_jobs():
+    global job_store, job_runner
+    job_store = JobStore(os.path.join(JOBS_DIR, "jobs.sqlite3"), os.path.join(JOBS_DIR, "files"), RULES_VERSION)
+    job_runner = JobRunner(job_store, analyze_spooled, JOB_WORKERS)
+    job_runner.start()
+
+
+async def stop_jobs():
+    global job_store, job_runner
+    if job_runner is not None:
+        await job_runner.stop()
+        job_store.close()
+    job_store = job_runner = None
+
+
+def _jobs_or_503() -> JobStore:
+    if job_store is None:
+        raise HTTPException(status_code=503, detail="Job queue is not running")
+    return job_store
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(files: List[UploadFile] = File(...)):
+    """
+    Queue a bundle of documents for analysis and return at once. Each file
+    is analyzed once per distinct content: uploads identical to one already
+    queued or analyzed reuse its result. Poll GET /jobs/{job_id}.
+    """
+    store = _jobs_or_503()
+    if len(files) > JOB_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"A job may contain at most {JOB_MAX_FILES} files")
+    for file in files:
+        _check_pdf_filename(file.filename)
+    stored = []
+    try:
+        for file in files:
+            sha256, path = await run_in_threadpool(store.store_upload, file.file)
+            stored.append((file.filename, sha256, path))
+        job_id, job_files, queued = await run_in_threadpool(store.submit, stored)
     except Exception as e:
-        logger.error(f"Error processing document: {e}")
+        for _, _, path in stored:
+            if os.path.exists(path):
+                os.remove(path)
+        logger.error(f"Error queueing job: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    job_runner.notify(queued)
+    logger.info(f"Queued job {job_id}: {len(job_files)} files, {queued} new documents")
+    return {"job_id": job_id, "files": job_files}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Overall job status and each file's status."""
+    job = await run_in_threadpool(_jobs_or_503().job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}/files/{file_id}")
+async def get_job_file(job_id: str, file_id: int):
+    """One file's status, with its analysis (as from /analyze) once completed."""
+    file = await run_in_threadpool(_jobs_or_503().file, job_id, file_id)
+    if file is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    if file["result"] is not None:
+        file["result"] = _as_uploaded(file["result"], file["filename"])
+    return file
 
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+"""
+Single-pass multi-keyword scanning for document text.
+
+Every keyword the analysis looks for (risk patterns, document-type and
+key-fact cues) goes into one prefix trie, which is compiled into a single
+regular expression once at import. Scanning a page is then one pass of the
+C regex engine: at each position it follows at most one trie branch, instead
+of one ``keyword in text`` search per keyword. (A pure-Python Aho-Corasick
+automaton does the same work one character at a time in the interpreter,
+which is several times slower than the substring searches it replaces.)
+
+Matches are reported the way Aho-Corasick reports them: every occurrence of
+every keyword, overlapping ones included (仮差押 also yields 差押), with the
+page number and character offsets within the page for highlighting.
+"""
+import re
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    keyword: str
+    page: int  # 1-based
+    start: int  # character offsets within the page text
+    end: int
+
+
+def _trie_pattern(node: dict) -> str:
+    """Regex for a trie node; shared prefixes are matched once, longest keyword first."""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:  # a keyword ends here; longer ones may continue
+        return ("(?:" + body + ")" if len(branches) == 1 else body) + "?"
+    return body
+
+
+class KeywordScanner:
+    """Finds all occurrences of a fixed set of keywords in one pass per page."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted({keyword for keyword in keywords if keyword})
+        if not self.keywords:
+            raise ValueError("KeywordScanner needs at least one keyword")
+        trie: Dict[str, dict] = {}
+        for keyword in self.keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self.pattern = re.compile(_trie_pattern(trie))
+        # The regex reports the longest keyword at each position and resumes
+        # after it. Any other keyword starting inside that span is listed here
+        # as (offset, keyword, fully contained); ones running past the end
+        # are confirmed against the text.
+        self._inner: Dict[str, List[Tuple[int, str, bool]]] = {}
+        for keyword in self.keywords:
+            self._inner[keyword] = [
+                (offset, other, keyword.startswith(other, offset))
+                for offset in range(len(keyword))
+                for other in self.keywords
+                if (offset, other) != (0, keyword)
+                and (keyword.startswith(other, offset) or other.startswith(keyword[offset:]))
+            ]
+
+    def scan_page(self, text: str, page: int = 1) -> List[KeywordMatch]:
+        """All keyword occurrences in one page, ordered by offset."""
+        matches = []
+        inner, overlapping = self._inner, False
+        for match in self.pattern.finditer(text):
+            start, keyword = match.start(), match.group()
+            matches.append(KeywordMatch(keyword, page, start, match.end()))
+            for offset, other, contained in inner[keyword]:
+                if contained or text.startswith(other, start + offset):
+                    matches.append(KeywordMatch(other, page, start + offset, start + offset + len(other)))
+                    overlapping = True
+        if overlapping:
+            matches.sort(key=lambda m: (m.start, m.end))
+        return matches
+
+    def scan(self, pages: Sequence[str]) -> List[KeywordMatch]:
+        """All keyword occurrences in a document, ordered by page and offset."""
+        matches = []
+        for number, text in enumerate(pages, start=1):
+            matches.extend(self.scan_page(text, number))
+        return matches
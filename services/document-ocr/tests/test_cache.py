@@ -0,0 +1,115 @@
+"""
+Tests for the content-hash analysis cache.
+"""
+import sys
+import os
+import copy
+import json
+
+import pytest
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+sys.path.insert(0, os.path.join(_service_dir, "benchmarks"))
+
+from cache import AnalysisCache, rules_version
+
+
+def _result(n, size=100):
+    return {"filename": f"{n}.pdf", "text_content": "x" * size}
+
+
+class TestAnalysisCache:
+    def test_memory_lru_is_bounded_by_size(self):
+        cache = AnalysisCache("v1", memory_bytes=450)
+        for n in range(3):
+            cache.put(str(n), _result(n))
+        cache.get("0")  # most recently used now
+        cache.put("3", _result(3))
+        assert cache.get("1") is None
+        assert cache.get("0") == _result(0) and cache.get("3") == _result(3)
+        stats = cache.stats()
+        assert stats["memory_entries"] == 3 and stats["memory_bytes"] <= 450
+        assert stats["hits"]["memory"] == 3 and stats["misses"] == 1
+
+    def test_memory_holds_serialized_results(self):
+        cache = AnalysisCache("v1")
+        result = _result(1)
+        cache.put("abc", result)
+        assert cache.stats()["memory_bytes"] == len(json.dumps(result).encode("utf-8"))
+        # Each hit decodes its own copy, so callers cannot change the cached entry
+        hit = cache.get("abc")
+        hit["filename"] = "changed.pdf"
+        assert cache.get("abc") == result
+
+    def test_disk_entries_survive_restart_for_same_rules(self, tmp_path):
+        AnalysisCache("v1", str(tmp_path)).put("abc", _result(1, 10000))
+        [name] = os.listdir(tmp_path)
+        assert os.path.getsize(tmp_path / name) < 1000  # compressed
+
+        reopened = AnalysisCache("v1", str(tmp_path))
+        assert reopened.get("abc") == _result(1, 10000)
+        assert reopened.stats()["hits"] == {"memory": 0, "disk": 1}
+        assert reopened.get("abc") == _result(1, 10000)
+        assert reopened.stats()["hits"] == {"memory": 1, "disk": 1}
+
+        assert AnalysisCache("v2", str(tmp_path)).get("abc") is None
+
+    def test_disk_is_bounded_by_size(self, tmp_path):
+        cache = AnalysisCache("v1", str(tmp_path), memory_bytes=0, disk_bytes=1000)
+        incompressible = [{"text_content": os.urandom(400).hex()} for _ in range(4)]
+        for n, result in enumerate(incompressible):
+            cache.put(str(n), result)
+        assert cache.stats()["disk_bytes"] <= 1000
+        assert cache.get("0") is None
+        assert cache.get("3") == incompressible[3]
+        assert len(os.listdir(tmp_path)) == cache.stats()["disk_entries"]
+
+    def test_unreadable_file_is_a_miss(self, tmp_path):
+        cache = AnalysisCache("v1", str(tmp_path), memory_bytes=0)
+        cache.put("abc", _result(1))
+        [name] = os.listdir(tmp_path)
+        (tmp_path / name).write_bytes(b"garbage")
+        assert cache.get("abc") is None
+        assert cache.stats()["disk_entries"] == 0
+
+
+def test_rule_changes_change_the_version():
+    from fastapi.encoders import jsonable_encoder
+    import main
+
+    assert main.RULES_VERSION == rules_version(
+        jsonable_encoder([main.RISK_PATTERNS, main.DOCUMENT_TYPE_RULES, main.KEY_FACT_KEYWORDS])
+    )
+    patterns = copy.deepcopy(main.RISK_PATTERNS)
+    patterns[0]["keywords"].append("新しいキーワード")
+    changed = rules_version(jsonable_encoder([patterns, main.DOCUMENT_TYPE_RULES, main.KEY_FACT_KEYWORDS]))
+    assert changed != main.RULES_VERSION
+
+
+def test_repeat_analysis_is_served_from_cache(tmp_path, monkeypatch):
+    pytest.importorskip("multipart")
+    from fastapi.testclient import TestClient
+    import main
+    from extraction import PageExtractor
+    from synthetic_pdf import build_pdf
+
+    monkeypatch.setattr(main, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(main, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(main, "page_extractor", PageExtractor(0))
+    pdf = build_pdf([["管理規約"], ["本建物は旧耐震です。"]])
+
+    with TestClient(main.app) as client:
+        first = client.post("/analyze", files={"file": ("rules.pdf", pdf, "application/pdf")})
+        assert first.status_code == 200
+        again = client.post("/analyze", files={"file": ("building_inspection.pdf", pdf, "application/pdf")})
+        assert again.status_code == 200
+        cache = client.get("/health").json()["cache"]
+        assert cache["hits"]["memory"] == 1 and cache["misses"] == 1
+
+    body, cached = first.json(), again.json()
+    assert cached["filename"] == "building_inspection.pdf"
+    assert cached["document_type"] == "building_inspection"  # the filename hint still applies
+    assert {k: v for k, v in cached.items() if k not in ("filename", "document_type")} == {
+        k: v for k, v in body.items() if k not in ("filename", "document_type")
+    }
@@ -0,0 +1,84 @@
+"""
+Tests for process-pool PDF extraction.
+"""
+import sys
+import os
+import asyncio
+import time
+
+import pytest
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+sys.path.insert(0, os.path.join(_service_dir, "benchmarks"))
+
+from extraction import PageExtractor, extract_page_range, page_ranges
+from synthetic_pdf import build_pdf, document_pages
+
+
+@pytest.fixture(scope="module")
+def pdf_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pdf") / "doc.pdf"
+    path.write_bytes(build_pdf(document_pages(40, lines_per_page=10)))
+    return str(path)
+
+
+def test_page_ranges_cover_every_page_once():
+    for pages in (1, 7, 40, 301):
+        for parts in (1, 3, 4, 64):
+            ranges = page_ranges(pages, parts)
+            assert len(ranges) == min(parts, pages)
+            assert [p for start, stop in ranges for p in range(start, stop)] == list(range(pages))
+            sizes = [stop - start for start, stop in ranges]
+            assert max(sizes) - min(sizes) <= 1
+
+
+def test_plan_respects_caps():
+    extractor = PageExtractor(8, max_parallel_pages=4, min_pages_per_task=8)
+    try:
+        assert len(extractor.plan(300)) == 4  # per-document cap
+        assert len(extractor.plan(10)) == 2  # too few pages for more tasks
+        assert len(extractor.plan(3)) == 1
+    finally:
+        extractor.shutdown(wait=True)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_extract_reassembles_pages_in_order(pdf_path, workers):
+    extractor = PageExtractor(workers, max_parallel_pages=4, min_pages_per_task=5)
+    try:
+        pages = asyncio.run(extractor.extract(pdf_path))
+    finally:
+        extractor.shutdown(wait=True)
+    assert pages == extract_page_range(pdf_path, 0, 40)
+    assert pages[0].startswith("重要事項説明書")
+
+
+def test_event_loop_stays_responsive(pdf_path):
+    extractor = PageExtractor(2, max_parallel_pages=2, min_pages_per_task=1)
+
+    async def run():
+        gaps, done = [], asyncio.Event()
+
+        async def ticker():
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.005)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        task = asyncio.ensure_future(ticker())
+        start = time.perf_counter()
+        for _ in range(3):
+            await extractor.extract(pdf_path)
+        elapsed = time.perf_counter() - start
+        done.set()
+        await task
+        return elapsed, max(gaps)
+
+    try:
+        elapsed, worst_gap = asyncio.run(run())
+    finally:
+        extractor.shutdown(wait=True)
+    assert worst_gap < max(0.25, elapsed / 4)
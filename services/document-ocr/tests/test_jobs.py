@@ -0,0 +1,252 @@
+"""
+Tests for the bulk analysis job queue and the /jobs API.
+"""
+import sys
+import os
+import asyncio
+import hashlib
+import io
+import time
+
+import pytest
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+sys.path.insert(0, os.path.join(_service_dir, "benchmarks"))
+
+from jobs import JobRunner, JobStore
+from synthetic_pdf import build_pdf
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "files"))
+    yield store
+    store.close()
+
+
+def _submit(store, *uploads):
+    stored = []
+    for filename, content in uploads:
+        sha256, path = store.store_upload(io.BytesIO(content))
+        stored.append((filename, sha256, path))
+    return store.submit(stored)
+
+
+class TestJobStore:
+    def test_identical_uploads_share_one_document(self, store):
+        job_id, files, queued = _submit(store, ("a.pdf", b"one"), ("b.pdf", b"two"), ("copy.pdf", b"one"))
+        assert queued == 2
+        assert [f["deduplicated"] for f in files] == [False, False, True]
+        assert files[0]["sha256"] == files[2]["sha256"]
+        assert sorted(os.listdir(store.files_dir)) == sorted(f"{f['sha256']}.pdf" for f in files[:2])
+
+        # Content seen before is not queued again, even after it completes
+        sha256, filename = store.claim_next()
+        store.finish(sha256, result={"filename": filename})
+        _, files, queued = _submit(store, ("again.pdf", b"one"))
+        assert queued == 0 and files[0]["deduplicated"]
+        assert len(os.listdir(store.files_dir)) == 1
+
+    def test_job_status_follows_documents(self, store):
+        job_id, _, _ = _submit(store, ("a.pdf", b"one"), ("b.pdf", b"two"))
+        assert store.job(job_id)["status"] == "queued"
+        first = store.claim_next()
+        assert store.job(job_id)["status"] == "running"
+        store.finish(first[0], result={"filename": first[1]})
+        second = store.claim_next()
+        store.finish(second[0], error="broken")
+        job = store.job(job_id)
+        assert job["status"] == "completed_with_errors"
+        assert job["counts"] == {"queued": 0, "running": 0, "completed": 1, "failed": 1}
+        assert store.file(job_id, 0)["result"] == {"filename": "a.pdf"}
+        assert store.file(job_id, 1)["error"] == "broken"
+        assert store.claim_next() is None
+        assert store.job("missing") is None and store.file(job_id, 5) is None
+
+    def test_failed_content_is_retried_on_upload(self, store):
+        _submit(store, ("a.pdf", b"one"))
+        store.finish(store.claim_next()[0], error="broken")
+        _, files, queued = _submit(store, ("a.pdf", b"one"))
+        assert queued == 1 and not files[0]["deduplicated"]
+
+    def test_results_from_other_rules_are_queued_again(self, tmp_path):
+        paths = (str(tmp_path / "versioned.sqlite3"), str(tmp_path / "versioned"))
+        old = JobStore(*paths, rules_version="v1")
+        _submit(old, ("a.pdf", b"one"))
+        old.finish(old.claim_next()[0], result={"rules": "v1"})
+        _, files, queued = _submit(old, ("again.pdf", b"one"))
+        assert queued == 0 and files[0]["deduplicated"]
+        old.close()
+
+        new = JobStore(*paths, rules_version="v2")
+        try:
+            job_id, files, queued = _submit(new, ("again.pdf", b"one"))
+            assert queued == 1 and not files[0]["deduplicated"]
+            assert new.job(job_id)["status"] == "queued"
+            new.finish(new.claim_next()[0], result={"rules": "v2"})
+            assert new.file(job_id, 0)["result"] == {"rules": "v2"}
+            _, _, queued = _submit(new, ("third.pdf", b"one"))
+            assert queued == 0
+        finally:
+            new.close()
+
+    def test_store_without_rules_versions_is_upgraded(self, tmp_path):
+        import sqlite3
+
+        db_path = str(tmp_path / "old.sqlite3")
+        db = sqlite3.connect(db_path)
+        db.execute(
+            "CREATE TABLE documents (sha256 TEXT PRIMARY KEY, filename TEXT NOT NULL, status TEXT NOT NULL, "
+            "result TEXT, error TEXT, queued_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        db.execute("INSERT INTO documents VALUES (?, 'a.pdf', 'completed', '{}', NULL, 0, 0, 0)",
+                   (hashlib.sha256(b"one").hexdigest(),))
+        db.commit()
+        db.close()
+        store = JobStore(db_path, str(tmp_path / "files"), rules_version="v1")
+        try:
+            _, _, queued = _submit(store, ("a.pdf", b"one"))
+            assert queued == 1
+        finally:
+            store.close()
+
+    def test_failed_submit_leaves_uploads_in_place(self, store):
+        stored = []
+        for content in (b"one", b"two"):
+            sha256, path = store.store_upload(io.BytesIO(content))
+            stored.append(("a.pdf", sha256, path))
+        stored[1] = (None, *stored[1][1:])  # NOT NULL filename: the INSERT fails after the first file
+        with pytest.raises(Exception):
+            store.submit(stored)
+        assert all(os.path.exists(path) for _, _, path in stored)
+        assert not os.path.exists(store.document_path(stored[0][1]))
+        assert store.claim_next() is None
+
+    def test_running_documents_are_requeued_after_restart(self, tmp_path, store):
+        _submit(store, ("a.pdf", b"one"), ("b.pdf", b"two"))
+        store.claim_next()
+        store.close()
+        reopened = JobStore(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "files"))
+        try:
+            assert reopened.recover() == 2
+        finally:
+            reopened.close()
+
+
+def test_runner_analyzes_documents_concurrently(store):
+    async def process(path, sha256, filename):
+        assert os.path.exists(path)
+        await asyncio.sleep(0.2)
+        return {"filename": filename}
+
+    async def run():
+        runner = JobRunner(store, process, workers=4)
+        runner.start()
+        job_id, _, queued = _submit(store, *((f"{i}.pdf", bytes([i])) for i in range(4)))
+        start = time.perf_counter()
+        runner.notify(queued)
+        while store.job(job_id)["status"] != "completed":
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        await runner.stop()
+        return elapsed
+
+    # As long as the slowest file, not the sum of all four
+    assert asyncio.run(run()) < 0.6
+
+
+def test_runner_survives_store_errors(store, monkeypatch):
+    import jobs
+
+    monkeypatch.setattr(jobs, "CLAIM_RETRY_SECONDS", 0)
+    claim_next, finish = store.claim_next, store.finish
+    failures = {"claim": 1, "finish": 1}
+
+    def flaky(name, method):
+        def call(*args, **kwargs):
+            if failures[name]:
+                failures[name] -= 1
+                raise RuntimeError(f"{name} failed")
+            return method(*args, **kwargs)
+        return call
+
+    monkeypatch.setattr(store, "claim_next", flaky("claim", claim_next))
+    monkeypatch.setattr(store, "finish", flaky("finish", finish))
+
+    async def process(path, sha256, filename):
+        return {"filename": filename}
+
+    async def run():
+        runner = JobRunner(store, process, workers=1)
+        runner.start()
+        job_id, _, queued = _submit(store, ("a.pdf", b"one"), ("b.pdf", b"two"))
+        runner.notify(queued)
+        for _ in range(500):
+            if store.job(job_id)["counts"]["completed"]:
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+        return store.job(job_id)["counts"]
+
+    # The first claim failed and was retried; the first finish failed and
+    # left its document running, but the worker went on to the next one
+    counts = asyncio.run(run())
+    assert counts == {"queued": 0, "running": 1, "completed": 1, "failed": 0}
+    assert failures == {"claim": 0, "finish": 0}
+
+
+def test_jobs_api(tmp_path, monkeypatch):
+    pytest.importorskip("multipart")
+    from fastapi.testclient import TestClient
+    import main
+    from extraction import PageExtractor
+
+    monkeypatch.setattr(main, "JOBS_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(main, "page_extractor", PageExtractor(0))
+    risky = build_pdf([["重要事項説明書"], ["本建物は旧耐震です。"]])
+    plain = build_pdf([["特記事項なし"]])
+
+    def wait(client, job_id):
+        for _ in range(500):
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["status"] not in ("queued", "running"):
+                return job
+            time.sleep(0.01)
+        raise AssertionError(f"job {job_id} did not finish")
+
+    with TestClient(main.app) as client:
+        response = client.post("/jobs", files=[
+            ("files", ("a.pdf", risky, "application/pdf")),
+            ("files", ("b.pdf", plain, "application/pdf")),
+            ("files", ("building_inspection.pdf", plain, "application/pdf")),
+            ("files", ("broken.pdf", b"not a pdf", "application/pdf")),
+        ])
+        assert response.status_code == 202
+        created = response.json()
+        assert [f["deduplicated"] for f in created["files"]] == [False, False, True, False]
+
+        job = wait(client, created["job_id"])
+        assert job["status"] == "completed_with_errors"
+        assert [f["status"] for f in job["files"]] == ["completed", "completed", "completed", "failed"]
+
+        first = client.get(f"/jobs/{job['job_id']}/files/0").json()
+        assert first["result"]["document_type"] == "important_matter_explanation"
+        assert [flag["category"] for flag in first["result"]["risk_flags"]] == ["earthquake_resistance"]
+        assert first["result"]["page_count"] == 2
+        # Shared analysis, but each upload keeps its own filename
+        copy = client.get(f"/jobs/{job['job_id']}/files/2").json()
+        assert copy["result"]["filename"] == "building_inspection.pdf"
+        assert copy["result"]["document_type"] == "building_inspection"
+        assert client.get(f"/jobs/{job['job_id']}/files/1").json()["result"]["document_type"] == "other"
+
+        # Already analyzed content completes without being queued again
+        again = client.post("/jobs", files=[("files", ("c.pdf", risky, "application/pdf"))]).json()
+        assert again["files"][0]["deduplicated"]
+        assert client.get(f"/jobs/{again['job_id']}").json()["status"] == "completed"
+
+        assert client.get("/jobs/missing").status_code == 404
+        assert client.get(f"/jobs/{job['job_id']}/files/9").status_code == 404
+        bad = client.post("/jobs", files=[("files", ("notes.txt", b"x", "text/plain"))])
+        assert bad.status_code == 400
@@ -0,0 +1,98 @@
+"""
+Tests for the single-pass keyword scanner and match offsets in /analyze.
+"""
+import sys
+import os
+import random
+
+import pytest
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+sys.path.insert(0, os.path.join(_service_dir, "benchmarks"))
+
+import main
+from scanner import KeywordMatch, KeywordScanner
+
+
+def _naive(keywords, pages):
+    """Every occurrence of every keyword via str.find, for comparison."""
+    found = []
+    for number, text in enumerate(pages, start=1):
+        for keyword in keywords:
+            i = text.find(keyword)
+            while i != -1:
+                found.append(KeywordMatch(keyword, number, i, i + len(keyword)))
+                i = text.find(keyword, i + 1)
+    return sorted(found, key=lambda m: (m.page, m.start, m.keyword))
+
+
+class TestKeywordScanner:
+    def test_offsets_per_page(self):
+        scanner = KeywordScanner(["旧耐震", "浸水"])
+        matches = scanner.scan(["本物件は旧耐震基準です。", "浸水想定区域。", "再び浸水"])
+        assert matches == [
+            KeywordMatch("旧耐震", 1, 4, 7),
+            KeywordMatch("浸水", 2, 0, 2),
+            KeywordMatch("浸水", 3, 2, 4),
+        ]
+
+    def test_overlapping_and_nested_keywords(self):
+        scanner = KeywordScanner(["差押", "仮差押", "差押登記", "登記"])
+        found = {(m.keyword, m.start) for m in scanner.scan_page("仮差押登記あり")}
+        assert found == {("仮差押", 0), ("差押", 1), ("差押登記", 1), ("登記", 3)}
+
+    def test_matches_naive_search_on_random_text(self):
+        keywords = [k for p in main.RISK_PATTERNS for k in p["keywords"]] + ["所在", "所有者", "重説", "重要事項"]
+        alphabet = "".join(sorted(set("".join(keywords)))) + "のはをにです。\n"
+        rng = random.Random(0)
+        pages = ["".join(rng.choice(alphabet) for _ in range(2000)) for _ in range(5)]
+        # Plant every keyword at least once
+        pages[0] += "".join(keywords)
+        scanner = KeywordScanner(keywords)
+        got = sorted(scanner.scan(pages), key=lambda m: (m.page, m.start, m.keyword))
+        assert got == _naive(keywords, pages)
+
+    def test_straddling_keywords(self):
+        # Keywords overlapping each other in every way: contained, prefix,
+        # suffix-prefix straddles and self-overlap
+        keywords = ["ab", "bc", "abc", "c", "ca", "aa", "借地権", "権利者", "地上権", "定期借地"]
+        rng = random.Random(1)
+        pages = ["".join(rng.choice("abc") for _ in range(3000)), "定期借地上権利者。借地権利者"]
+        got = sorted(KeywordScanner(keywords).scan(pages), key=lambda m: (m.page, m.start, m.keyword))
+        assert got == _naive(keywords, pages)
+
+    def test_needs_keywords(self):
+        with pytest.raises(ValueError):
+            KeywordScanner([])
+
+
+class TestAnalysisFromMatches:
+    def test_scanned_matches_give_same_results(self):
+        pages = ["重要事項説明書", "所在：東京都 面積 65㎡ 旧耐震", "管理費滞納あり。差押"]
+        text = "\n".join(pages)
+        matches = main.scan_keywords(pages)
+        assert main.detect_risk_flags(text, matches) == main.detect_risk_flags(text)
+        assert main.classify_document_type(text, "a.pdf", matches) == main.DocumentType.important_matter
+        assert main.extract_key_facts(text, matches) == {"has_location": True, "has_area_info": True}
+
+    def test_filename_hint_still_classifies(self):
+        assert main.classify_document_type("", "Building_Inspection.pdf") == main.DocumentType.building_inspection
+
+
+def test_analyze_reports_match_offsets():
+    pytest.importorskip("multipart")
+    from fastapi.testclient import TestClient
+    from synthetic_pdf import build_pdf
+
+    pdf = build_pdf([["重要事項説明書"], ["本建物は旧耐震。仮差押の登記あり。"]])
+    response = TestClient(main.app).post("/analyze", files={"file": ("doc.pdf", pdf, "application/pdf")})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["document_type"] == "registry_transcript"  # 登記 is checked first
+    assert {flag["category"] for flag in body["risk_flags"]} == {"earthquake_resistance", "legal_encumbrance"}
+    hits = {(hit["keyword"], hit["kind"], hit["page"], hit["start"], hit["end"]) for hit in body["matches"]}
+    assert ("重要事項", "document_type", 1, 0, 4) in hits
+    assert ("旧耐震", "risk", 2, 4, 7) in hits
+    assert ("仮差押", "risk", 2, 8, 11) in hits and ("差押", "risk", 2, 9, 11) in hits
+    assert ("登記", "document_type", 2, 12, 14) in hits
@@ -0,0 +1,115 @@
+"""
+Tests for streaming page-by-page analysis (/analyze/stream).
+"""
+import sys
+import os
+import json
+
+import pytest
+
+pytest.importorskip("multipart")
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+sys.path.insert(0, os.path.join(_service_dir, "benchmarks"))
+
+from fastapi.testclient import TestClient
+
+import main
+
+PAGES = [
+    "重要事項説明書\n所在　東京都渋谷区",
+    "本建物は旧耐震基準です。",
+    "旧耐震。浸水想定区域。",
+    "専有面積 65㎡",
+]
+
+
+class _FakePage:
+    def __init__(self, text):
+        self.text = text
+
+    def extract_text(self):
+        return self.text
+
+
+class _FakeReader:
+    def __init__(self, stream):
+        self.pages = [_FakePage(text) for text in PAGES]
+        self.resolved_objects = {}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "PdfReader", _FakeReader)
+    return TestClient(main.app)
+
+
+def _events(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_events_arrive_page_by_page(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(main.tempfile, "tempdir", str(tmp_path))
+    response = client.post("/analyze/stream", files={"file": ("doc.pdf", b"%PDF", "application/pdf")})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = _events(response)
+    assert [e["event"] for e in events] == [
+        "start", "page", "page", "risk_flag", "page", "risk_flag", "page", "summary",
+    ]
+    assert events[0]["page_count"] == 4
+    # Each flag is reported once, on the first page it appears on
+    flags = [(e["page"], e["flag"]["category"]) for e in events if e["event"] == "risk_flag"]
+    assert flags == [(2, "earthquake_resistance"), (3, "natural_hazard")]
+    assert events[2]["matches"][0] == {
+        "keyword": "旧耐震", "kind": "risk", "category": "earthquake_resistance", "page": 2, "start": 4, "end": 7,
+    }
+    # The spooled upload is removed once the stream ends
+    assert os.listdir(tmp_path) == []
+
+
+def test_summary_matches_non_streaming_analysis():
+    from synthetic_pdf import build_pdf
+
+    pdf = build_pdf([text.split("\n") for text in PAGES])
+    client = TestClient(main.app)
+    summary = _events(client.post("/analyze/stream", files={"file": ("doc.pdf", pdf, "application/pdf")}))[-1]
+    batch = client.post("/analyze", files={"file": ("doc.pdf", pdf, "application/pdf")}).json()
+    for field in ("document_type", "page_count", "risk_flags", "key_facts", "status"):
+        assert summary[field] == batch[field]
+
+
+def test_sse_format(client):
+    response = client.post(
+        "/analyze/stream", params={"format": "sse"}, files={"file": ("doc.pdf", b"%PDF", "application/pdf")}
+    )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    messages = response.text.strip().split("\n\n")
+    assert messages[0].startswith("event: start\ndata: ")
+    assert json.loads(messages[-1].split("data: ", 1)[1])["page_count"] == 4
+
+
+def test_errors_are_reported_in_band(monkeypatch):
+    def broken(stream):
+        raise ValueError("not a PDF")
+
+    monkeypatch.setattr(main, "PdfReader", broken)
+    response = TestClient(main.app).post("/analyze/stream", files={"file": ("doc.pdf", b"junk", "application/pdf")})
+    assert _events(response) == [{"event": "error", "detail": "not a PDF"}]
+
+
+def test_rejects_non_pdf_and_unknown_format(client):
+    assert client.post("/analyze/stream", files={"file": ("doc.txt", b"x", "text/plain")}).status_code == 400
+    response = client.post(
+        "/analyze/stream", params={"format": "xml"}, files={"file": ("doc.pdf", b"%PDF", "application/pdf")}
+    )
+    assert response.status_code == 400
+
+
+def test_real_pdf():
+    with open(os.path.join(_service_dir, "mock.pdf"), "rb") as f:
+        response = TestClient(main.app).post("/analyze/stream", files={"file": ("mock.pdf", f, "application/pdf")})
+    events = _events(response)
+    assert events[1]["text"].startswith("Hello IKIGAI")
+    assert events[-1]["event"] == "summary" and events[-1]["page_count"] == 1
@@ -0,0 +1,101 @@
+"""
+Micro-batching coalescer for provider embedding calls.
+
+Concurrent /embed requests for the same (model, input_type) are gathered for
+up to ``max_wait_ms`` or until ``max_batch`` texts are pending, then sent to
+the provider as a single call. Each caller gets back only its own rows.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+EmbedFn = Callable[[List[str], str, str], Awaitable[np.ndarray]]
+
+# Cohere accepts at most 96 texts per embed call.
+PROVIDER_MAX_BATCH = 96
+
+
+class _PendingBatch:
+    __slots__ = ("items", "size", "timer")
+
+    def __init__(self):
+        self.items: List[Tuple[List[str], asyncio.Future]] = []
+        self.size = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class EmbedCoalescer:
+    """Coalesces concurrent embedding requests into batched provider calls."""
+
+    def __init__(self, embed_fn: EmbedFn, max_wait_ms: float = 5.0, max_batch: int = PROVIDER_MAX_BATCH):
+        self.embed_fn = embed_fn
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self._pending: Dict[Tuple[str, str], _PendingBatch] = {}
+        self._inflight = set()
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+
+    async def embed(self, texts: List[str], model: str, input_type: str) -> np.ndarray:
+        """Embed texts as part of the next batch for (model, input_type)."""
+        self.requests += 1
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        chunks = [texts[i:i + self.max_batch] for i in range(0, len(texts), self.max_batch)]
+        futures = [self._submit(chunk, (model, input_type)) for chunk in chunks]
+        results = await asyncio.gather(*futures)
+        return np.concatenate(results) if len(results) != 1 else results[0]
+
+    def _submit(self, texts: List[str], key: Tuple[str, str]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(key)
+        if batch is not None and batch.size + len(texts) > self.max_batch:
+            self._flush(key)
+            batch = None
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch()
+            batch.timer = loop.call_later(self.max_wait, self._flush, key)
+
+        future = loop.create_future()
+        batch.items.append((texts, future))
+        batch.size += len(texts)
+        self.texts += len(texts)
+        if batch.size >= self.max_batch:
+            self._flush(key)
+        return future
+
+    def _flush(self, key: Tuple[str, str]):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        task = asyncio.ensure_future(self._run(key, batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, key: Tuple[str, str], batch: _PendingBatch):
+        # Texts requested by several callers in the same window are sent once.
+        unique = list(dict.fromkeys(t for texts, _ in batch.items for t in texts))
+        self.batches += 1
+        try:
+            vectors = await self.embed_fn(unique, *key)
+        except Exception as e:
+            for _, future in batch.items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        row = {text: i for i, text in enumerate(unique)}
+        for texts, future in batch.items:
+            if not future.done():
+                future.set_result(vectors[[row[t] for t in texts]])
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "texts": self.texts,
+            "provider_calls": self.batches,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+        }
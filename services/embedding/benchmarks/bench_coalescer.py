@@ -0,0 +1,66 @@
+"""
+Benchmark: /embed fan-out with and without the micro-batching coalescer.
+
+Simulates a provider with a fixed per-call overhead and a limited number of
+concurrent connections, then fires many concurrent small embed requests.
+
+Usage:
+    python benchmarks/bench_coalescer.py [--requests 500] [--call-ms 40]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from batcher import EmbedCoalescer
+from main import generate_mock_embeddings
+
+
+class SimulatedProvider:
+    def __init__(self, call_ms: float, per_text_ms: float, connections: int):
+        self.call_s = call_ms / 1000
+        self.per_text_s = per_text_ms / 1000
+        self.slots = asyncio.Semaphore(connections)
+        self.calls = 0
+
+    async def __call__(self, texts, model, input_type):
+        async with self.slots:
+            self.calls += 1
+            await asyncio.sleep(self.call_s + self.per_text_s * len(texts))
+            return generate_mock_embeddings(texts).astype(np.float32)
+
+
+async def _run(args, coalesce: bool):
+    provider = SimulatedProvider(args.call_ms, args.per_text_ms, args.connections)
+    embed = EmbedCoalescer(provider, max_wait_ms=args.window_ms).embed if coalesce else provider
+    texts = [[f"検索クエリ {i}"] for i in range(args.requests)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(embed(t, "mock", "search_query") for t in texts))
+    return time.perf_counter() - start, provider.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--call-ms", type=float, default=40.0)
+    parser.add_argument("--per-text-ms", type=float, default=0.2)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for label, coalesce in (("direct", False), ("coalesced", True)):
+        elapsed, calls = asyncio.run(_run(args, coalesce))
+        print(
+            f"{label:10s} {elapsed * 1000:8.1f} ms  "
+            f"{args.requests / elapsed:8.0f} req/s  provider_calls={calls}"
+        )
+
+
+if __name__ == "__main__":
+    main()
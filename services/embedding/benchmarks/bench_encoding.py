@@ -0,0 +1,52 @@
+"""
+Benchmark: /embed response size and serialization time per encoding.
+
+Usage:
+    python benchmarks/bench_encoding.py [--texts 96] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from encoding import encode_base64, encode_binary
+from main import EmbedResponse, generate_mock_embeddings
+
+
+def _best_of(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=96)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    matrix = generate_mock_embeddings([f"物件 {i}" for i in range(args.texts)]).astype(np.float32)
+
+    encoders = {
+        "json (pydantic)": lambda: EmbedResponse(embeddings=matrix.tolist()).model_dump_json().encode(),
+        "base64 float32": lambda: json.dumps(encode_base64(matrix, "float32")).encode(),
+        "base64 float16": lambda: json.dumps(encode_base64(matrix, "float16")).encode(),
+        "binary float32": lambda: encode_binary(matrix, "float32"),
+        "binary float16": lambda: encode_binary(matrix, "float16"),
+    }
+    print(f"texts={args.texts} dim={matrix.shape[1]}")
+    for label, encode in encoders.items():
+        elapsed, body = _best_of(encode, args.repeat)
+        print(f"{label:16s} {len(body) / 1024:9.1f} KiB  {elapsed * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: IVF listing index build time, query latency and recall@k.
+
+Vectors are drawn from a Gaussian mixture (real embeddings are clustered,
+uniform random vectors are not) and normalized to unit length. Recall is
+measured against an exact scan over the same vectors.
+
+Usage:
+    python benchmarks/bench_index.py [--n 200000] [--dim 1024] [--nlist 1024]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from index import VectorIndex
+
+WARDS = ["Shibuya", "Minato", "Meguro", "Setagaya", "Shinjuku", "Chuo", "Chiyoda", "Nakano"]
+
+
+def clustered_unit_vectors(n, dim, clusters, rng):
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        m = min(100_000, n - start)
+        labels = rng.integers(0, clusters, m)
+        out[start:start + m] = centers[labels] + 0.6 * rng.standard_normal((m, dim)).astype(np.float32)
+    out /= np.linalg.norm(out, axis=1, keepdims=True)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = clustered_unit_vectors(args.n, args.dim, 2000, rng)
+    queries = clustered_unit_vectors(args.queries, args.dim, 2000, np.random.default_rng(1))
+    ids = [f"prop_{i}" for i in range(args.n)]
+    wards = [WARDS[i % len(WARDS)] for i in range(args.n)]
+    prices = rng.uniform(2e7, 2e8, args.n).tolist()
+
+    index = VectorIndex(args.dim, nlist=args.nlist, train_size=args.n + 1)
+    start = time.perf_counter()
+    index.add(ids, vectors, wards, prices)
+    insert_s = time.perf_counter() - start
+    start = time.perf_counter()
+    index.train()
+    train_s = time.perf_counter() - start
+    print(f"n={args.n} dim={args.dim} nlist={args.nlist}: insert {insert_s:.1f}s, train {train_s:.1f}s, "
+          f"vectors {vectors.nbytes / 2**20:.0f} MiB")
+
+    exact = [set(np.argsort(-(vectors @ q))[:args.k].tolist()) for q in queries]
+
+    for nprobe in (4, 16, 32, 64, 128):
+        latencies, recall = [], 0.0
+        for q, truth in zip(queries, exact):
+            start = time.perf_counter()
+            hits = index.search(q, k=args.k, nprobe=nprobe)
+            latencies.append(time.perf_counter() - start)
+            recall += len({int(h.id[5:]) for h in hits} & truth) / args.k
+        lat = np.array(latencies) * 1000
+        print(f"nprobe={nprobe:3d}  p50={np.percentile(lat, 50):6.2f}ms  p99={np.percentile(lat, 99):6.2f}ms  "
+              f"recall@{args.k}={recall / len(queries):.3f}")
+
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, k=args.k, ward="Minato", min_price=5e7, max_price=1e8)
+        latencies.append(time.perf_counter() - start)
+    lat = np.array(latencies) * 1000
+    print(f"filtered (ward+price) nprobe={index.nprobe}  p50={np.percentile(lat, 50):6.2f}ms  "
+          f"p99={np.percentile(lat, 99):6.2f}ms")
+
+    start = time.perf_counter()
+    scan = [np.argpartition(-(vectors @ q), args.k)[:args.k] for q in queries[:20]]
+    print(f"exact scan: {(time.perf_counter() - start) / 20 * 1000:.2f}ms/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Benchmark: scalar vs batch mock embedding generation.
+
+Usage:
+    python benchmarks/bench_mock_embedding.py [--texts 256] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from main import generate_mock_embedding, generate_mock_embeddings
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = [f"渋谷区の{i}LDKマンション 駅徒歩{i % 20}分" for i in range(args.texts)]
+
+    scalar = _best_of(lambda: [generate_mock_embedding(t, args.dim) for t in texts], args.repeat)
+    batch = _best_of(lambda: generate_mock_embeddings(texts, args.dim), args.repeat)
+
+    print(f"texts={args.texts} dim={args.dim}")
+    print(f"scalar: {scalar * 1000:8.2f} ms  ({args.texts / scalar:10.0f} texts/s)")
+    print(f"batch:  {batch * 1000:8.2f} ms  ({args.texts / batch:10.0f} texts/s)")
+    print(f"speedup: {scalar / batch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
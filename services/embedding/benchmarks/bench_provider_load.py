@@ -0,0 +1,82 @@
+"""
+Load benchmark: /embed and /health latency with a slow blocking provider.
+
+Replaces the provider with a synchronous call that sleeps for --provider-ms
+(simulating the Cohere network round trip) and drives the app in-process.
+"blocking" calls the provider directly on the event loop, as the handler
+used to; "executor" uses the bounded provider pool.
+
+Usage:
+    python benchmarks/bench_provider_load.py [--requests 64] [--provider-ms 100]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("EMBED_CACHE_SIZE", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx
+import numpy as np
+
+import main
+
+
+def _percentile(samples, q):
+    return float(np.percentile(np.array(samples) * 1000, q))
+
+
+async def _timed(client, method, url, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def _run(args):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        embeds = [
+            _timed(client, "POST", "/embed", json={"texts": [f"物件 {i}"]})
+            for i in range(args.requests)
+        ]
+        health = [_timed(client, "GET", "/health") for _ in range(args.requests)]
+        results = await asyncio.gather(*embeds, *health)
+    return results[:args.requests], results[args.requests:]
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--provider-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    provider_s = args.provider_ms / 1000
+    # Each request becomes its own provider call, as without coalescing.
+    main.embed_coalescer.max_batch = 1
+
+    def slow_provider(texts, model, input_type):
+        time.sleep(provider_s)
+        return main.generate_mock_embeddings(texts).astype(np.float32)
+
+    async def blocking(texts, model, input_type):
+        return slow_provider(texts, model, input_type)
+
+    async def pooled(texts, model, input_type):
+        return await main.provider_executor.run(slow_provider, texts, model, input_type)
+
+    print(f"requests={args.requests} provider={args.provider_ms:.0f}ms "
+          f"pool={main.provider_executor.max_concurrency}")
+    for label, embed_fn in (("blocking", blocking), ("executor", pooled)):
+        main.embed_coalescer.embed_fn = embed_fn
+        embed_lat, health_lat = asyncio.run(_run(args))
+        print(
+            f"{label:9s} /embed p50={_percentile(embed_lat, 50):8.1f}ms p99={_percentile(embed_lat, 99):8.1f}ms  "
+            f"/health p50={_percentile(health_lat, 50):8.1f}ms p99={_percentile(health_lat, 99):8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,73 @@
+"""
+Benchmark: recall@k vs. memory for the index codecs.
+
+Builds the same IVF index over mock embeddings of synthetic listing texts
+with each codec, with and without exact re-ranking, and compares the top-k
+against an exact scan. Queries are mock embeddings of perturbed listings.
+
+Usage:
+    python benchmarks/bench_quantization.py [--n 50000] [--k 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from index import VectorIndex
+from main import generate_mock_embeddings
+
+WARDS = ["渋谷区", "港区", "目黒区", "世田谷区", "新宿区", "中央区"]
+
+
+def mock_vectors(n: int, prefix: str) -> np.ndarray:
+    out = np.empty((n, 1024), dtype=np.float32)
+    for start in range(0, n, 10_000):
+        texts = [
+            f"{prefix}{WARDS[i % len(WARDS)]}の{i % 4 + 1}LDK 築{i % 40}年 物件{i}"
+            for i in range(start, min(start + 10_000, n))
+        ]
+        out[start:start + len(texts)] = generate_mock_embeddings(texts)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, default=32)
+    args = parser.parse_args()
+
+    vectors = mock_vectors(args.n, "")
+    queries = mock_vectors(args.queries, "検索: ")
+    ids = [str(i) for i in range(args.n)]
+    exact = [set(np.argsort(-(vectors @ q))[:args.k].tolist()) for q in queries]
+
+    print(f"n={args.n} dim=1024 nlist={args.nlist} nprobe={args.nprobe} k={args.k}")
+    print(f"{'codec':8s} {'rerank':>6s} {'bytes/vec':>9s} {'ratio':>6s} {'recall':>7s} {'p50 ms':>7s}")
+    for codec in (None, "sq8", "pq256", "pq128"):
+        index = VectorIndex(1024, nlist=args.nlist, nprobe=args.nprobe, train_size=args.n + 1, codec=codec)
+        index.add(ids, vectors)
+        index.train()
+        bytes_per_vector = index.codec.code_size if codec else 4096
+        for rerank in ((0,) if codec is None else (0, 4)):
+            index.rerank = rerank
+            latencies, recall = [], 0.0
+            for q, truth in zip(queries, exact):
+                start = time.perf_counter()
+                hits = index.search(q, k=args.k)
+                latencies.append(time.perf_counter() - start)
+                recall += len({int(h.id) for h in hits} & truth) / args.k
+            print(
+                f"{codec or 'float32':8s} {rerank:6d} {bytes_per_vector:9d} {4096 / bytes_per_vector:5.0f}x "
+                f"{recall / len(queries):7.3f} {np.median(latencies) * 1000:7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Content-addressed embedding cache.
+
+Entries are keyed by (model, input_type, sha256(text)) so identical texts are
+only ever embedded once per model. Two tiers:
+
+- an in-memory LRU bounded by entry count
+- an optional on-disk tier backed by a memory-mapped ``.npy`` ring buffer,
+  which survives restarts
+
+Vectors are stored as float32, the precision providers return them in.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def make_cache_key(model: str, input_type: str, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}|{input_type}|{digest}"
+
+
+def _key_tag(key: str) -> int:
+    """64-bit hash of a cache key, stored beside its vector on disk."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class DiskEmbeddingStore:
+    """
+    Fixed-capacity on-disk vector store.
+
+    Vectors live in a memory-mapped ``vectors.npy`` of shape (capacity, dim)
+    used as a ring buffer; ``keys.log`` is an append-only log of
+    ``slot<TAB>key`` lines that is replayed on open. When the ring wraps, the
+    oldest slot is overwritten.
+
+    ``tags.npy`` holds a hash of the key written into each slot. After a
+    crash the log can still name a slot that has since been reused, so a
+    lookup whose tag does not match the key is treated as a miss.
+    """
+
+    def __init__(self, path: str, capacity: int, dim: int):
+        self.path = path
+        self.capacity = capacity
+        self.dim = dim
+        os.makedirs(path, exist_ok=True)
+
+        vectors_path = os.path.join(path, "vectors.npy")
+        tags_path = os.path.join(path, "tags.npy")
+        self._log_path = os.path.join(path, "keys.log")
+
+        vectors = tags = None
+        if os.path.exists(vectors_path) and os.path.exists(tags_path):
+            vectors = np.load(vectors_path, mmap_mode="r+")
+            tags = np.load(tags_path, mmap_mode="r+")
+            if (
+                vectors.shape != (capacity, dim) or vectors.dtype != np.float32
+                or tags.shape != (capacity,) or tags.dtype != np.uint64
+            ):
+                # Layout changed since the store was written; start over.
+                del vectors, tags
+                vectors = tags = None
+        if vectors is None:
+            if os.path.exists(self._log_path):
+                os.remove(self._log_path)
+            vectors = np.lib.format.open_memmap(
+                vectors_path, mode="w+", dtype=np.float32, shape=(capacity, dim)
+            )
+            tags = np.lib.format.open_memmap(tags_path, mode="w+", dtype=np.uint64, shape=(capacity,))
+        self._vectors = vectors
+        self._tags = tags
+
+        self._slots: Dict[str, int] = {}
+        self._slot_keys: List[Optional[str]] = [None] * capacity
+        self._next_slot = 0
+        self._log_lines = 0
+        # Guards the log file object: sync() runs on a worker thread while
+        # puts (and compaction, which reopens the log) happen on the caller's.
+        self._log_lock = threading.Lock()
+        self._replay_log()
+        self._log = open(self._log_path, "a", encoding="utf-8")
+
+    def _replay_log(self):
+        if not os.path.exists(self._log_path):
+            return
+        with open(self._log_path, encoding="utf-8") as f:
+            for line in f:
+                slot_str, _, key = line.rstrip("\n").partition("\t")
+                if not key:
+                    continue  # Torn write from an unclean shutdown
+                self._assign(int(slot_str), key)
+                self._next_slot = (int(slot_str) + 1) % self.capacity
+                self._log_lines += 1
+
+    def _assign(self, slot: int, key: str):
+        old_key = self._slot_keys[slot]
+        if old_key is not None:
+            self._slots.pop(old_key, None)
+        self._slot_keys[slot] = key
+        self._slots[key] = slot
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        if int(self._tags[slot]) != _key_tag(key):
+            # The slot was reused but the log line saying so was lost
+            self._slots.pop(key)
+            self._slot_keys[slot] = None
+            return None
+        return np.array(self._vectors[slot])
+
+    def put(self, key: str, vector: np.ndarray):
+        if vector.shape != (self.dim,) or key in self._slots:
+            return
+        slot = self._next_slot
+        # Write the vector and its tag before logging the key so a key never
+        # points at a slot that was not filled.
+        self._vectors[slot] = vector
+        self._tags[slot] = _key_tag(key)
+        self._assign(slot, key)
+        self._next_slot = (slot + 1) % self.capacity
+        with self._log_lock:
+            self._log.write(f"{slot}\t{key}\n")
+            self._log_lines += 1
+            if self._log_lines > 2 * self.capacity:
+                self._compact_log()
+
+    def _compact_log(self):
+        """Rewrite keys.log with only the live slot assignments."""
+        tmp_path = self._log_path + ".tmp"
+        # Oldest first, so the replayed ring pointer lands after the newest entry.
+        order = [(s + self._next_slot) % self.capacity for s in range(self.capacity)]
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for slot in order:
+                key = self._slot_keys[slot]
+                if key is not None:
+                    f.write(f"{slot}\t{key}\n")
+        self._log.close()
+        os.replace(tmp_path, self._log_path)
+        self._log = open(self._log_path, "a", encoding="utf-8")
+        self._log_lines = len(self._slots)
+
+    def sync(self):
+        """
+        Make logged keys durable; called after each batch of puts.
+
+        Safe to call from another thread. The fsync runs on a duplicate of the
+        log descriptor outside the lock, so puts are not held up by the disk
+        and a compaction that swaps the log meanwhile cannot close it under us.
+        """
+        with self._log_lock:
+            self._log.flush()
+            fd = os.dup(self._log.fileno())
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def flush(self):
+        self._vectors.flush()
+        self._tags.flush()
+        with self._log_lock:
+            self._log.flush()
+
+    def close(self):
+        self.flush()
+        with self._log_lock:
+            self._log.close()
+
+
+class EmbeddingCache:
+    """Two-tier (memory LRU + optional disk) embedding cache with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 10000, disk_store: Optional[DiskEmbeddingStore] = None):
+        self.max_entries = max_entries
+        self.disk = disk_store
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, model: str, input_type: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up each text; returns the cached vector or None per position."""
+        results: List[Optional[np.ndarray]] = []
+        for text in texts:
+            key = make_cache_key(model, input_type, text)
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            elif self.disk is not None and (vector := self.disk.get(key)) is not None:
+                self._remember(key, vector)
+                self.hits += 1
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+            results.append(vector)
+        return results
+
+    def put_many(self, model: str, input_type: str, texts: List[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        for text, vector in zip(texts, vectors):
+            key = make_cache_key(model, input_type, text)
+            vector = vector.copy()
+            self._remember(key, vector)
+            if self.disk is not None:
+                self.disk.put(key, vector)
+
+    def sync(self):
+        """fsync the disk tier's key log. Blocking: run it off the event loop."""
+        if self.disk is not None:
+            self.disk.sync()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._entries),
+            "disk_entries": len(self.disk) if self.disk is not None else 0,
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
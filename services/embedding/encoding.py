@@ -0,0 +1,112 @@
+"""
+Compact wire encodings for /embed responses.
+
+Clients opt in through the Accept header:
+
+- ``application/json`` (default): ``{"embeddings": [[...], ...]}``
+- ``application/x-embedding``: a 16-byte header followed by the raw
+  little-endian matrix, row-major
+- ``application/x-embedding+json``: ``{"dtype", "shape", "data"}`` with the
+  raw matrix base64-encoded in ``data``
+
+Both compact forms take a ``dtype`` media-type parameter, ``float32``
+(default) or ``float16``, e.g. ``Accept: application/x-embedding; dtype=float16``.
+
+Binary header layout (little-endian, 16 bytes)::
+
+    magic  4s   b"IKEM"
+    version B   1
+    dtype  B   1 = float32, 2 = float16
+    -      2x  reserved
+    rows   I
+    dim    I
+"""
+import base64
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+JSON_MEDIA_TYPE = "application/json"
+BINARY_MEDIA_TYPE = "application/x-embedding"
+BASE64_MEDIA_TYPE = "application/x-embedding+json"
+
+HEADER = struct.Struct("<4sBB2xII")
+MAGIC = b"IKEM"
+VERSION = 1
+
+DTYPES = {
+    "float32": (1, np.dtype("<f4")),
+    "float16": (2, np.dtype("<f2")),
+}
+
+
+def negotiate(accept: Optional[str]) -> Tuple[str, str]:
+    """
+    Pick the response encoding from an Accept header.
+
+    Returns (media_type, dtype). Falls back to JSON when nothing compact is
+    acceptable; raises ValueError for an unsupported dtype parameter.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE, "float32"
+
+    ranges = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        options = dict(p.split("=", 1) for p in params if "=" in p)
+        options = {k.strip().lower(): v.strip().strip('"') for k, v in options.items()}
+        try:
+            quality = float(options.pop("q", "1"))
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            ranges.append((-quality, position, media_type.lower(), options))
+
+    for _, _, media_type, options in sorted(ranges):
+        if media_type in (BINARY_MEDIA_TYPE, BASE64_MEDIA_TYPE):
+            dtype = options.get("dtype", "float32").lower()
+            if dtype not in DTYPES:
+                raise ValueError(f"Unsupported embedding dtype: {dtype}")
+            return media_type, dtype
+        if media_type in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            return JSON_MEDIA_TYPE, "float32"
+    return JSON_MEDIA_TYPE, "float32"
+
+
+def encode_binary(embeddings: np.ndarray, dtype: str = "float32") -> memoryview:
+    """
+    Serialize an (n, dim) matrix as header + raw little-endian values.
+
+    The matrix is written once, straight into the output buffer; the dtype
+    cast happens during that copy.
+    """
+    code, wire_dtype = DTYPES[dtype]
+    rows, dim = embeddings.shape
+    buffer = bytearray(HEADER.size + rows * dim * wire_dtype.itemsize)
+    HEADER.pack_into(buffer, 0, MAGIC, VERSION, code, rows, dim)
+    out = np.frombuffer(buffer, dtype=wire_dtype, offset=HEADER.size).reshape(rows, dim)
+    out[...] = embeddings
+    return memoryview(buffer)
+
+
+def encode_base64(embeddings: np.ndarray, dtype: str = "float32") -> dict:
+    """Serialize an (n, dim) matrix as base64 of its raw little-endian values."""
+    _, wire_dtype = DTYPES[dtype]
+    raw = np.ascontiguousarray(embeddings, dtype=wire_dtype)
+    return {
+        "dtype": dtype,
+        "shape": list(raw.shape),
+        "data": base64.b64encode(raw).decode("ascii"),
+    }
+
+
+def decode_binary(payload: bytes) -> np.ndarray:
+    """Inverse of encode_binary; returns a read-only view over the payload."""
+    magic, version, code, rows, dim = HEADER.unpack_from(payload, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not an embedding payload")
+    wire_dtype = next((d for c, d in DTYPES.values() if c == code), None)
+    if wire_dtype is None:
+        raise ValueError(f"Unknown embedding dtype code: {code}")
+    return np.frombuffer(payload, dtype=wire_dtype, count=rows * dim, offset=HEADER.size).reshape(rows, dim)
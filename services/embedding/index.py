@@ -0,0 +1,555 @@
+"""
+In-process approximate nearest neighbour index for listing embeddings.
+
+An IVF (inverted file) index over NumPy arrays:
+
+- a spherical k-means coarse quantizer splits the space into ``nlist`` cells
+- each listing is appended to the inverted list of its nearest centroid
+- a query scores the centroids, then only the listings in the ``nprobe``
+  closest cells, by inner product (cosine similarity on unit vectors)
+
+Until enough vectors exist to train the quantizer, search is an exact scan.
+Listings carry ward and price metadata so searches can be filtered; when a
+filter is selective the index probes more cells until it has ``k`` results.
+
+With a codec (see quantization.py) each listing's residual from its cell
+centroid is also stored compressed. Candidates are then scored from the
+codes, and only the best ``k * rerank`` are re-scored against the exact
+float32 vectors.
+
+Deletes are tombstones; once they make up ``compact_fraction`` of the
+in-RAM slots the slots are compacted, so repeated upserts do not grow the
+index. The quantizer is trained when ``train_size`` listings exist and
+retrained each time the index doubles; k-means and re-assignment run on a
+snapshot outside the lock, so searches keep being served meanwhile, and the
+result is swapped in at once. Searches and snapshot writes likewise hold the
+lock only while taking a view of the arrays. Snapshots are plain ``.npy`` files; a loaded
+snapshot keeps its float32 vectors memory-mapped on disk, with listings
+inserted afterwards held in RAM. A codec index served from a snapshot
+therefore keeps only the codes and metadata resident, and the exact
+vectors are paged in only for re-ranking.
+"""
+import array
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from quantization import make_codec
+
+_META_FILE = "meta.json"
+
+
+@dataclass
+class SearchHit:
+    id: str
+    score: float
+    ward: Optional[str]
+    price: Optional[float]
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Cluster unit vectors by inner product; returns (k, dim) unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(k + 1))
+        filled = np.flatnonzero(np.diff(bounds))
+        sums = np.zeros_like(centroids)
+        sums[filled] = np.add.reduceat(vectors[order], bounds[filled], axis=0)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        # Re-seed empty cells with random points so every list gets used.
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        norms[empty] = np.linalg.norm(sums[empty], axis=1, keepdims=True)
+        centroids = (sums / norms).astype(vectors.dtype)
+    return centroids
+
+
+def _grow(arr: np.ndarray, rows: int, keep: int, fill=0) -> np.ndarray:
+    out = np.full((rows,) + arr.shape[1:], fill, dtype=arr.dtype)
+    out[:keep] = arr[:keep]
+    return out
+
+
+class VectorIndex:
+    """IVF index with optional compressed codes, metadata filters and mmap snapshots."""
+
+    def __init__(
+        self,
+        dim: int,
+        nlist: int = 1024,
+        nprobe: int = 32,
+        train_size: Optional[int] = None,
+        codec: Optional[str] = None,
+        rerank: int = 4,
+        compact_fraction: float = 0.25,
+        compact_min: int = 1024,
+    ):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        # Train the quantizer once this many listings exist (~39 per cell,
+        # the usual rule of thumb for k-means quality).
+        self.train_size = train_size if train_size is not None else 39 * nlist
+        self.codec = make_codec(codec, dim) if codec else None
+        self.rerank = rerank
+        self.compact_fraction = compact_fraction
+        self.compact_min = compact_min
+
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._count = 0
+        # Slots [0, len(_base)) live in _base, which may be a read-only memmap
+        # from a snapshot; later slots live in the in-RAM _tail.
+        self._base = np.zeros((0, dim), dtype=np.float32)
+        self._tail = np.zeros((0, dim), dtype=np.float32)
+        self._codes: Optional[np.ndarray] = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._ward = np.zeros(0, dtype=np.int32)
+        self._price = np.zeros(0, dtype=np.float64)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._ids: List[Optional[str]] = []
+        self._slot_of: Dict[str, int] = {}
+        self._ward_names: List[str] = []
+        self._ward_codes: Dict[str, int] = {}
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[array.array] = []
+        # Listings when the quantizer was last trained; retrain at twice that
+        self._trained_size = 0
+        self._training = False
+        # Tombstoned slots in _tail (snapshot slots are reclaimed by save())
+        self._tail_dead = 0
+
+    # ── Bookkeeping ─────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _ward_code(self, ward: Optional[str]) -> int:
+        if ward is None:
+            return -1
+        code = self._ward_codes.get(ward)
+        if code is None:
+            code = self._ward_codes[ward] = len(self._ward_names)
+            self._ward_names.append(ward)
+        return code
+
+    def _reserve(self, extra: int):
+        needed = self._count + extra
+        if needed <= len(self._alive):
+            return
+        capacity = max(needed, 2 * len(self._alive), 1024)
+        count, n_base = self._count, len(self._base)
+
+        self._tail = _grow(self._tail, capacity - n_base, count - n_base)
+        self._alive = _grow(self._alive, capacity, count, False)
+        self._ward = _grow(self._ward, capacity, count, -1)
+        self._price = _grow(self._price, capacity, count, np.nan)
+        self._assign = _grow(self._assign, capacity, count, -1)
+        if self._codes is not None:
+            self._codes = _grow(self._codes, capacity, count)
+
+    def _vectors_at(self, slots: np.ndarray) -> np.ndarray:
+        n_base = len(self._base)
+        if n_base == 0:
+            return self._tail[slots]
+        in_base = slots < n_base
+        if in_base.all():
+            return self._base[slots]
+        out = np.empty((len(slots), self.dim), dtype=np.float32)
+        out[in_base] = self._base[slots[in_base]]
+        out[~in_base] = self._tail[slots[~in_base] - n_base]
+        return out
+
+    # ── Mutation ────────────────────────────────────────────────────────
+
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors: np.ndarray,
+        wards: Optional[Sequence[Optional[str]]] = None,
+        prices: Optional[Sequence[Optional[float]]] = None,
+    ):
+        """Insert listings, replacing any that already exist under the same id."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        n = len(ids)
+        wards = wards if wards is not None else [None] * n
+        prices = prices if prices is not None else [None] * n
+
+        with self._lock:
+            self.remove([i for i in ids if i in self._slot_of])
+            self._reserve(n)
+            start, end = self._count, self._count + n
+            n_base = len(self._base)
+            self._tail[start - n_base:end - n_base] = vectors
+            self._alive[start:end] = True
+            self._ward[start:end] = [self._ward_code(w) for w in wards]
+            self._price[start:end] = [np.nan if p is None else p for p in prices]
+            for slot, listing_id in enumerate(ids, start):
+                self._slot_of[listing_id] = slot
+            self._ids.extend(ids)
+            self._count = end
+
+            if self.is_trained:
+                self._assign_slots(np.arange(start, end))
+            needs_training = not self._training and (
+                len(self) >= 2 * self._trained_size if self.is_trained else len(self) >= self.train_size
+            )
+        if needs_training:
+            self.train()
+
+    def remove(self, ids: Sequence[str]) -> int:
+        """Tombstone listings by id; returns how many were present."""
+        removed = 0
+        with self._lock:
+            for listing_id in ids:
+                slot = self._slot_of.pop(listing_id, None)
+                if slot is not None:
+                    self._alive[slot] = False
+                    self._ids[slot] = None
+                    if slot >= len(self._base):
+                        self._tail_dead += 1
+                    removed += 1
+            self._maybe_compact()
+        return removed
+
+    def _maybe_compact(self):
+        """Drop tombstoned _tail slots once there are enough of them (lock held)."""
+        tail_slots = self._count - len(self._base)
+        if self._training or self._tail_dead < max(self.compact_min, self.compact_fraction * tail_slots):
+            return
+        n_base = len(self._base)
+        tail_live = np.flatnonzero(self._alive[n_base:self._count])
+        keep = np.concatenate([np.arange(n_base), n_base + tail_live])
+        count = len(keep)
+        capacity = max(count, 1024)
+
+        self._tail = _grow(self._tail[tail_live], capacity - n_base, len(tail_live))
+        self._alive = _grow(self._alive[keep], capacity, count, False)
+        self._ward = _grow(self._ward[keep], capacity, count, -1)
+        self._price = _grow(self._price[keep], capacity, count, np.nan)
+        self._assign = _grow(self._assign[keep], capacity, count, -1)
+        if self._codes is not None:
+            self._codes = _grow(self._codes[keep], capacity, count)
+        self._ids = [self._ids[slot] for slot in keep.tolist()]
+        self._slot_of = {listing_id: slot for slot, listing_id in enumerate(self._ids) if listing_id is not None}
+        self._count = count
+        self._tail_dead = 0
+        if self.is_trained:
+            self._lists = [array.array("q") for _ in range(len(self.centroids))]
+            live = np.flatnonzero(self._alive[:count])
+            self._append_to_lists(live, self._assign[live])
+
+    def train(self, sample_size: Optional[int] = None, iterations: int = 10):
+        """
+        Fit the coarse quantizer (and codec, if any) on live vectors, then
+        rebuild the inverted lists and codes.
+
+        The work runs on a snapshot of the slots that exist when training
+        starts, without holding the lock: slot contents never change once
+        written and compaction waits for training to finish, so searches
+        and inserts carry on against the old quantizer. Slots added in the
+        meantime are assigned under the lock when the result is swapped in.
+        """
+        with self._lock:
+            if self._training:
+                return
+            live = np.flatnonzero(self._alive[:self._count])
+            nlist = min(self.nlist, len(live))
+            if nlist == 0:
+                return
+            self._training = True
+            snapshot_count = self._count
+            vectors_at = self._vectors_view()
+        try:
+            sample_size = sample_size or max(self.train_size, 64 * nlist)
+            rng = np.random.default_rng(0)
+            sample = live if len(live) <= sample_size else np.sort(rng.choice(live, sample_size, replace=False))
+            sample_vectors = vectors_at(sample)
+            centroids = spherical_kmeans(sample_vectors, nlist, iterations)
+
+            codec = None
+            if self.codec is not None:
+                codec = make_codec(self.codec.spec, self.dim)
+                cells = np.argmax(sample_vectors @ centroids.T, axis=1)
+                codec.train(sample_vectors - centroids[cells])
+
+            assign, codes = self._assign_vectors(vectors_at, live, centroids, codec)
+            lists = [array.array("q") for _ in range(nlist)]
+            self._append_to_lists(live, assign, lists)
+
+            with self._lock:
+                self.centroids, self._lists = centroids, lists
+                if codec is not None:
+                    self.codec = codec
+                    self._codes = np.zeros((len(self._alive), codec.code_size), dtype=np.uint8)
+                    self._codes[live] = codes
+                self._assign[live] = assign
+                # Listings added or replaced while training ran
+                self._assign_slots(np.arange(snapshot_count, self._count))
+                self._trained_size = len(self)
+        finally:
+            with self._lock:
+                self._training = False
+                self._maybe_compact()
+
+    def _vectors_view(self):
+        """_vectors_at over the current arrays, for reading existing slots without the lock."""
+        base, tail = self._base, self._tail
+        n_base = len(base)
+
+        def vectors_at(slots: np.ndarray) -> np.ndarray:
+            in_base = slots < n_base
+            out = np.empty((len(slots), self.dim), dtype=np.float32)
+            out[in_base] = base[slots[in_base]]
+            out[~in_base] = tail[slots[~in_base] - n_base]
+            return out
+
+        return vectors_at
+
+    @staticmethod
+    def _assign_vectors(vectors_at, slots: np.ndarray, centroids: np.ndarray, codec, chunk: int = 65536):
+        """Nearest cell (and residual code) for each slot, in chunks."""
+        assign = np.empty(len(slots), dtype=np.int32)
+        codes = np.empty((len(slots), codec.code_size), dtype=np.uint8) if codec is not None else None
+        for start in range(0, len(slots), chunk):
+            vectors = vectors_at(slots[start:start + chunk])
+            cells = np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+            assign[start:start + len(cells)] = cells
+            if codec is not None:
+                codes[start:start + len(cells)] = codec.encode(vectors - centroids[cells])
+        return assign, codes
+
+    def _assign_slots(self, slots: np.ndarray):
+        assign, codes = self._assign_vectors(self._vectors_at, slots, self.centroids, self.codec)
+        self._assign[slots] = assign
+        if self.codec is not None:
+            self._codes[slots] = codes
+        self._append_to_lists(slots, assign)
+
+    def _append_to_lists(self, slots: np.ndarray, cells: np.ndarray, lists: Optional[List[array.array]] = None):
+        lists = self._lists if lists is None else lists
+        order = np.argsort(cells, kind="stable")
+        bounds = np.searchsorted(cells[order], np.arange(len(lists) + 1))
+        for cell in np.flatnonzero(np.diff(bounds)):
+            lists[cell].extend(slots[order[bounds[cell]:bounds[cell + 1]]].tolist())
+
+    # ── Search ──────────────────────────────────────────────────────────
+
+    def _filter_mask(self, slots: np.ndarray, ward, min_price, max_price) -> np.ndarray:
+        mask = self._alive[slots]
+        if ward is not None:
+            mask &= self._ward[slots] == self._ward_codes.get(ward, -2)
+        if min_price is not None:
+            mask &= self._price[slots] >= min_price
+        if max_price is not None:
+            mask &= self._price[slots] <= max_price
+        return mask
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        ward: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[SearchHit]:
+        """Top-k listings by inner product with the query, after filters."""
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        coarse = None
+        with self._lock:
+            # Only candidate selection needs the lock. Scoring runs on the
+            # arrays captured here: slot contents never change once written,
+            # and retraining and compaction swap in new arrays rather than
+            # rewriting these, so the view stays consistent without it.
+            if not self.is_trained:
+                slots = np.arange(self._count)
+                slots = slots[self._filter_mask(slots, ward, min_price, max_price)]
+            else:
+                slots, cell_scores = self._probe(query, k, ward, min_price, max_price, nprobe or self.nprobe)
+                if self.codec is not None:
+                    coarse = cell_scores[self._assign[slots]]
+                    codec, codes = self.codec, self._codes
+            vectors_at = self._vectors_view()
+            ids, ward_codes, prices, ward_names = self._ids, self._ward, self._price, self._ward_names
+
+        if coarse is None:
+            scores = vectors_at(slots) @ query
+        else:
+            scores = coarse + codec.score(query, codes[slots])
+            if self.rerank:
+                keep = self._top(scores, k * self.rerank)
+                slots = slots[keep]
+                scores = vectors_at(slots) @ query
+
+        hits = []
+        for i in self._top(scores, k):
+            slot = int(slots[i])
+            if ids[slot] is None:
+                continue  # Removed while the candidates were being scored
+            code = int(ward_codes[slot])
+            price = float(prices[slot])
+            hits.append(SearchHit(
+                id=ids[slot],
+                score=float(scores[i]),
+                ward=ward_names[code] if code >= 0 else None,
+                price=None if np.isnan(price) else price,
+            ))
+        return hits
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k highest scores, best first."""
+        top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def _probe(self, query, k, ward, min_price, max_price, nprobe) -> Tuple[np.ndarray, np.ndarray]:
+        cell_scores = self.centroids @ query
+        order = np.argsort(-cell_scores)
+        probed, found = 0, []
+        n_found = 0
+        # Widen the probe when filters leave fewer than k candidates.
+        while probed < len(order) and (probed < nprobe or n_found < k):
+            cells = order[probed:probed + max(nprobe, probed)]
+            probed += len(cells)
+            slots = np.concatenate([np.frombuffer(self._lists[c], dtype=np.int64) for c in cells])
+            slots = slots[self._filter_mask(slots, ward, min_price, max_price)]
+            found.append(slots)
+            n_found += len(slots)
+        slots = np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+        return slots, cell_scores
+
+    # ── Snapshots ───────────────────────────────────────────────────────
+
+    def save(self, path: str, chunk: int = 65536):
+        """
+        Write the live listings to a directory of .npy files plus metadata
+        JSON; tombstoned slots are left out.
+
+        The live slots and their metadata are copied under the lock; the
+        files are written from that copy, so searches and inserts carry on
+        while the snapshot is on its way to disk. Concurrent saves are
+        serialized.
+        """
+        os.makedirs(path, exist_ok=True)
+        with self._save_lock:
+            with self._lock:
+                live = np.flatnonzero(self._alive[:self._count])
+                n = len(live)
+                vectors_at = self._vectors_view()
+                arrays = {
+                    "alive.npy": self._alive[live],
+                    "ward.npy": self._ward[live],
+                    "price.npy": self._price[live],
+                    "assign.npy": self._assign[live],
+                }
+                codec = None
+                if self.is_trained:
+                    arrays["centroids.npy"] = self.centroids
+                    if self.codec is not None:
+                        codec = self.codec
+                        arrays["codes.npy"] = self._codes[live]
+                ids = list(self._ids)
+                meta = {
+                    "dim": self.dim,
+                    "nlist": self.nlist,
+                    "nprobe": self.nprobe,
+                    "train_size": self.train_size,
+                    "codec": self.codec.spec if self.codec is not None else None,
+                    "rerank": self.rerank,
+                    "count": n,
+                    "trained": self.is_trained,
+                    "wards": list(self._ward_names),
+                }
+            meta["ids"] = [ids[slot] for slot in live.tolist()]
+
+            # Written in chunks so a memory-mapped base is never fully loaded.
+            tmp_vectors = os.path.join(path, "vectors.tmp.npy")
+            out = np.lib.format.open_memmap(tmp_vectors, mode="w+", dtype=np.float32, shape=(n, self.dim))
+            for start in range(0, n, chunk):
+                out[start:start + chunk] = vectors_at(live[start:start + chunk])
+            out.flush()
+            del out
+            os.replace(tmp_vectors, os.path.join(path, "vectors.npy"))
+
+            for name, values in arrays.items():
+                np.save(os.path.join(path, name), values)
+            if codec is not None:
+                np.savez(os.path.join(path, "codec.npz"), **codec.state())
+            tmp = os.path.join(path, _META_FILE + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(tmp, os.path.join(path, _META_FILE))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorIndex":
+        """
+        Load a snapshot. With mmap=True the float32 vectors stay on disk and
+        are paged in on demand; listings added later are kept in RAM.
+        """
+        with open(os.path.join(path, _META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(
+            meta["dim"],
+            nlist=meta["nlist"],
+            nprobe=meta["nprobe"],
+            train_size=meta["train_size"],
+            codec=meta.get("codec"),
+            rerank=meta.get("rerank", 4),
+        )
+        index._count = meta["count"]
+        index._base = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        index._alive = np.load(os.path.join(path, "alive.npy"))
+        index._ward = np.load(os.path.join(path, "ward.npy"))
+        index._price = np.load(os.path.join(path, "price.npy"))
+        index._assign = np.load(os.path.join(path, "assign.npy"))
+        index._ids = meta["ids"]
+        index._slot_of = {i: s for s, i in enumerate(index._ids) if i is not None}
+        index._ward_names = meta["wards"]
+        index._ward_codes = {w: c for c, w in enumerate(index._ward_names)}
+        if meta["trained"]:
+            index.centroids = np.load(os.path.join(path, "centroids.npy"))
+            if index.codec is not None:
+                index._codes = np.load(os.path.join(path, "codes.npy"))
+                with np.load(os.path.join(path, "codec.npz")) as state:
+                    index.codec.load_state(dict(state))
+            index._lists = [array.array("q") for _ in range(len(index.centroids))]
+            live = np.flatnonzero(index._alive)
+            index._append_to_lists(live, index._assign[live])
+            index._trained_size = len(index)
+        return index
+
+    def memory_usage(self) -> dict:
+        """Bytes held in RAM vs. left on disk (memory-mapped)."""
+        n = self._count
+        n_base = len(self._base)
+        on_disk = isinstance(self._base, np.memmap)
+        ram = (n - n_base) * self.dim * 4 + n * (1 + 4 + 8 + 4)
+        if not on_disk:
+            ram += self._base.nbytes
+        if self._codes is not None:
+            ram += n * self._codes.shape[1]
+        return {"ram_bytes": int(ram), "mmap_bytes": int(self._base.nbytes) if on_disk else 0}
+
+    def stats(self) -> dict:
+        return {
+            "listings": len(self),
+            "slots": self._count,
+            "trained": self.is_trained,
+            "training": self._training,
+            "nlist": len(self._lists) if self.is_trained else 0,
+            "nprobe": self.nprobe,
+            "codec": self.codec.spec if self.codec is not None else None,
+            **self.memory_usage(),
+        }
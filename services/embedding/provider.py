@@ -0,0 +1,67 @@
+"""
+Off-event-loop execution of blocking provider calls.
+
+``cohere.Client.embed`` is synchronous; calling it from an async handler
+stalls every request on the worker for the whole network round trip. Calls
+are instead run on a dedicated thread pool, admitted through a semaphore so
+at most ``max_concurrency`` are in flight, and bounded by ``timeout_s``
+(which includes time spent waiting for a slot).
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class ProviderTimeout(Exception):
+    """The provider did not answer within the configured timeout."""
+
+
+class BoundedProviderExecutor:
+    def __init__(self, max_concurrency: int = 8, timeout_s: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.timeout_s = timeout_s
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="embed-provider"
+        )
+        # Created lazily so it binds to the server's event loop, not the
+        # import-time one (asyncio primitives are loop-bound before 3.10).
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.calls = 0
+        self.timeouts = 0
+
+    async def _call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+            finally:
+                self.in_flight -= 1
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run fn(*args, **kwargs) on the pool without blocking the event loop."""
+        self.calls += 1
+        try:
+            return await asyncio.wait_for(self._call(fn, *args, **kwargs), timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            # The worker thread cannot be interrupted; its result is discarded.
+            self.timeouts += 1
+            raise ProviderTimeout(f"Embedding provider did not respond within {self.timeout_s}s")
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "timeout_s": self.timeout_s,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
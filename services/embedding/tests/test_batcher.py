@@ -0,0 +1,90 @@
+"""
+Tests for the /embed micro-batching coalescer.
+"""
+import asyncio
+import sys
+import os
+
+import numpy as np
+import pytest
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from batcher import EmbedCoalescer
+from main import generate_mock_embeddings
+
+
+class RecordingProvider:
+    """Mock provider that records every batched call."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    async def __call__(self, texts, model, input_type):
+        self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("provider unavailable")
+        return generate_mock_embeddings(texts).astype(np.float32)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_call():
+    provider = RecordingProvider()
+    coalescer = EmbedCoalescer(provider, max_wait_ms=20, max_batch=96)
+    requests = [["渋谷区"], ["港区", "目黒区"], ["新宿区"]]
+
+    results = await asyncio.gather(
+        *(coalescer.embed(texts, "mock", "search_query") for texts in requests)
+    )
+
+    assert len(provider.calls) == 1
+    for texts, vectors in zip(requests, results):
+        np.testing.assert_array_equal(vectors, generate_mock_embeddings(texts).astype(np.float32))
+
+
+@pytest.mark.asyncio
+async def test_duplicate_texts_sent_once():
+    provider = RecordingProvider()
+    coalescer = EmbedCoalescer(provider, max_wait_ms=20)
+    a, b = await asyncio.gather(
+        coalescer.embed(["渋谷区"], "mock", "search_query"),
+        coalescer.embed(["渋谷区"], "mock", "search_query"),
+    )
+    assert provider.calls == [["渋谷区"]]
+    np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.asyncio
+async def test_max_batch_splits_provider_calls():
+    provider = RecordingProvider()
+    coalescer = EmbedCoalescer(provider, max_wait_ms=50, max_batch=4)
+    texts = [f"物件{i}" for i in range(10)]
+
+    vectors = await asyncio.wait_for(coalescer.embed(texts, "mock", "search_document"), timeout=5)
+
+    assert [len(c) for c in provider.calls] == [4, 4, 2]
+    np.testing.assert_array_equal(vectors, generate_mock_embeddings(texts).astype(np.float32))
+
+
+@pytest.mark.asyncio
+async def test_model_and_input_type_batched_separately():
+    provider = RecordingProvider()
+    coalescer = EmbedCoalescer(provider, max_wait_ms=20)
+    await asyncio.gather(
+        coalescer.embed(["a"], "mock", "search_query"),
+        coalescer.embed(["b"], "mock", "search_document"),
+    )
+    assert len(provider.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_provider_error_reaches_every_caller():
+    coalescer = EmbedCoalescer(RecordingProvider(fail=True), max_wait_ms=5)
+    results = await asyncio.gather(
+        coalescer.embed(["a"], "mock", "search_query"),
+        coalescer.embed(["b"], "mock", "search_query"),
+        return_exceptions=True,
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,130 @@
+"""
+Tests for the content-addressed embedding cache.
+"""
+import sys
+import os
+import threading
+
+import numpy as np
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from cache import DiskEmbeddingStore, EmbeddingCache, make_cache_key
+
+MODEL = "embed-multilingual-v3.0"
+INPUT_TYPE = "search_document"
+
+
+def _vectors(n, dim=8, offset=0):
+    return np.arange(offset, offset + n * dim, dtype=np.float32).reshape(n, dim)
+
+
+class TestEmbeddingCache:
+    """Test the in-memory LRU tier and hit/miss accounting."""
+
+    def test_key_includes_model_and_input_type(self):
+        base = make_cache_key(MODEL, INPUT_TYPE, "渋谷区")
+        assert base != make_cache_key("embed-english-v3.0", INPUT_TYPE, "渋谷区")
+        assert base != make_cache_key(MODEL, "search_query", "渋谷区")
+
+    def test_miss_then_hit(self):
+        cache = EmbeddingCache(max_entries=10)
+        assert cache.get_many(MODEL, INPUT_TYPE, ["a", "b"]) == [None, None]
+        cache.put_many(MODEL, INPUT_TYPE, ["a", "b"], _vectors(2))
+        hits = cache.get_many(MODEL, INPUT_TYPE, ["b", "a"])
+        np.testing.assert_array_equal(hits[0], _vectors(2)[1])
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 2
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(max_entries=2)
+        cache.put_many(MODEL, INPUT_TYPE, ["a", "b"], _vectors(2))
+        cache.get_many(MODEL, INPUT_TYPE, ["a"])  # "a" becomes most recent
+        cache.put_many(MODEL, INPUT_TYPE, ["c"], _vectors(1))
+        a, b, c = cache.get_many(MODEL, INPUT_TYPE, ["a", "b", "c"])
+        assert a is not None and c is not None
+        assert b is None
+
+
+class TestDiskEmbeddingStore:
+    """Test the memory-mapped disk tier."""
+
+    def test_survives_reopen(self, tmp_path):
+        store = DiskEmbeddingStore(str(tmp_path), capacity=4, dim=8)
+        cache = EmbeddingCache(max_entries=10, disk_store=store)
+        cache.put_many(MODEL, INPUT_TYPE, ["a", "b"], _vectors(2))
+        cache.close()
+
+        reopened = EmbeddingCache(
+            max_entries=10, disk_store=DiskEmbeddingStore(str(tmp_path), capacity=4, dim=8)
+        )
+        a, b = reopened.get_many(MODEL, INPUT_TYPE, ["a", "b"])
+        np.testing.assert_array_equal(a, _vectors(2)[0])
+        np.testing.assert_array_equal(b, _vectors(2)[1])
+        assert reopened.stats()["disk_hits"] == 2
+
+    def test_ring_overwrites_oldest(self, tmp_path):
+        store = DiskEmbeddingStore(str(tmp_path), capacity=2, dim=8)
+        for i, key in enumerate(["k0", "k1", "k2"]):
+            store.put(key, _vectors(1, offset=i)[0])
+        assert store.get("k0") is None
+        np.testing.assert_array_equal(store.get("k2"), _vectors(1, offset=2)[0])
+        assert len(store) == 2
+
+    def test_log_compaction_keeps_entries(self, tmp_path):
+        store = DiskEmbeddingStore(str(tmp_path), capacity=2, dim=8)
+        for i in range(7):
+            store.put(f"k{i}", _vectors(1, offset=i)[0])
+        store.close()
+
+        reopened = DiskEmbeddingStore(str(tmp_path), capacity=2, dim=8)
+        assert len(reopened) == 2
+        np.testing.assert_array_equal(reopened.get("k6"), _vectors(1, offset=6)[0])
+        reopened.put("k7", _vectors(1, offset=7)[0])
+        assert reopened.get("k5") is None
+        assert reopened.get("k6") is not None
+
+    def test_sync_makes_log_durable(self, tmp_path):
+        cache = EmbeddingCache(max_entries=10, disk_store=DiskEmbeddingStore(str(tmp_path), capacity=4, dim=8))
+        cache.put_many(MODEL, INPUT_TYPE, ["a", "b"], _vectors(2))
+        cache.sync()
+        # No close(): the log must already be on disk
+        with open(tmp_path / "keys.log", encoding="utf-8") as f:
+            assert len(f.readlines()) == 2
+
+    def test_sync_from_another_thread_survives_compaction(self, tmp_path):
+        store = DiskEmbeddingStore(str(tmp_path), capacity=2, dim=8)
+        stop = threading.Event()
+
+        def sync_loop():
+            while not stop.is_set():
+                store.sync()
+
+        syncer = threading.Thread(target=sync_loop)
+        syncer.start()
+        try:
+            for i in range(200):  # compacts the log every few puts
+                store.put(f"k{i}", _vectors(1, offset=i)[0])
+        finally:
+            stop.set()
+            syncer.join()
+        store.sync()
+        with open(tmp_path / "keys.log", encoding="utf-8") as f:
+            assert f.read().splitlines()[-1] == "1\tk199"
+
+    def test_reused_slot_from_lost_log_lines_is_a_miss(self, tmp_path):
+        store = DiskEmbeddingStore(str(tmp_path), capacity=2, dim=8)
+        store.put("k0", _vectors(1, offset=0)[0])
+        store.put("k1", _vectors(1, offset=1)[0])
+        store.sync()
+        # The ring wraps, then the process dies before logging the new key
+        store.put("k2", _vectors(1, offset=2)[0])
+        store._vectors.flush()
+        store._tags.flush()
+
+        reopened = DiskEmbeddingStore(str(tmp_path), capacity=2, dim=8)
+        assert reopened.get("k0") is None  # slot 0 now holds k2's vector
+        np.testing.assert_array_equal(reopened.get("k1"), _vectors(1, offset=1)[0])
+        assert len(reopened) == 1
@@ -8,7 +8,7 @@ import math
 _service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
 sys.path.insert(0, _service_dir)
 
-from main import generate_mock_embedding
+from main import generate_mock_embedding, generate_mock_embeddings
 
 
 class TestEmbeddingService:
@@ -36,3 +36,16 @@ class TestEmbeddingService:
         e1 = generate_mock_embedding("入力A")
         e2 = generate_mock_embedding("入力B")
         assert e1 != e2
+
+    def test_batch_mock_embeddings_match_scalar(self):
+        """Batch generator should be bit-identical to the scalar function."""
+        texts = ["テスト物件", "渋谷区の3LDKマンション", "", "Minato Residence"]
+        batch = generate_mock_embeddings(texts)
+        assert batch.shape == (4, 1024)
+        assert batch.tolist() == [generate_mock_embedding(t) for t in texts]
+
+    def test_batch_mock_embeddings_custom_dim(self):
+        """Batch generator should respect the requested dimension."""
+        batch = generate_mock_embeddings(["入力A"], dim=384)
+        assert batch.shape == (1, 384)
+        assert batch[0].tolist() == generate_mock_embedding("入力A", dim=384)
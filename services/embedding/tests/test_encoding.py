@@ -0,0 +1,84 @@
+"""
+Tests for compact /embed response encodings.
+"""
+import base64
+import sys
+import os
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from encoding import (
+    BASE64_MEDIA_TYPE,
+    BINARY_MEDIA_TYPE,
+    JSON_MEDIA_TYPE,
+    decode_binary,
+    encode_base64,
+    encode_binary,
+    negotiate,
+)
+from main import app, generate_mock_embeddings
+
+client = TestClient(app)
+
+
+class TestNegotiation:
+    def test_default_is_json(self):
+        assert negotiate(None) == (JSON_MEDIA_TYPE, "float32")
+        assert negotiate("*/*") == (JSON_MEDIA_TYPE, "float32")
+
+    def test_binary_with_dtype(self):
+        assert negotiate("application/x-embedding; dtype=float16") == (BINARY_MEDIA_TYPE, "float16")
+
+    def test_quality_ordering(self):
+        accept = "application/json;q=0.5, application/x-embedding+json"
+        assert negotiate(accept) == (BASE64_MEDIA_TYPE, "float32")
+
+    def test_unknown_dtype_rejected(self):
+        with pytest.raises(ValueError):
+            negotiate("application/x-embedding; dtype=int4")
+
+
+class TestEncoding:
+    def test_binary_round_trip_float32(self):
+        matrix = generate_mock_embeddings(["渋谷区", "港区"]).astype(np.float32)
+        decoded = decode_binary(bytes(encode_binary(matrix)))
+        np.testing.assert_array_equal(decoded, matrix)
+
+    def test_binary_float16_is_half_size(self):
+        matrix = generate_mock_embeddings(["渋谷区"]).astype(np.float32)
+        payload = encode_binary(matrix, "float16")
+        assert len(payload) == 16 + 1024 * 2
+        np.testing.assert_allclose(decode_binary(bytes(payload)), matrix, atol=1e-3)
+
+    def test_base64_payload(self):
+        matrix = generate_mock_embeddings(["渋谷区"]).astype(np.float32)
+        payload = encode_base64(matrix, "float16")
+        assert payload["shape"] == [1, 1024]
+        raw = np.frombuffer(base64.b64decode(payload["data"]), dtype="<f2")
+        np.testing.assert_allclose(raw, matrix[0], atol=1e-3)
+
+
+class TestEmbedEndpoint:
+    def test_binary_response(self):
+        response = client.post(
+            "/embed",
+            json={"texts": ["目黒区の2LDK", "品川区"]},
+            headers={"Accept": "application/x-embedding"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith(BINARY_MEDIA_TYPE)
+        decoded = decode_binary(response.content)
+        assert decoded.shape == (2, 1024)
+        json_response = client.post("/embed", json={"texts": ["目黒区の2LDK", "品川区"]})
+        np.testing.assert_array_equal(decoded, np.array(json_response.json()["embeddings"], dtype=np.float32))
+
+    def test_unsupported_dtype_is_406(self):
+        response = client.post(
+            "/embed", json={"texts": ["a"]}, headers={"Accept": "application/x-embedding; dtype=int4"}
+        )
+        assert response.status_code == 406
@@ -0,0 +1,237 @@
+"""
+Tests for the in-process IVF listing index.
+"""
+import sys
+import os
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from index import VectorIndex
+from main import app, generate_mock_embeddings
+
+DIM = 32
+WARDS = ["Shibuya", "Minato", "Meguro"]
+
+
+def _unit(n, seed=0):
+    rng = np.random.default_rng(seed)
+    v = rng.standard_normal((n, DIM)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def _build(n=2000, nlist=16, **kwargs):
+    vectors = _unit(n)
+    index = VectorIndex(DIM, nlist=nlist, nprobe=nlist, **kwargs)
+    index.add(
+        [f"prop_{i}" for i in range(n)],
+        vectors,
+        wards=[WARDS[i % 3] for i in range(n)],
+        prices=[float(i * 100_000) for i in range(n)],
+    )
+    return index, vectors
+
+
+def _exact(vectors, query, k, mask=None):
+    scores = vectors @ query
+    if mask is not None:
+        scores = np.where(mask, scores, -np.inf)
+    return [f"prop_{i}" for i in np.argsort(-scores)[:k]]
+
+
+class TestVectorIndex:
+    def test_trains_automatically(self):
+        index, _ = _build()
+        assert index.is_trained
+
+    def test_full_probe_matches_exact_search(self):
+        index, vectors = _build()
+        query = _unit(1, seed=1)[0]
+        hits = index.search(query, k=10)
+        assert [h.id for h in hits] == _exact(vectors, query, 10)
+
+    def test_untrained_index_is_exact(self):
+        index, vectors = _build(n=100, nlist=16, train_size=10_000)
+        assert not index.is_trained
+        query = _unit(1, seed=2)[0]
+        assert [h.id for h in index.search(query, k=5)] == _exact(vectors, query, 5)
+
+    def test_ward_and_price_filters(self):
+        index, _ = _build()
+        index.nprobe = 1  # force the probe to widen for the selective filter
+        query = _unit(1, seed=3)[0]
+        hits = index.search(query, k=5, ward="Minato", min_price=50_000_000, max_price=100_000_000)
+        assert len(hits) == 5
+        for hit in hits:
+            assert hit.ward == "Minato"
+            assert 50_000_000 <= hit.price <= 100_000_000
+
+    def test_delete_and_upsert(self):
+        index, vectors = _build()
+        query = vectors[42]
+        assert index.search(query, k=1)[0].id == "prop_42"
+        assert index.remove(["prop_42"]) == 1
+        assert index.search(query, k=1)[0].id != "prop_42"
+
+        index.add(["prop_7"], query[None, :], wards=["Meguro"], prices=[1.0])
+        hit = index.search(query, k=1)[0]
+        assert hit.id == "prop_7" and hit.ward == "Meguro"
+        assert len(index) == 1999
+
+    def test_snapshot_round_trip_mmap(self, tmp_path):
+        index, vectors = _build()
+        index.remove(["prop_0"])
+        index.save(str(tmp_path))
+
+        loaded = VectorIndex.load(str(tmp_path), mmap=True)
+        assert loaded.memory_usage()["mmap_bytes"] == 1999 * DIM * 4  # tombstones are not saved
+        query = _unit(1, seed=4)[0]
+        assert [h.id for h in loaded.search(query, k=10)] == [h.id for h in index.search(query, k=10)]
+        assert "prop_0" not in [h.id for h in loaded.search(vectors[0], k=3)]
+
+        loaded.add(["new"], vectors[0][None, :])
+        assert loaded.search(vectors[0], k=1)[0].id == "new"
+        assert loaded.memory_usage()["mmap_bytes"] == 1999 * DIM * 4
+
+    def test_codec_index_with_rerank_matches_exact_on_full_probe(self):
+        index, vectors = _build(codec="pq8", rerank=10)
+        query = _unit(1, seed=5)[0]
+        assert [h.id for h in index.search(query, k=5)] == _exact(vectors, query, 5)
+
+    def test_codec_snapshot_keeps_codes(self, tmp_path):
+        index, vectors = _build(codec="sq8")
+        index.save(str(tmp_path))
+        loaded = VectorIndex.load(str(tmp_path))
+        assert loaded.codec.spec == "sq8"
+        query = _unit(1, seed=6)[0]
+        assert [h.id for h in loaded.search(query, k=10)] == [h.id for h in index.search(query, k=10)]
+
+
+    def test_repeated_upserts_stay_bounded(self, tmp_path):
+        index, vectors = _build(n=500, nlist=8, train_size=200, compact_min=64)
+        for round_ in range(20):
+            index.add([f"prop_{i}" for i in range(500)], vectors, wards=[WARDS[round_ % 3]] * 500)
+        assert len(index) == 500
+        assert index.stats()["slots"] <= 500 * 1.25 + 500
+        query = _unit(1, seed=7)[0]
+        hits = index.search(query, k=5)
+        assert [h.id for h in hits] == _exact(vectors, query, 5)
+        assert all(h.ward == WARDS[19 % 3] for h in hits)
+
+        index.save(str(tmp_path))
+        assert VectorIndex.load(str(tmp_path)).stats()["slots"] == 500
+
+    def test_search_is_served_while_training(self, monkeypatch):
+        import threading
+        import time
+        import index as index_module
+
+        started, release = threading.Event(), threading.Event()
+        kmeans = index_module.spherical_kmeans
+
+        def slow_kmeans(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return kmeans(*args, **kwargs)
+
+        monkeypatch.setattr(index_module, "spherical_kmeans", slow_kmeans)
+        index, vectors = _build(n=300, nlist=8, train_size=10_000)
+        trainer = threading.Thread(target=index.train)
+        trainer.start()
+        assert started.wait(5)
+        try:
+            start = time.perf_counter()
+            assert index.search(vectors[3], k=1)[0].id == "prop_3"
+            index.add(["late"], vectors[4][None, :])
+            assert time.perf_counter() - start < 1
+            assert not index.is_trained and index.stats()["training"]
+        finally:
+            release.set()
+            trainer.join()
+        assert index.is_trained
+        # The listing added mid-training was assigned to the new quantizer
+        assert {h.id for h in index.search(vectors[4], k=2)} == {"prop_4", "late"}
+
+    def test_scoring_and_snapshot_writes_run_outside_the_lock(self, tmp_path):
+        import threading
+        import time
+
+        index, vectors = _build(n=400, nlist=8)
+        assert index.is_trained
+        entered, release = threading.Event(), threading.Event()
+        view = index._vectors_view
+
+        def slow_view():
+            vectors_at = view()
+
+            def slow_vectors_at(slots):
+                entered.set()
+                release.wait(5)
+                return vectors_at(slots)
+
+            return slow_vectors_at
+
+        index._vectors_view = slow_view
+        results = {}
+        calls = [
+            ("search", lambda: results.update(hits=index.search(vectors[3], k=1))),
+            ("save", lambda: index.save(str(tmp_path))),
+        ]
+        for name, call in calls:
+            entered.clear()
+            release.clear()
+            worker = threading.Thread(target=call)
+            worker.start()
+            assert entered.wait(5)
+            try:
+                start = time.perf_counter()
+                index.add([f"during_{name}"], vectors[5][None, :])
+                index.remove(["prop_3"] if name == "search" else ["prop_7"])
+                assert time.perf_counter() - start < 1
+            finally:
+                release.set()
+                worker.join()
+
+        # Each call saw the index as it was when it took its view, except that
+        # a listing removed while it was being scored is dropped.
+        assert results["hits"] == []
+        loaded = VectorIndex.load(str(tmp_path))
+        assert len(loaded) == 400  # prop_3 out, during_search in; save's changes came after
+        ids = {h.id for h in loaded.search(vectors[7], k=3, nprobe=8)}
+        assert "prop_7" in ids and "during_save" not in ids
+
+    def test_retrains_when_index_doubles(self):
+        index, _ = _build(n=400, nlist=8, train_size=200)
+        first = index.centroids
+        assert index.stats()["nlist"] == 8
+        index.add([f"more_{i}" for i in range(400)], _unit(400, seed=9))
+        assert index.centroids is not first
+        assert index._trained_size == 800
+
+
+class TestSearchEndpoint:
+    def test_upsert_and_search_by_text(self):
+        client = TestClient(app)
+        items = [
+            {"id": "a", "text": "渋谷区の2LDKマンション", "ward": "Shibuya", "price": 85_000_000},
+            {"id": "b", "text": "港区のタワーマンション", "ward": "Minato", "price": 120_000_000},
+        ]
+        assert client.post("/index/upsert", json={"items": items}).status_code == 200
+
+        response = client.post("/search", json={"query": "渋谷区の2LDKマンション", "k": 1})
+        assert response.status_code == 200
+        assert response.json()["results"][0]["id"] == "a"
+
+        response = client.post("/search", json={"query": "マンション", "ward": "Minato", "k": 5})
+        assert [r["id"] for r in response.json()["results"]] == ["b"]
+
+        embedding = generate_mock_embeddings(["港区"])[0].tolist()
+        response = client.post("/search", json={"embedding": embedding, "max_price": 90_000_000})
+        assert [r["id"] for r in response.json()["results"]] == ["a"]
+
+    def test_search_requires_query(self):
+        client = TestClient(app)
+        assert client.post("/search", json={"k": 3}).status_code == 400
@@ -0,0 +1,69 @@
+"""
+Tests for running blocking provider calls off the event loop.
+"""
+import asyncio
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from provider import BoundedProviderExecutor, ProviderTimeout
+
+
+@pytest.mark.asyncio
+async def test_event_loop_keeps_running_during_call():
+    executor = BoundedProviderExecutor(max_concurrency=2, timeout_s=5)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    result, _ = await asyncio.gather(executor.run(time.sleep, 0.2), ticker())
+    assert result is None
+    assert ticks == 10
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    executor = BoundedProviderExecutor(max_concurrency=2, timeout_s=5)
+    lock = threading.Lock()
+    active = peak = 0
+
+    def slow_call():
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+
+    await asyncio.gather(*(executor.run(slow_call) for _ in range(6)))
+    assert peak == 2
+    assert executor.stats()["calls"] == 6
+
+
+@pytest.mark.asyncio
+async def test_timeout_raises():
+    executor = BoundedProviderExecutor(max_concurrency=1, timeout_s=0.05)
+    with pytest.raises(ProviderTimeout):
+        await executor.run(time.sleep, 0.5)
+    assert executor.stats()["timeouts"] == 1
+
+
+def test_mock_provider_uses_configured_dimension(monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "co", None)
+    monkeypatch.setattr(main, "EMBEDDING_DIM", 384)
+    vectors = main.provider_embed(["入力A", "入力B"], "embed-multilingual-v3.0", "search_document")
+    assert vectors.shape == (2, 384) and vectors.dtype == "float32"
+    assert vectors.tolist() == main.generate_mock_embeddings(["入力A", "入力B"], dim=384).astype("float32").tolist()
@@ -0,0 +1,72 @@
+"""
+Tests for the compact vector codecs.
+"""
+import sys
+import os
+
+import numpy as np
+import pytest
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from quantization import ProductQuantizer, ScalarQuantizer, make_codec
+
+DIM = 64
+
+
+def _data(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((n, DIM)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+class TestScalarQuantizer:
+    def test_round_trip_error_is_small(self):
+        x = _data()
+        sq = ScalarQuantizer(DIM)
+        sq.train(x)
+        codes = sq.encode(x)
+        assert codes.dtype == np.uint8 and codes.shape == x.shape
+        assert np.abs(sq.decode(codes) - x).max() <= sq.step.max()
+
+    def test_adc_scores_match_decoded_inner_product(self):
+        x = _data()
+        sq = ScalarQuantizer(DIM)
+        sq.train(x)
+        codes = sq.encode(x[:100])
+        query = x[500]
+        np.testing.assert_allclose(sq.score(query, codes), sq.decode(codes) @ query, rtol=1e-4, atol=1e-4)
+
+
+class TestProductQuantizer:
+    def test_code_size(self):
+        pq = ProductQuantizer(DIM, m=8)
+        pq.train(_data())
+        assert pq.encode(_data(10)).shape == (10, 8)
+
+    def test_adc_scores_match_decoded_inner_product(self):
+        x = _data()
+        pq = ProductQuantizer(DIM, m=16)
+        pq.train(x)
+        codes = pq.encode(x[:100])
+        query = x[500]
+        np.testing.assert_allclose(pq.score(query, codes), pq.decode(codes) @ query, rtol=1e-4, atol=1e-4)
+
+    def test_reconstruction_beats_zero_vector(self):
+        x = _data()
+        pq = ProductQuantizer(DIM, m=16)
+        pq.train(x)
+        error = np.linalg.norm(pq.decode(pq.encode(x)) - x, axis=1).mean()
+        assert error < 0.9
+
+    def test_dim_must_divide(self):
+        with pytest.raises(ValueError):
+            ProductQuantizer(DIM, m=7)
+
+
+def test_make_codec():
+    assert make_codec("sq8", DIM).spec == "sq8"
+    assert make_codec("pq16", DIM).spec == "pq16"
+    with pytest.raises(ValueError):
+        make_codec("opq", DIM)
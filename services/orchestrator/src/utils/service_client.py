@@ -1,5 +1,10 @@
+import array
+import base64
 import httpx
+import json
 import os
+import struct
+import sys
 
 TIMEOUT = 30.0
 
@@ -8,15 +13,57 @@ DOCUMENT_SERVICE_URL = os.getenv("DOCUMENT_SERVICE_URL", "http://document-ocr:80
 VR_SERVICE_URL = os.getenv("VR_SERVICE_URL", "http://vr-engine:8004")
 EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL", "http://embedding:8001")
 
-async def call_service(service_url: str, endpoint: str, method: str = "GET", data: dict = None, files: dict = None):
+# Compact embedding encodings served by the embedding service (see
+# services/embedding/encoding.py). Pass one as `accept` to call_service.
+EMBEDDING_BINARY = "application/x-embedding"
+EMBEDDING_BASE64 = "application/x-embedding+json"
+
+_EMBEDDING_HEADER = struct.Struct("<4sBB2xII")
+_EMBEDDING_DTYPES = {1: "float32", 2: "float16"}
+
+
+def _unpack_rows(raw: bytes, dtype: str, rows: int, dim: int) -> list:
+    """Turn a raw little-endian matrix into a list of rows of floats."""
+    if dtype == "float32":
+        values = array.array("f")
+        values.frombytes(raw)
+        if sys.byteorder == "big":
+            values.byteswap()
+    elif dtype == "float16":
+        values = struct.unpack(f"<{rows * dim}e", raw)
+    else:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    return [list(values[i * dim:(i + 1) * dim]) for i in range(rows)]
+
+
+def decode_embeddings(content_type: str, body: bytes) -> dict:
+    """Decode a compact /embed response into the same shape as the JSON form."""
+    if content_type.startswith(EMBEDDING_BASE64):
+        payload = json.loads(body)
+        rows, dim = payload["shape"]
+        raw = base64.b64decode(payload["data"])
+        return {"embeddings": _unpack_rows(raw, payload["dtype"], rows, dim)}
+
+    magic, version, code, rows, dim = _EMBEDDING_HEADER.unpack_from(body, 0)
+    if magic != b"IKEM" or version != 1 or code not in _EMBEDDING_DTYPES:
+        raise ValueError("Malformed embedding payload")
+    raw = body[_EMBEDDING_HEADER.size:]
+    return {"embeddings": _unpack_rows(raw, _EMBEDDING_DTYPES[code], rows, dim)}
+
+
+async def call_service(service_url: str, endpoint: str, method: str = "GET", data: dict = None, files: dict = None, accept: str = None):
     async with httpx.AsyncClient(timeout=TIMEOUT) as client:
         url = f"{service_url}{endpoint}"
+        headers = {"Accept": accept} if accept else None
         if method == "GET":
-            response = await client.get(url, params=data)
+            response = await client.get(url, params=data, headers=headers)
         elif method == "POST":
-            response = await client.post(url, json=data, files=files)
+            response = await client.post(url, json=data, files=files, headers=headers)
         else:
             raise ValueError(f"Unsupported method: {method}")
-        
+
         response.raise_for_status()
+        content_type = response.headers.get("content-type", "")
+        if content_type.startswith(EMBEDDING_BINARY):
+            return decode_embeddings(content_type, response.content)
         return response.json()
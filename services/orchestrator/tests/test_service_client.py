@@ -0,0 +1,26 @@
+import base64
+import json
+import struct
+
+from src.utils.service_client import EMBEDDING_BASE64, EMBEDDING_BINARY, decode_embeddings
+
+ROWS = [[0.5, -1.0, 2.0], [0.25, 0.0, -3.5]]
+
+
+def _raw(fmt):
+    return struct.pack(f"<6{fmt}", *(v for row in ROWS for v in row))
+
+
+def test_decode_binary_float32():
+    body = struct.pack("<4sBB2xII", b"IKEM", 1, 1, 2, 3) + _raw("f")
+    assert decode_embeddings(EMBEDDING_BINARY, body) == {"embeddings": ROWS}
+
+
+def test_decode_binary_float16():
+    body = struct.pack("<4sBB2xII", b"IKEM", 1, 2, 2, 3) + _raw("e")
+    assert decode_embeddings(f"{EMBEDDING_BINARY}; dtype=float16", body) == {"embeddings": ROWS}
+
+
+def test_decode_base64():
+    payload = {"dtype": "float32", "shape": [2, 3], "data": base64.b64encode(_raw("f")).decode()}
+    assert decode_embeddings(EMBEDDING_BASE64, json.dumps(payload).encode()) == {"embeddings": ROWS}
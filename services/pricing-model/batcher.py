@@ -0,0 +1,110 @@
+"""
+Dynamic server-side batching for single-row /predict calls.
+
+Concurrent requests are queued and scored together: a batch is dispatched
+once ``max_batch`` items are waiting or ``max_wait_ms`` has passed since the
+worker became free, whichever comes first. Scoring runs on a dedicated worker
+thread; while it is busy, new requests keep accumulating, so batches grow
+with load.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class PredictBatcher(Generic[T]):
+    """Queues single-item predictions and scores them in batches."""
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[T]], Sequence[float]],
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict-batcher")
+        self._pending: Deque[Tuple[T, asyncio.Future]] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._has_items: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self.requests = 0
+        self.batches = 0
+
+    def _ensure_started(self):
+        # asyncio primitives are bound to the loop they are first used on, so
+        # (re)create them if we are now running on a different loop.
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self._pending.clear()
+        self._has_items = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def submit(self, item: T) -> float:
+        """Queue one item and wait for its prediction."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._pending.append((item, future))
+        self.requests += 1
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            if len(self._pending) < self.max_batch and self.max_wait > 0:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.max_batch))]
+            if len(self._pending) < self.max_batch:
+                self._full.clear()
+            if not self._pending:
+                self._has_items.clear()
+            batch = [(item, future) for item, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+
+            self.batches += 1
+            try:
+                results = await self._loop.run_in_executor(
+                    self._executor, self.predict_fn, [item for item, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, list(results)):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, RuntimeError):
+                pass
+        self._executor.shutdown(wait=False)
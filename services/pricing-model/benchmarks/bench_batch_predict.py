@@ -0,0 +1,98 @@
+"""
+Benchmark: per-row pandas prediction vs. the vectorized batch path.
+
+Uses model.joblib when present (run train.py first), otherwise trains an
+equivalent model in memory.
+
+Usage:
+    python benchmarks/bench_batch_predict.py [--sizes 1,10,100,1000,10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+import main
+from registry import ModelBundle
+
+
+def _load_or_train_model():
+    if os.path.exists(main.MODEL_PATH):
+        return joblib.load(main.MODEL_PATH)
+    rng = np.random.default_rng(0)
+    n = 1000
+    df = pd.DataFrame({
+        "total_area_sqm": rng.uniform(20, 100, n),
+        "year_built": rng.integers(1980, 2024, n),
+        "minutes_to_station": rng.integers(1, 20, n),
+        "latitude": rng.uniform(35.6, 35.7, n),
+        "longitude": rng.uniform(139.6, 139.8, n),
+    })
+    price = (df["total_area_sqm"] * 1_000_000 * (1 - (2024 - df["year_built"]) * 0.01)
+             * (1 - df["minutes_to_station"] * 0.02))
+    params = {"objective": "regression", "metric": "rmse", "verbosity": -1}
+    return lgb.train(params, lgb.Dataset(df, label=price), num_boost_round=100)
+
+
+def _items(n):
+    rng = np.random.default_rng(1)
+    return [
+        main.PropertyFeatures(
+            total_area_sqm=float(rng.uniform(20, 100)),
+            year_built=int(rng.integers(1980, 2024)),
+            minutes_to_station=int(rng.integers(1, 20)),
+            latitude=float(rng.uniform(35.6, 35.7)),
+            longitude=float(rng.uniform(139.6, 139.8)),
+            building_type="mansion",
+            region="tokyo",
+        )
+        for _ in range(n)
+    ]
+
+
+def _per_row_pandas(items):
+    """The previous /predict path, once per item."""
+    out = []
+    for features in items:
+        input_data = features.model_dump()
+        input_data.pop("building_type", None)
+        input_data.pop("region", None)
+        out.append(main.active_bundle.model.predict(pd.DataFrame([input_data]))[0])
+    return out
+
+
+def _timed(fn, items, min_seconds=0.5):
+    runs, start = 0, time.perf_counter()
+    while True:
+        fn(items)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / runs
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1,10,100,1000,10000")
+    args = parser.parse_args()
+
+    main.active_bundle = ModelBundle(version="bench", model=_load_or_train_model())
+    print(f"{'batch':>7s} {'per-row rows/s':>15s} {'batch rows/s':>13s} {'speedup':>8s}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        items = _items(size)
+        # The per-row path is linear in batch size; cap its sample for big batches.
+        sample = items[:min(size, 200)]
+        per_row = _timed(_per_row_pandas, sample) / len(sample)
+        batch = _timed(main.predict_prices, items) / size
+        print(f"{size:7d} {1 / per_row:15.0f} {1 / batch:13.0f} {per_row / batch:7.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
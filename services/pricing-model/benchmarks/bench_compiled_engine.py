@@ -0,0 +1,58 @@
+"""
+Benchmark: LightGBM Booster.predict vs. the compiled engine, single rows and
+batches. The last column times the NumPy traversal alone, which the engine
+only uses when it has no Booster to hand batches to.
+
+Uses model.joblib when present (run train.py first), otherwise trains an
+equivalent model in memory.
+
+Usage:
+    python benchmarks/bench_compiled_engine.py [--sizes 1,4,16,64,1000,10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from bench_batch_predict import _load_or_train_model
+from compiled import CompiledEnsemble, max_abs_error, sample_feature_rows
+
+
+def _latency(fn, X, min_seconds=0.5):
+    """Median per-call latency in seconds."""
+    samples, deadline = [], time.perf_counter() + min_seconds
+    while time.perf_counter() < deadline or len(samples) < 5:
+        start = time.perf_counter()
+        fn(X)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1,4,16,64,1000,10000")
+    args = parser.parse_args()
+
+    booster = _load_or_train_model()
+    start = time.perf_counter()
+    engine = CompiledEnsemble.from_booster(booster)
+    print(f"compiled {engine.stats()} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    X_all = sample_feature_rows(booster.dump_model(), n=max(int(s) for s in args.sizes.split(",")))
+    print(f"max abs error vs Booster.predict: {max_abs_error(engine, booster, X_all):.3g}")
+    print(f"{'rows':>7s} {'lightgbm us':>12s} {'compiled us':>12s} {'speedup':>8s} {'numpy path us':>14s}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        X = X_all[:size]
+        lgb_time = _latency(booster.predict, X)
+        compiled_time = _latency(engine.predict, X)
+        numpy_time = _latency(engine.predict_vectorized, X)
+        print(f"{size:7d} {lgb_time * 1e6:12.1f} {compiled_time * 1e6:12.1f} "
+              f"{lgb_time / compiled_time:7.2f}x {numpy_time * 1e6:14.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,87 @@
+"""
+Benchmark: comparable-sales lookups against an index of 1M transactions.
+
+Builds a CompsIndex over synthetic transactions clustered around the major
+metro areas, then times single queries (k nearest within r km, built after a
+year) against a brute-force haversine scan, plus the per-listing cost of the
+price_per_sqm_area_avg feature.
+
+Usage:
+    python benchmarks/bench_comps.py [--transactions 1000000] [--queries 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from comps import CompsIndex, haversine_km
+
+METROS = np.array([[35.68, 139.77], [34.70, 135.50], [35.18, 136.91], [33.59, 130.40], [43.06, 141.35]])
+
+
+def _transactions(n, rng):
+    which = rng.choice(len(METROS), n, p=[0.5, 0.2, 0.12, 0.1, 0.08])
+    return (
+        METROS[which, 0] + rng.normal(0, 0.12, n),
+        METROS[which, 1] + rng.normal(0, 0.15, n),
+        rng.integers(1960, 2025, n),
+        rng.lognormal(13.5, 0.5, n),
+    )
+
+
+def _latencies_us(fn, points):
+    out = []
+    for lat, lon in points:
+        start = time.perf_counter()
+        fn(lat, lon)
+        out.append(time.perf_counter() - start)
+    return np.array(out) * 1e6
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--radius-km", type=float, default=1.0)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--built-after", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lat, lon, year, price = _transactions(args.transactions, rng)
+    start = time.perf_counter()
+    index = CompsIndex(lat, lon, year, price)
+    print(f"built index over {len(index):,} transactions in {time.perf_counter() - start:.2f} s")
+
+    picks = rng.integers(0, len(lat), args.queries)
+    points = list(zip((lat[picks] + rng.normal(0, 0.005, len(picks))).tolist(),
+                      (lon[picks] + rng.normal(0, 0.005, len(picks))).tolist()))
+
+    def indexed(qlat, qlon):
+        return index.query(qlat, qlon, args.radius_km, args.k, args.built_after)
+
+    def brute(qlat, qlon):
+        distances = haversine_km(qlat, qlon, lat, lon)
+        hits = np.flatnonzero((distances <= args.radius_km) & (year >= args.built_after))
+        return hits[np.argsort(distances[hits])[:args.k]]
+
+    found = np.mean([len(indexed(*p)[0]) for p in points])
+    print(f"query: k={args.k} within {args.radius_km} km built >= {args.built_after} "
+          f"({found:.1f} comps found on average)")
+    print(f"{'method':>12s} {'p50 us':>10s} {'p99 us':>10s}")
+    for name, fn, sample in (("grid index", indexed, points), ("brute force", brute, points[:50])):
+        us = _latencies_us(fn, sample)
+        print(f"{name:>12s} {np.percentile(us, 50):10.1f} {np.percentile(us, 99):10.1f}")
+
+    sample = np.array(points[:1000])
+    start = time.perf_counter()
+    index.area_average(sample[:, 0], sample[:, 1])
+    print(f"price_per_sqm_area_avg: {(time.perf_counter() - start) / len(sample) * 1e6:.1f} us per listing")
+
+
+if __name__ == "__main__":
+    run_benchmark()
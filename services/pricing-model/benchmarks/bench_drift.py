@@ -0,0 +1,58 @@
+"""
+Benchmark: cost of drift monitoring on the prediction path and of /drift.
+
+Times DriftMonitor.record for the batch sizes /predict sees (next to the
+model.predict call it rides along with) and DriftMonitor.psi, against a
+reference fitted by train.py's mock pipeline.
+
+Usage:
+    python benchmarks/bench_drift.py [--sizes 1,8,64,1000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+import train
+from drift import DriftMonitor
+from features import COMPS_FEATURE, feature_matrix
+
+
+def _median_us(fn, min_seconds=0.5):
+    samples, deadline = [], time.perf_counter() + min_seconds
+    while time.perf_counter() < deadline or len(samples) < 5:
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1e6
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1,8,64,1000")
+    args = parser.parse_args()
+
+    result = train.train_from_mock(n=5000, rounds=100)
+    model, encoder, reference = result.model, result.encoder, result.drift_reference
+    features = model.feature_name()
+    columns = train.mock_columns(1000, np.random.default_rng(1))
+    columns[COMPS_FEATURE] = result.comps.area_average(columns["latitude"], columns["longitude"])
+    X = feature_matrix(columns, features, encoder)
+    monitor = DriftMonitor(reference)
+    print(f"{len(features)} features, {sum(len(e) + 2 for e in reference.edges)} bins")
+
+    print(f"{'rows':>6s} {'predict us':>11s} {'record us':>10s} {'overhead':>9s}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        rows = X[:size]
+        predict = _median_us(lambda: model.predict(rows))
+        record = _median_us(lambda: monitor.record(rows))
+        print(f"{size:6d} {predict:11.1f} {record:10.1f} {record / predict:8.1%}")
+    print(f"psi over {monitor.psi()['rows']:,} rows: {_median_us(monitor.psi):.1f} us")
+
+
+if __name__ == "__main__":
+    run_benchmark()
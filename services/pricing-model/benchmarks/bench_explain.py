@@ -0,0 +1,92 @@
+"""
+Benchmark: latency overhead of TreeSHAP explanations on /predict and
+/predict/batch.
+
+Trains a mock model with categorical encoders, then sends sequential
+requests through an in-process ASGI transport with dynamic batching off, so
+each number is the cost of one request on its own:
+
+    explain=false      prediction only
+    explain (cold)     every listing is new: one pred_contrib call per request
+    explain (warm)     repeated listings: contributions come from the LRU cache
+
+Usage:
+    python benchmarks/bench_explain.py [--requests 2000] [--batch-size 100]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx
+import numpy as np
+
+import main
+import train
+
+
+def _payloads(n, seed):
+    columns = train.mock_columns(n, np.random.default_rng(seed))
+    return [
+        {
+            "total_area_sqm": float(columns["total_area_sqm"][i]),
+            "year_built": int(columns["year_built"][i]),
+            "minutes_to_station": int(columns["minutes_to_station"][i]),
+            "latitude": float(columns["latitude"][i]),
+            "longitude": float(columns["longitude"][i]),
+            "building_type": str(columns["building_type"][i]),
+            "prefecture": str(columns["prefecture"][i]),
+            "earthquake_standard": str(columns["earthquake_standard"][i]),
+        }
+        for i in range(n)
+    ]
+
+
+async def _latencies(path, bodies, explain):
+    transport = httpx.ASGITransport(app=main.app)
+    out = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for body in bodies:
+            start = time.perf_counter()
+            response = await client.post(path, params={"explain": str(explain).lower()}, json=body)
+            response.raise_for_status()
+            out.append(time.perf_counter() - start)
+    return np.array(out) * 1000
+
+
+def _new_bundle(model, encoder, comps):
+    # A fresh bundle starts with an empty explanation cache
+    main.active_bundle = main.prepare_bundle("bench", model, None, encoder, comps=comps)
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=100)
+    args = parser.parse_args()
+
+    result = train.train_from_mock(n=5000, rounds=args.rounds)
+    model, encoder, comps = result.model, result.encoder, result.comps
+    main.predict_batcher = None
+    singles = _payloads(args.requests, seed=1)
+    batches = [
+        {"items": singles[i:i + args.batch_size]} for i in range(0, len(singles), args.batch_size)
+    ]
+
+    print(f"{'endpoint':>15s} {'mode':>15s} {'p50 ms':>8s} {'p99 ms':>8s}")
+    for path, bodies in (("/predict", singles), ("/predict/batch", batches)):
+        _new_bundle(model, encoder, comps)
+        asyncio.run(_latencies(path, bodies[:20], False))  # warm up the client path
+        runs = [("explain=false", False), ("explain (cold)", True), ("explain (warm)", True)]
+        for mode, explain in runs:
+            ms = asyncio.run(_latencies(path, bodies, explain))
+            print(f"{path:>15s} {mode:>15s} {np.percentile(ms, 50):8.2f} {np.percentile(ms, 99):8.2f}")
+        print(f"{'':>15s} cache {main.active_bundle.explainer.cache.stats()}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,91 @@
+"""
+Benchmark: conformal intervals (one predict + table lookup) vs. quantile
+boosters (three predict calls: point, lower and upper).
+
+Trains all models in memory on the train.py price formula with added
+multiplicative noise, calibrates on a held-out split and reports latency and
+empirical coverage on a separate test split.
+
+Usage:
+    python benchmarks/bench_intervals.py [--sizes 1,100,10000] [--alpha 0.1]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import lightgbm as lgb
+import numpy as np
+
+from intervals import ConformalTable
+
+
+def _dataset(n, seed):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.uniform(20, 100, n),
+        rng.integers(1980, 2024, n),
+        rng.integers(1, 20, n),
+        rng.uniform(35.6, 35.7, n),
+        rng.uniform(139.6, 139.8, n),
+    ])
+    price = X[:, 0] * 1_000_000 * (1 - (2024 - X[:, 1]) * 0.01) * (1 - X[:, 2] * 0.02)
+    return X, price * (1 + rng.normal(0, 0.08, n))
+
+
+def _train(X, y, **params):
+    params = {"objective": "regression", "verbosity": -1, **params}
+    return lgb.train(params, lgb.Dataset(X, label=y), num_boost_round=100)
+
+
+def _latency(fn, min_seconds=0.5):
+    samples, deadline = [], time.perf_counter() + min_seconds
+    while time.perf_counter() < deadline or len(samples) < 5:
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1,100,10000")
+    parser.add_argument("--alpha", type=float, default=0.1)
+    args = parser.parse_args()
+    alpha = args.alpha
+
+    X_train, y_train = _dataset(5000, seed=0)
+    X_cal, y_cal = _dataset(2000, seed=1)
+    X_test, y_test = _dataset(20000, seed=2)
+
+    point = _train(X_train, y_train)
+    low_q = _train(X_train, y_train, objective="quantile", alpha=alpha / 2)
+    high_q = _train(X_train, y_train, objective="quantile", alpha=1 - alpha / 2)
+    table = ConformalTable.fit(point.predict(X_cal), y_cal, alpha=alpha)
+
+    def three_calls(X):
+        return point.predict(X), low_q.predict(X), high_q.predict(X)
+
+    def conformal(X):
+        prediction = point.predict(X)
+        return (prediction, *table.interval(prediction))
+
+    print(f"target coverage {1 - alpha:.0%}")
+    for name, fn in (("quantile x3", three_calls), ("conformal", conformal)):
+        _, lower, upper = fn(X_test)
+        coverage = np.mean((y_test >= lower) & (y_test <= upper))
+        width = np.mean((upper - lower) / y_test)
+        print(f"{name:>12s}: coverage {coverage:.1%}, mean relative width {width:.1%}")
+
+    print(f"{'rows':>7s} {'quantile x3 us':>15s} {'conformal us':>13s} {'speedup':>8s}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        X = X_test[:size]
+        slow = _latency(lambda: three_calls(X))
+        fast = _latency(lambda: conformal(X))
+        print(f"{size:7d} {slow * 1e6:15.1f} {fast * 1e6:13.1f} {slow / fast:7.2f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
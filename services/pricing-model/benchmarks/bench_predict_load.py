@@ -0,0 +1,93 @@
+"""
+Load test: single-row /predict at a fixed arrival rate, with and without
+dynamic batching.
+
+Requests are sent open-loop (one every 1/rps seconds, regardless of how fast
+earlier ones complete) through an in-process ASGI transport, so the numbers
+reflect the service itself rather than the network stack.
+
+Usage:
+    python benchmarks/bench_predict_load.py [--rps 500] [--seconds 10]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx
+import numpy as np
+
+import main
+from batcher import PredictBatcher
+from registry import ModelBundle
+from bench_batch_predict import _load_or_train_model
+
+
+def _payloads(n):
+    rng = np.random.default_rng(2)
+    return [
+        {
+            "total_area_sqm": float(rng.uniform(20, 100)),
+            "year_built": int(rng.integers(1980, 2024)),
+            "minutes_to_station": int(rng.integers(1, 20)),
+            "latitude": float(rng.uniform(35.6, 35.7)),
+            "longitude": float(rng.uniform(139.6, 139.8)),
+            "building_type": "mansion",
+            "region": "tokyo",
+        }
+        for _ in range(n)
+    ]
+
+
+async def _run_load(rps, seconds):
+    payloads = _payloads(1000)
+    latencies = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(payload):
+            start = time.perf_counter()
+            response = await client.post("/predict", json=payload)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+        loop = asyncio.get_running_loop()
+        tasks = []
+        begin = loop.time()
+        for i in range(int(rps * seconds)):
+            delay = begin + i / rps - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(one(payloads[i % len(payloads)])))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - begin
+    ms = np.array(latencies) * 1000
+    return len(latencies) / elapsed, np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rps", type=float, default=500)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--max-batch", type=int, default=main.PREDICT_BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=main.PREDICT_BATCH_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    main.active_bundle = ModelBundle(version="bench", model=_load_or_train_model())
+    print(f"offered load {args.rps:.0f} req/s for {args.seconds:.0f}s")
+    print(f"{'mode':>10s} {'achieved/s':>11s} {'p50 ms':>8s} {'p99 ms':>8s} {'avg batch':>10s}")
+    for mode in ("unbatched", "batched"):
+        main.predict_batcher = (
+            PredictBatcher(main.score_requests, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+            if mode == "batched"
+            else None
+        )
+        achieved, p50, p99 = asyncio.run(_run_load(args.rps, args.seconds))
+        avg_batch = main.predict_batcher.stats()["avg_batch_size"] if main.predict_batcher else 1.0
+        print(f"{mode:>10s} {achieved:11.0f} {p50:8.2f} {p99:8.2f} {avg_batch:10.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
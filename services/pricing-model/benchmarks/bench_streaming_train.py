@@ -0,0 +1,101 @@
+"""
+Benchmark: streaming parquet training (train.py --parquet) vs. loading the
+whole table into a pandas DataFrame first.
+
+Writes mock parquet files of each size, then trains in a fresh subprocess per
+run so peak RSS is measured independently. Also times a second streaming run
+that reuses the LightGBM binary dataset cache.
+
+Usage:
+    python benchmarks/bench_streaming_train.py [--sizes 1000000,10000000] [--rounds 50]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+import numpy as np
+
+import train
+from encoders import EncoderPipeline, fold_ids
+from features import TRAINING_FEATURES, feature_matrix
+
+
+def _write_parquet(path, n, row_group_size=1_000_000):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rng = np.random.default_rng(0)
+    writer = None
+    for start in range(0, n, row_group_size):
+        table = pa.table(train.mock_columns(min(row_group_size, n - start), rng))
+        if writer is None:
+            writer = pq.ParquetWriter(path, table.schema)
+        writer.write_table(table, row_group_size=row_group_size)
+    writer.close()
+
+
+def _train_pandas(path, rounds):
+    """The previous approach: whole table in a DataFrame, then lgb.Dataset."""
+    import lightgbm as lgb
+    import pandas as pd
+
+    df = pd.read_parquet(path)
+    columns = {c: df[c].to_numpy() for c in df.columns}
+    folds = fold_ids(np.arange(len(df)))
+    encoder = EncoderPipeline.from_spec(list(columns)).fit(columns, columns["price"], folds)
+    names = TRAINING_FEATURES + encoder.output_names
+    X = pd.DataFrame(feature_matrix(columns, names, encoder, folds), columns=names)
+    lgb.train(train.PARAMS, lgb.Dataset(X, label=df["price"]), num_boost_round=rounds)
+
+
+def _child(mode, path, rounds, cache):
+    start = time.perf_counter()
+    if mode == "pandas":
+        _train_pandas(path, rounds)
+    else:
+        train.train_from_parquet(path, rounds, binary_cache=cache)
+    print(json.dumps({"seconds": time.perf_counter() - start, "peak_rss_mb": train.peak_rss_mb()}))
+
+
+def _run(mode, path, rounds, cache):
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode, "--data", path, "--rounds", str(rounds), "--cache", cache],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000000,10000000")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--modes", default="pandas,stream,stream-cached")
+    parser.add_argument("--child")
+    parser.add_argument("--data")
+    parser.add_argument("--cache")
+    args = parser.parse_args()
+    if args.child:
+        _child(args.child, args.data, args.rounds, args.cache)
+        return
+
+    print(f"{'rows':>10s} {'mode':>14s} {'seconds':>9s} {'peak RSS MB':>12s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(",")):
+            path = os.path.join(tmp, f"train_{size}.parquet")
+            cache = os.path.join(tmp, f"train_{size}.bin")
+            _write_parquet(path, size)
+            for mode in args.modes.split(","):
+                result = _run(mode, path, args.rounds, cache)
+                print(f"{size:10d} {mode:>14s} {result['seconds']:9.1f} {result['peak_rss_mb']:12.0f}", flush=True)
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,102 @@
+"""
+Benchmark: first-request latency after boot, with and without the startup
+warm-up.
+
+Trains a mock model into a temporary directory, then boots the service in a
+fresh process per mode (startup hooks included), waits for /ready and times
+the first /predict calls a replica would serve against the steady state,
+through an in-process ASGI transport:
+
+    no warm-up     PRICING_WARMUP_ROUNDS=0: /ready is true straight away
+    warm-up        the default rounds run before /ready turns true
+
+Usage:
+    python benchmarks/bench_warmup.py [--rounds 20] [--requests 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+import joblib
+import numpy as np
+
+_ITEM = {
+    "total_area_sqm": 62.5, "year_built": 2008, "minutes_to_station": 6, "latitude": 35.66,
+    "longitude": 139.71, "building_type": "mansion", "prefecture": "Tokyo",
+}
+
+
+def _train(output_dir):
+    import train
+
+    result = train.train_from_mock(n=20000, rounds=100)
+    joblib.dump(result.model, os.path.join(output_dir, "model.joblib"))
+    result.conformal.save(os.path.join(output_dir, "conformal.json"))
+    result.encoder.save(os.path.join(output_dir, "encoders.json"))
+    result.drift_reference.save(os.path.join(output_dir, "drift_reference.json"))
+    result.comps.save(os.path.join(output_dir, "comps.npz"))
+
+
+async def _child(requests):
+    """Boot the app in this process and report time to ready plus request latencies (ms)."""
+    boot = time.perf_counter()
+    import httpx
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app), httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        while (await client.get("/ready")).status_code != 200:
+            await asyncio.sleep(0.005)
+        ready_s = time.perf_counter() - boot
+        latencies = []
+        for i in range(requests):
+            body = dict(_ITEM, total_area_sqm=_ITEM["total_area_sqm"] + i * 0.01)
+            start = time.perf_counter()
+            (await client.post("/predict", json=body)).raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+        warmup = (await client.get("/ready")).json()["warmup"]
+    print(json.dumps({"ready_s": ready_s, "latencies": latencies, "warmup": warmup}))
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(_child(args.requests))
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        _train(workdir)
+        print(f"{'mode':>12s} {'ready s':>8s} {'1st ms':>8s} {'2nd ms':>8s} {'p50 ms':>8s} {'p99 ms':>8s}")
+        for mode, rounds in (("no warm-up", 0), ("warm-up", args.rounds)):
+            env = dict(os.environ, PRICING_WARMUP_ROUNDS=str(rounds), PYTHONPATH=_service_dir)
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", "--requests", str(args.requests)],
+                cwd=workdir, env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            report = json.loads(output.strip().splitlines()[-1])
+            ms = np.array(report["latencies"])
+            print(
+                f"{mode:>12s} {report['ready_s']:8.2f} {ms[0]:8.2f} {ms[1]:8.2f} "
+                f"{np.percentile(ms[1:], 50):8.2f} {np.percentile(ms[1:], 99):8.2f}"
+            )
+            if report["warmup"]:
+                for stage, latency in report["warmup"]["latency_ms"].items():
+                    print(f"{'':>12s} warm-up {stage:>15s}: cold {latency['cold']:7.2f} ms, warm {latency['warm']:7.2f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
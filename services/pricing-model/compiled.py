@@ -0,0 +1,247 @@
+"""
+Compiled tree-ensemble predictor.
+
+Flattens a trained LightGBM Booster (via ``dump_model()``) into flat node
+arrays and evaluates them without going through LightGBM's C API:
+
+- single rows run a generated pure-Python function (one nested if/else per
+  tree), which avoids the fixed per-call overhead of both NumPy and LightGBM's
+  C API (about 2x faster than Booster.predict on the pricing model);
+- batches walk every (row, tree) pair down the node arrays in lock step with
+  vectorized NumPy gathers, one step per tree level.
+
+LightGBM's native loop is still about 2x faster than the NumPy traversal on
+large batches, so ``from_booster`` hands batches back to the Booster by
+default and the NumPy path serves models compiled from a dump alone.
+
+Numerical splits follow LightGBM's NumericalDecision semantics, including
+``missing_type`` (None / Zero / NaN) and ``default_left``. Categorical splits
+and non-identity objectives are not supported; ``CompiledEnsemble`` raises
+ValueError for such models so callers can fall back to the Booster.
+"""
+from typing import Callable, List, Optional
+
+import numpy as np
+
+# missing_type codes in the node arrays
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+_MISSING_TYPES = {"None": MISSING_NONE, "Zero": MISSING_ZERO, "NaN": MISSING_NAN}
+
+# LightGBM's kZeroThreshold: |x| <= this counts as zero for missing_type Zero
+ZERO_THRESHOLD = 1e-35
+
+# Objectives whose raw score is the prediction
+_IDENTITY_OBJECTIVES = ("regression", "regression_l1", "huber", "fair", "quantile", "mape")
+
+# Rows per call at or below which the generated scalar function is used
+SCALAR_MAX_ROWS = 1
+
+# Python's tokenizer rejects more than 100 levels of indentation
+_MAX_CODEGEN_DEPTH = 90
+
+
+class CompiledEnsemble:
+    """Drop-in replacement for ``Booster.predict`` on numerical regression models."""
+
+    def __init__(self, dump: dict, batch_predict: Optional[Callable[[np.ndarray], np.ndarray]] = None):
+        objective = dump.get("objective", "regression").split()[0]
+        if objective not in _IDENTITY_OBJECTIVES:
+            raise ValueError(f"Unsupported objective for compiled engine: {objective}")
+        if dump.get("num_tree_per_iteration", 1) != 1:
+            raise ValueError("Multiclass models are not supported by the compiled engine")
+
+        self.num_features = dump["max_feature_idx"] + 1
+        self.feature_names = dump.get("feature_names", [])
+        self.average_output = bool(dump.get("average_output", False))
+        self.batch_predict = batch_predict
+
+        feature: List[int] = []
+        threshold: List[float] = []
+        missing: List[int] = []
+        default_left: List[bool] = []
+        left: List[int] = []
+        right: List[int] = []
+        leaf_value: List[float] = []
+        roots: List[int] = []
+        self.max_depth = 0
+
+        def add(node: dict, depth: int) -> int:
+            """Append node and its subtree; returns its index (leaves as ~leaf)."""
+            self.max_depth = max(self.max_depth, depth)
+            if "leaf_value" in node or "split_feature" not in node:
+                leaf_value.append(float(node.get("leaf_value", 0.0)))
+                return ~(len(leaf_value) - 1)
+            if node["decision_type"] != "<=":
+                raise ValueError("Categorical splits are not supported by the compiled engine")
+            index = len(feature)
+            feature.append(node["split_feature"])
+            threshold.append(float(node["threshold"]))
+            missing.append(_MISSING_TYPES[node["missing_type"]])
+            default_left.append(bool(node["default_left"]))
+            left.append(0)
+            right.append(0)
+            left[index] = add(node["left_child"], depth + 1)
+            right[index] = add(node["right_child"], depth + 1)
+            return index
+
+        for tree in dump["tree_info"]:
+            roots.append(add(tree["tree_structure"], 0))
+
+        self.feature = np.array(feature, dtype=np.intp)
+        self.threshold = np.array(threshold, dtype=np.float64)
+        self.missing_type = np.array(missing, dtype=np.int8)
+        self.default_left = np.array(default_left, dtype=bool)
+        self.left = np.array(left, dtype=np.intp)
+        self.right = np.array(right, dtype=np.intp)
+        self.leaf_value = np.array(leaf_value, dtype=np.float64)
+        self.roots = np.array(roots, dtype=np.intp)
+        # Children interleaved as [left, right] so a step is one gather.
+        self._children = np.column_stack([self.left, self.right]).ravel()
+        self.num_trees = len(roots)
+        self._has_missing_rules = bool((self.missing_type != MISSING_NONE).any())
+        self._predict_row = self._generate_row_function() if self.max_depth <= _MAX_CODEGEN_DEPTH else None
+
+    @classmethod
+    def from_booster(cls, booster, delegate_batches: bool = True) -> "CompiledEnsemble":
+        return cls(booster.dump_model(), booster.predict if delegate_batches else None)
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.num_features:
+            raise ValueError(f"Expected {self.num_features} features, got {X.shape[1]}")
+        if len(X) <= SCALAR_MAX_ROWS and self._predict_row is not None:
+            return self.predict_rows(X)
+        if self.batch_predict is not None:
+            return np.asarray(self.batch_predict(X), dtype=np.float64)
+        return self.predict_vectorized(X)
+
+    def predict_rows(self, X: np.ndarray) -> np.ndarray:
+        """Score row by row with the generated function."""
+        out = np.array([self._predict_row(row) for row in X.tolist()], dtype=np.float64)
+        return self._finish(out)
+
+    def predict_vectorized(self, X: np.ndarray, chunk_rows: int = 8192) -> np.ndarray:
+        """Score with the NumPy lock-step traversal."""
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), chunk_rows):
+            out[start:start + chunk_rows] = self._predict_vectorized(X[start:start + chunk_rows])
+        return self._finish(out)
+
+    def _finish(self, out: np.ndarray) -> np.ndarray:
+        if self.average_output and self.num_trees:
+            out /= self.num_trees
+        return out
+
+    def _predict_vectorized(self, X: np.ndarray) -> np.ndarray:
+        n, num_trees = len(X), self.num_trees
+        flat_x = X.ravel()
+        check_missing = self._has_missing_rules or bool(np.isnan(flat_x).any())
+        leaf_of = np.empty(n * num_trees, dtype=np.intp)
+        # One cursor per (row, tree), compacted as cursors reach a leaf.
+        slot = np.arange(n * num_trees, dtype=np.intp)
+        row_offset = np.repeat(np.arange(n, dtype=np.intp) * X.shape[1], num_trees)
+        node = np.tile(self.roots, n)
+        done = node < 0
+        while slot.size:
+            if done.any():
+                leaf_of[slot[done]] = ~node[done]
+                keep = ~done
+                slot, row_offset, node = slot[keep], row_offset[keep], node[keep]
+                if not slot.size:
+                    break
+            values = flat_x[row_offset + self.feature[node]]
+            if check_missing:
+                go_right = ~self._go_left(values, node)
+            else:
+                go_right = values > self.threshold[node]
+            node = self._children[2 * node + go_right]
+            done = node < 0
+        return self.leaf_value[leaf_of].reshape(n, num_trees).sum(axis=1)
+
+    def _go_left(self, values: np.ndarray, node: np.ndarray) -> np.ndarray:
+        missing_type = self.missing_type[node]
+        is_nan = np.isnan(values)
+        # NaN is treated as 0.0 unless the split has a dedicated NaN branch.
+        values = np.where(is_nan & (missing_type != MISSING_NAN), 0.0, values)
+        is_missing = (
+            ((missing_type == MISSING_ZERO) & (np.abs(values) <= ZERO_THRESHOLD))
+            | ((missing_type == MISSING_NAN) & is_nan)
+        )
+        return np.where(is_missing, self.default_left[node], values <= self.threshold[node])
+
+    def _generate_row_function(self):
+        """Generate ``predict_row(row) -> float`` with one if/else tree per tree."""
+        feature = self.feature.tolist()
+        threshold = self.threshold.tolist()
+        missing = self.missing_type.tolist()
+        default_left = self.default_left.tolist()
+        left, right = self.left.tolist(), self.right.tolist()
+        leaf_value = self.leaf_value.tolist()
+
+        def condition(i: int) -> str:
+            f, t = feature[i], repr(threshold[i])
+            if missing[i] == MISSING_NAN:
+                return f"(x{f} != x{f} or x{f} <= {t})" if default_left[i] else f"x{f} <= {t}"
+            if missing[i] == MISSING_ZERO:
+                is_zero = f"{-ZERO_THRESHOLD!r} <= z{f} <= {ZERO_THRESHOLD!r}"
+                return f"({is_zero} or z{f} <= {t})" if default_left[i] else f"(not ({is_zero}) and z{f} <= {t})"
+            return f"z{f} <= {t}"
+
+        lines = ["def predict_row(row):"]
+        names = ", ".join(f"x{f}" for f in range(self.num_features))
+        lines.append(f"    {names}, = row")
+        for f in range(self.num_features):
+            lines.append(f"    z{f} = 0.0 if x{f} != x{f} else x{f}")
+        lines.append("    total = 0.0")
+
+        def emit(node: int, indent: str):
+            if node < 0:
+                lines.append(f"{indent}total += {leaf_value[~node]!r}")
+                return
+            lines.append(f"{indent}if {condition(node)}:")
+            emit(left[node], indent + "    ")
+            lines.append(f"{indent}else:")
+            emit(right[node], indent + "    ")
+
+        for root in self.roots.tolist():
+            emit(root, "    ")
+        lines.append("    return total")
+
+        namespace: dict = {}
+        exec(compile("\n".join(lines), "<compiled-ensemble>", "exec"), namespace)
+        return namespace["predict_row"]
+
+    def stats(self) -> dict:
+        return {
+            "trees": self.num_trees,
+            "nodes": int(len(self.feature)),
+            "leaves": int(len(self.leaf_value)),
+            "max_depth": self.max_depth,
+        }
+
+
+def sample_feature_rows(dump: dict, n: int = 256, seed: int = 0) -> np.ndarray:
+    """Random rows within the training range of each feature, for verification."""
+    rng = np.random.default_rng(seed)
+    infos = dump.get("feature_infos", {})
+    columns = []
+    for name in dump.get("feature_names", []):
+        info = infos.get(name, {})
+        low, high = info.get("min_value", 0.0), info.get("max_value", 1.0)
+        columns.append(rng.uniform(low, high, n))
+    return np.column_stack(columns) if columns else np.empty((n, 0))
+
+
+def max_abs_error(compiled: CompiledEnsemble, booster, X: np.ndarray) -> float:
+    """
+    Largest absolute difference from Booster.predict over both compiled paths
+    (the generated row function and the vectorized traversal).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    expected = booster.predict(X)
+    error = float(np.max(np.abs(compiled.predict_vectorized(X) - expected), initial=0.0))
+    if compiled._predict_row is not None:
+        error = max(error, float(np.max(np.abs(compiled.predict_rows(X) - expected), initial=0.0)))
+    return error
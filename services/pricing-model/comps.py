@@ -0,0 +1,233 @@
+"""
+In-memory spatial index of past transactions, for comparable-sales lookup.
+
+Transactions are bucketed into a fixed latitude/longitude grid and stored
+sorted by cell, so every grid row of cells is one contiguous slice. A query
+for comps within r km finds the slice bounds of the few rows around the
+point with one ``searchsorted``, then filters and ranks the candidates
+with vectorized haversine distances. Cells are sized so that a 1 km query
+touches at most a 3 x 3 block.
+
+Besides direct lookups (/comps), the index supplies the
+``price_per_sqm_area_avg`` feature: the mean ¥/sqm of the nearest
+transactions around a listing. Training excludes each row's own sale.
+``area_average`` computes it for a whole batch at once: one candidate slice
+per listing and grid row, then all (listing, candidate) pairs are ranked by
+squared chord length in a few array operations instead of a query per row.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from features import EARTH_RADIUS_KM
+
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LON_EQUATOR = 111.320
+
+# Neighbourhood used for price_per_sqm_area_avg, in training and serving alike
+AREA_RADIUS_KM = 1.0
+AREA_K = 20
+
+# Upper bound on (point, candidate) pairs that area_average scores at once
+AREA_CHUNK_PAIRS = 1 << 21
+
+
+def unit_vectors(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """(3, n) points on the unit sphere; their squared chord ranks like great-circle distance."""
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def haversine_km(lat: float, lon: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    lat, lon = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat) / 2) ** 2 + np.cos(lat) * np.cos(lat2) * np.sin((lon2 - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class CompsIndex:
+    def __init__(
+        self,
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        year_built: np.ndarray,
+        price_per_sqm: np.ndarray,
+        cell_km: float = 1.0,
+    ):
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        self.cell_km = cell_km
+        self.lat0 = float(latitude.min()) if len(latitude) else 0.0
+        self.lon0 = float(longitude.min()) if len(longitude) else 0.0
+        self.cell_lat = cell_km / KM_PER_DEGREE_LAT
+        # Size longitude cells at the highest latitude, where degrees are
+        # shortest, so no cell is narrower than cell_km.
+        max_abs_lat = float(np.abs(latitude).max()) if len(latitude) else 0.0
+        self.cell_lon = cell_km / (KM_PER_DEGREE_LON_EQUATOR * np.cos(np.radians(max_abs_lat)))
+        rows, cols = self._cell(latitude, longitude)
+        self.n_cols = int(cols.max()) + 1 if len(cols) else 1
+        self.n_rows = int(rows.max()) + 1 if len(rows) else 1
+
+        keys = rows * self.n_cols + cols
+        # By cell, and by longitude within each grid row (cells are longitude bands)
+        order = np.lexsort((longitude, keys))
+        self.keys = keys[order]
+        # Grid row and longitude as one sortable key, for exact longitude bounds per row
+        self._row_span = self.n_cols * self.cell_lon + 1.0
+        self._row_lon = rows[order] * self._row_span + (longitude[order] - self.lon0)
+        # Position of each stored transaction in the input arrays
+        self.ids = order
+        self.latitude = latitude[order]
+        self.longitude = longitude[order]
+        self.year_built = np.asarray(year_built)[order].astype(np.int16)
+        self.price_per_sqm = np.asarray(price_per_sqm, dtype=np.float64)[order]
+        self._unit = unit_vectors(self.latitude, self.longitude)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _cell(self, latitude, longitude) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.floor((np.asarray(latitude) - self.lat0) / self.cell_lat).astype(np.int64)
+        cols = np.floor((np.asarray(longitude) - self.lon0) / self.cell_lon).astype(np.int64)
+        return rows, cols
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Positions of every transaction in the grid cells that can lie within radius_km."""
+        d_lat = radius_km / KM_PER_DEGREE_LAT
+        d_lon = radius_km / (KM_PER_DEGREE_LON_EQUATOR * max(np.cos(np.radians(abs(lat) + d_lat)), 1e-6))
+        (row_lo, row_hi), (col_lo, col_hi) = self._cell([lat - d_lat, lat + d_lat], [lon - d_lon, lon + d_lon])
+        row_lo, row_hi = max(row_lo, 0), min(row_hi, self.n_rows - 1)
+        col_lo, col_hi = max(col_lo, 0), min(col_hi, self.n_cols - 1)
+        if row_lo > row_hi or col_lo > col_hi:
+            return np.empty(0, dtype=np.intp)
+        rows = np.arange(row_lo, row_hi + 1) * self.n_cols
+        starts = np.searchsorted(self.keys, rows + col_lo, side="left")
+        stops = np.searchsorted(self.keys, rows + col_hi, side="right")
+        return np.concatenate([np.arange(a, b) for a, b in zip(starts.tolist(), stops.tolist())])
+
+    def query(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: float = 1.0,
+        k: int = 10,
+        built_after: Optional[int] = None,
+        exclude: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Up to k nearest transactions within radius_km (optionally built in or
+        after ``built_after``), nearest first. Returns (positions in the
+        index, distances in km). ``exclude`` drops one input row by its
+        original position, e.g. a training row's own sale.
+        """
+        candidates = self._candidates(lat, lon, radius_km)
+        if built_after is not None and len(candidates):
+            candidates = candidates[self.year_built[candidates] >= built_after]
+        if exclude is not None and len(candidates):
+            candidates = candidates[self.ids[candidates] != exclude]
+        distances = haversine_km(lat, lon, self.latitude[candidates], self.longitude[candidates])
+        within = distances <= radius_km
+        candidates, distances = candidates[within], distances[within]
+        if len(candidates) > k:
+            nearest = np.argpartition(distances, k - 1)[:k]
+            candidates, distances = candidates[nearest], distances[nearest]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+    def _candidate_ranges(
+        self, latitude: np.ndarray, longitude: np.ndarray, radius_km: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        _candidates for many points at once: one (point, start, stop) slice of
+        the sorted transactions per point and grid row in reach, ordered by
+        point. Slices are cut at the exact longitude bounds, not at cell edges.
+        """
+        d_lat = radius_km / KM_PER_DEGREE_LAT
+        d_lon = radius_km / (KM_PER_DEGREE_LON_EQUATOR * np.maximum(np.cos(np.radians(np.abs(latitude) + d_lat)), 1e-6))
+        row_lo, _ = self._cell(latitude - d_lat, longitude)
+        row_hi, _ = self._cell(latitude + d_lat, longitude)
+        row_lo, row_hi = np.maximum(row_lo, 0), np.minimum(row_hi, self.n_rows - 1)
+        spans = np.maximum(row_hi - row_lo + 1, 0)
+        point = np.repeat(np.arange(len(latitude)), spans)
+        rows = np.arange(len(point)) - np.repeat(np.cumsum(spans) - spans, spans) + row_lo[point]
+        west = np.clip(longitude - d_lon - self.lon0, 0.0, self._row_span - 1.0)[point]
+        east = np.clip(longitude + d_lon - self.lon0, -1.0, self._row_span - 1.0)[point]
+        starts = np.searchsorted(self._row_lon, rows * self._row_span + west, side="left")
+        stops = np.maximum(np.searchsorted(self._row_lon, rows * self._row_span + east, side="right"), starts)
+        return point, starts, stops
+
+    def area_average(
+        self,
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        radius_km: float = AREA_RADIUS_KM,
+        k: int = AREA_K,
+        exclude: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Mean ¥/sqm of the k nearest comps per point; NaN where there are none.
+        Vectorized over the points: every (point, candidate) pair is scored in
+        one pass, in chunks of at most AREA_CHUNK_PAIRS pairs.
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        out = np.full(len(latitude), np.nan)
+        if not len(latitude) or not len(self):
+            return out
+        point, starts, stops = self._candidate_ranges(latitude, longitude, radius_km)
+        query = unit_vectors(latitude, longitude)
+        max_chord2 = (2 * np.sin(radius_km / (2 * EARTH_RADIUS_KM))) ** 2
+        # Cumulative candidate count up to each slice, to cut the chunks
+        ends = np.cumsum(stops - starts)
+        lo = 0
+        while lo < len(point):
+            base = ends[lo - 1] if lo else 0
+            hi = max(int(np.searchsorted(ends, base + AREA_CHUNK_PAIRS, side="right")), lo + 1)
+            # Keep every slice of the last point in the chunk together
+            hi = int(np.searchsorted(point, point[hi - 1], side="right"))
+            self._area_chunk(point[lo:hi], starts[lo:hi], stops[lo:hi], query, max_chord2, k, exclude, out)
+            lo = hi
+        return out
+
+    def _area_chunk(self, point, starts, stops, query, max_chord2, k, exclude, out):
+        lengths = stops - starts
+        pairs = np.repeat(point, lengths)
+        positions = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths - starts, lengths)
+        if exclude is not None:
+            keep = self.ids[positions] != np.asarray(exclude)[pairs]
+            pairs, positions = pairs[keep], positions[keep]
+        # Squared chord instead of haversine: same order, no trigonometry per pair
+        chord2 = np.zeros(len(pairs))
+        for axis in range(3):
+            chord2 += (self._unit[axis][positions] - query[axis][pairs]) ** 2
+        within = chord2 <= max_chord2
+        pairs, positions, chord2 = pairs[within], positions[within], chord2[within]
+        if not len(pairs):
+            return
+        # Nearest first within each point: one argsort on point + chord2 scaled to [0, 1]
+        order = np.argsort((pairs - pairs[0]) * 2.0 + chord2 / max_chord2)
+        pairs, positions = pairs[order], positions[order]
+        found, first, counts = np.unique(pairs, return_index=True, return_counts=True)
+        nearest = np.arange(len(pairs)) - np.repeat(first, counts) < k
+        prices = np.where(nearest, self.price_per_sqm[positions], 0.0)
+        out[found] = np.add.reduceat(prices, first) / np.minimum(counts, k)
+
+    def save(self, path: str):
+        """Write the transactions (in input order) to an .npz file."""
+        inverse = np.empty_like(self.ids)
+        inverse[self.ids] = np.arange(len(self.ids))
+        np.savez(
+            path,
+            latitude=self.latitude[inverse],
+            longitude=self.longitude[inverse],
+            year_built=self.year_built[inverse],
+            price_per_sqm=self.price_per_sqm[inverse],
+            cell_km=np.array(self.cell_km),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "CompsIndex":
+        with np.load(path) as data:
+            return cls(
+                data["latitude"], data["longitude"], data["year_built"], data["price_per_sqm"], float(data["cell_km"])
+            )
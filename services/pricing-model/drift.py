@@ -0,0 +1,167 @@
+"""
+Population-stability (PSI) drift monitoring of live model inputs.
+
+``train.py`` stores a reference for each model column: quantile bin edges
+plus the share of calibration rows in each bin, with a final bin for missing
+values. Serving counts every scored row into the same bins and ``psi``
+compares the two distributions:
+
+    PSI = sum((live - reference) * ln(live / reference))
+
+Memory is constant: one int64 count per (column, bin) and shard, plus up
+to FLUSH_ROWS buffered rows per shard. There is a fixed set of SHARDS shards;
+threads are assigned to them round-robin on first use and each shard has its
+own lock, so concurrent scorers rarely contend and short-lived threadpool
+workers do not leave shards behind. Small batches are buffered and binned
+together, which keeps a single-row /predict at a list append. Readers sum
+the shards and bin what is still buffered.
+"""
+import itertools
+import json
+import threading
+import time
+from typing import List, Sequence
+
+import numpy as np
+
+# Floor for empty bins so ln(live / reference) stays finite
+PSI_EPSILON = 1e-4
+
+# Buffered rows per shard before they are binned
+FLUSH_ROWS = 256
+
+# Count shards shared by the recording threads
+SHARDS = 8
+
+
+class DriftReference:
+    def __init__(self, features: Sequence[str], edges: Sequence[Sequence[float]], proportions: Sequence[Sequence[float]]):
+        self.features = list(features)
+        # Interior edges per column; column j has len(edges[j]) + 1 value bins
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        # Per column: value bins, then the missing-value bin
+        self.proportions = [np.asarray(p, dtype=np.float64) for p in proportions]
+
+    @classmethod
+    def fit(cls, X: np.ndarray, features: Sequence[str], bins: int = 10) -> "DriftReference":
+        """Quantile bins and bin shares of a reference sample (n, len(features))."""
+        X = np.asarray(X, dtype=np.float64)
+        edges, proportions = [], []
+        for j in range(X.shape[1]):
+            column = X[:, j]
+            present = column[~np.isnan(column)]
+            # Ties (one-hot and low-cardinality columns) collapse to fewer bins
+            cuts = np.unique(np.quantile(present, np.linspace(0, 1, bins + 1)[1:-1])) if len(present) else np.array([])
+            counts = np.bincount(np.searchsorted(cuts, present, side="right"), minlength=len(cuts) + 1)
+            counts = np.append(counts, len(column) - len(present))
+            edges.append(cuts)
+            proportions.append(counts / max(len(column), 1))
+        return cls(features, edges, proportions)
+
+    def to_dict(self) -> dict:
+        return {
+            "features": self.features,
+            "edges": [e.tolist() for e in self.edges],
+            "proportions": [p.tolist() for p in self.proportions],
+        }
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "DriftReference":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["features"], data["edges"], data["proportions"])
+
+
+class _Shard:
+    """Counts and not-yet-binned rows of the threads assigned to one shard."""
+
+    __slots__ = ("lock", "counts", "pending", "pending_rows")
+
+    def __init__(self, size: int):
+        self.lock = threading.Lock()
+        self.counts = np.zeros(size, dtype=np.int64)
+        self.pending: List[np.ndarray] = []
+        self.pending_rows = 0
+
+
+class DriftMonitor:
+    """Streaming histograms of live feature rows in the reference bins."""
+
+    def __init__(self, reference: DriftReference, shards: int = SHARDS):
+        self.reference = reference
+        self.features = reference.features
+        n_bins = [len(e) + 2 for e in reference.edges]  # value bins + missing
+        self._offsets = np.concatenate([[0], np.cumsum(n_bins)[:-1]]).astype(np.intp)
+        self._missing = self._offsets + np.array(n_bins) - 1
+        self._size = int(sum(n_bins))
+        self._expected = np.maximum(np.concatenate(reference.proportions), PSI_EPSILON)
+        self._local = threading.local()
+        self._shards = [_Shard(self._size) for _ in range(max(shards, 1))]
+        self._next_shard = itertools.count()
+        self.started_at = time.time()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._shards[next(self._next_shard) % len(self._shards)]
+            self._local.shard = shard
+        return shard
+
+    def record(self, X: np.ndarray):
+        """Count a batch of model input rows (n, len(features)); X must not be modified afterwards."""
+        shard = self._shard()
+        with shard.lock:
+            shard.pending.append(X)
+            shard.pending_rows += len(X)
+            if shard.pending_rows >= FLUSH_ROWS:
+                pending, shard.pending, shard.pending_rows = shard.pending, [], 0
+                shard.counts += self._bin(pending)
+
+    def _bin(self, batches: List[np.ndarray]) -> np.ndarray:
+        if not batches:
+            return np.zeros(self._size, dtype=np.int64)
+        X = np.asarray(np.concatenate(batches), dtype=np.float64)
+        codes = np.empty(X.shape, dtype=np.intp)
+        for j, edges in enumerate(self.reference.edges):
+            codes[:, j] = np.searchsorted(edges, X[:, j], side="right")
+        codes += self._offsets
+        missing = np.isnan(X)
+        if missing.any():
+            codes[missing] = np.broadcast_to(self._missing, X.shape)[missing]
+        return np.bincount(codes.ravel(), minlength=self._size)
+
+    def counts(self) -> np.ndarray:
+        total = np.zeros(self._size, dtype=np.int64)
+        pending = []
+        for shard in self._shards:
+            with shard.lock:
+                total += shard.counts
+                pending.extend(shard.pending)
+        return total + self._bin(pending)
+
+    def psi(self) -> dict:
+        """PSI per feature against the reference, plus the live row count."""
+        counts = self.counts()
+        # Every row lands in exactly one bin per feature
+        n = int(counts.sum()) // max(len(self.features), 1)
+        if n == 0:
+            return {"rows": 0, "features": {name: None for name in self.features}}
+        actual = np.maximum(counts / n, PSI_EPSILON)
+        terms = (actual - self._expected) * np.log(actual / self._expected)
+        per_feature = np.add.reduceat(terms, self._offsets)
+        return {"rows": n, "features": {name: float(v) for name, v in zip(self.features, per_feature)}}
+
+    def reset(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.pending, shard.pending_rows = [], 0
+                shard.counts[:] = 0
+        self.started_at = time.time()
+
+
+def drifted_features(report: dict, threshold: float) -> List[str]:
+    return [name for name, value in report["features"].items() if value is not None and value > threshold]
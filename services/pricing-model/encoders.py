@@ -0,0 +1,284 @@
+"""
+Categorical encoders shared by training and serving.
+
+Encodings follow ml/training/feature_config.yaml: target encoding for
+high-cardinality columns, one-hot for building/structure type and ordinal
+for the earthquake standard. Each encoder keeps its vocabulary as a sorted
+NumPy string array and encodes a whole batch with one ``searchsorted`` plus
+array indexing; there are no per-row dict lookups. Missing (None/"") and
+unseen categories encode as the prior (target), all zeros (one-hot) or NaN
+(ordinal), which LightGBM treats as missing.
+
+A fitted pipeline serializes to JSON (``encoders.json``) next to the model.
+"""
+import json
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+# Folds for out-of-fold target encoding of training rows
+OOF_FOLDS = 5
+
+# (kind, column, options) per feature_config.yaml
+DEFAULT_SPEC = [
+    ("target", "prefecture", {}),
+    ("target", "municipality", {}),
+    ("target", "floor_plan_type", {}),
+    ("onehot", "building_type", {}),
+    ("onehot", "structure_type", {}),
+    ("ordinal", "earthquake_standard", {"order": ["old", "new", "grade1", "grade2", "grade3"]}),
+]
+
+
+def as_strings(values) -> np.ndarray:
+    """Batch of category values as a NumPy string array; None becomes ""."""
+    values = values if isinstance(values, np.ndarray) else np.array(values, dtype=object)
+    if values.dtype.kind == "U":
+        return values
+    out = values.astype(str)
+    if values.dtype.kind == "O":
+        out[np.equal(values, None)] = ""
+    return out
+
+
+def _lookup(vocabulary: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Index of each value in the sorted vocabulary, or len(vocabulary) if absent."""
+    if not len(vocabulary):
+        return np.zeros(len(values), dtype=np.intp)
+    idx = np.searchsorted(vocabulary, values)
+    clipped = np.minimum(idx, len(vocabulary) - 1)
+    return np.where(vocabulary[clipped] == values, clipped, len(vocabulary))
+
+
+def fold_ids(row_numbers: np.ndarray) -> np.ndarray:
+    """Deterministic out-of-fold assignment by row number."""
+    return np.asarray(row_numbers) % OOF_FOLDS
+
+
+class TargetEncoder:
+    """
+    Smoothed mean of the target per category. Statistics accumulate over
+    ``partial_fit`` calls (e.g. one per parquet row group) and become lookup
+    tables in ``finish``.
+    """
+
+    kind = "target"
+
+    def __init__(self, column: str, smoothing: float = 20.0):
+        self.column = column
+        self.smoothing = smoothing
+        self.categories = np.array([], dtype=str)
+        self.table = np.array([0.0])  # one value per category, then the prior
+        self.oof_tables = None  # (OOF_FOLDS, categories + 1), training only
+        self._stats: Dict[str, np.ndarray] = {}
+        self._y_sum = 0.0
+        self._y_count = 0
+        self._has_folds = False
+
+    @property
+    def output_names(self) -> List[str]:
+        return [f"{self.column}_te"]
+
+    def _smoothed(self, sums, counts, prior):
+        return (sums + self.smoothing * prior) / (counts + self.smoothing)
+
+    def partial_fit(self, values: np.ndarray, y: np.ndarray, folds: Optional[np.ndarray] = None):
+        """
+        Accumulate target sums and counts per category. With ``folds`` (a fold
+        id per row, below OOF_FOLDS) per-fold sums are kept too, so training
+        rows can be encoded without their own target.
+        """
+        y = np.asarray(y, dtype=np.float64)
+        uniques, inverse = np.unique(values, return_inverse=True)
+        k = len(uniques)
+        # Column 0 holds all rows, columns 1.. one fold each
+        sums = np.zeros((k, 1 + OOF_FOLDS))
+        counts = np.zeros((k, 1 + OOF_FOLDS))
+        sums[:, 0] = np.bincount(inverse, weights=y, minlength=k)
+        counts[:, 0] = np.bincount(inverse, minlength=k)
+        if folds is not None:
+            self._has_folds = True
+            cells = inverse * OOF_FOLDS + folds
+            sums[:, 1:] = np.bincount(cells, weights=y, minlength=k * OOF_FOLDS).reshape(k, OOF_FOLDS)
+            counts[:, 1:] = np.bincount(cells, minlength=k * OOF_FOLDS).reshape(k, OOF_FOLDS)
+        for i, category in enumerate(uniques.tolist()):
+            if category == "":
+                continue
+            stats = self._stats.setdefault(category, np.zeros((2, 1 + OOF_FOLDS)))
+            stats[0] += sums[i]
+            stats[1] += counts[i]
+        self._y_sum += float(y.sum())
+        self._y_count += len(y)
+        return self
+
+    def finish(self):
+        prior = self._y_sum / max(self._y_count, 1)
+        self.categories = np.array(sorted(self._stats), dtype=str)
+        stats = np.array([self._stats[c] for c in self.categories.tolist()]).reshape(-1, 2, 1 + OOF_FOLDS)
+        self.table = np.append(self._smoothed(stats[:, 0, 0], stats[:, 1, 0], prior), prior)
+        if self._has_folds:
+            out_of_fold_sums = stats[:, 0, :1] - stats[:, 0, 1:]
+            out_of_fold_counts = stats[:, 1, :1] - stats[:, 1, 1:]
+            tables = self._smoothed(out_of_fold_sums, out_of_fold_counts, prior)
+            self.oof_tables = np.vstack([tables, np.full((1, OOF_FOLDS), prior)]).T
+        self._stats = {}
+        return self
+
+    def transform(self, values: np.ndarray, folds: Optional[np.ndarray] = None) -> np.ndarray:
+        codes = _lookup(self.categories, values)
+        if folds is not None and self.oof_tables is not None:
+            return self.oof_tables[folds, codes][:, None]
+        return self.table[codes][:, None]
+
+    def state(self) -> dict:
+        return {"smoothing": self.smoothing, "categories": self.categories.tolist(), "table": self.table.tolist()}
+
+    def load_state(self, state: dict):
+        self.smoothing = state["smoothing"]
+        self.categories = np.array(state["categories"], dtype=str)
+        self.table = np.array(state["table"], dtype=np.float64)
+
+
+class OneHotEncoder:
+    kind = "onehot"
+
+    def __init__(self, column: str):
+        self.column = column
+        self.categories = np.array([], dtype=str)
+        self._seen = set()
+
+    @property
+    def output_names(self) -> List[str]:
+        return [f"{self.column}={category}" for category in self.categories]
+
+    def partial_fit(self, values: np.ndarray, y=None, folds=None):
+        self._seen.update(np.unique(values).tolist())
+        return self
+
+    def finish(self):
+        self.categories = np.array(sorted(self._seen - {""}), dtype=str)
+        self._seen = set()
+        return self
+
+    def transform(self, values: np.ndarray, folds=None) -> np.ndarray:
+        codes = _lookup(self.categories, values)
+        # The extra column absorbs unknown categories and is dropped.
+        return np.eye(len(self.categories) + 1)[codes][:, :-1]
+
+    def state(self) -> dict:
+        return {"categories": self.categories.tolist()}
+
+    def load_state(self, state: dict):
+        self.categories = np.array(state["categories"], dtype=str)
+
+
+class OrdinalEncoder:
+    kind = "ordinal"
+
+    def __init__(self, column: str, order: Sequence[str]):
+        self.column = column
+        self.order = list(order)
+        self._set_order()
+
+    def _set_order(self):
+        # Sorted vocabulary for lookup, with each entry's rank in the given order
+        by_name = np.argsort(np.array(self.order, dtype=str))
+        self.categories = np.array(self.order, dtype=str)[by_name]
+        self.ranks = np.append(by_name.astype(np.float64), np.nan)
+
+    @property
+    def output_names(self) -> List[str]:
+        return [f"{self.column}_ord"]
+
+    def partial_fit(self, values=None, y=None, folds=None):
+        return self
+
+    def finish(self):
+        return self
+
+    def transform(self, values: np.ndarray, folds=None) -> np.ndarray:
+        return self.ranks[_lookup(self.categories, values)][:, None]
+
+    def state(self) -> dict:
+        return {"order": self.order}
+
+    def load_state(self, state: dict):
+        self.order = list(state["order"])
+        self._set_order()
+
+
+def _make_encoder(kind: str, column: str, options: dict):
+    if kind == "target":
+        return TargetEncoder(column, **options)
+    if kind == "onehot":
+        return OneHotEncoder(column)
+    if kind == "ordinal":
+        return OrdinalEncoder(column, **options)
+    raise ValueError(f"Unknown encoder kind: {kind}")
+
+
+class EncoderPipeline:
+    def __init__(self, encoders: List):
+        self.encoders = encoders
+
+    @classmethod
+    def from_spec(cls, columns: Sequence[str], spec=DEFAULT_SPEC) -> "EncoderPipeline":
+        """Encoders from the spec for the categorical columns that are present."""
+        return cls([_make_encoder(kind, column, dict(options)) for kind, column, options in spec if column in columns])
+
+    @property
+    def input_columns(self) -> List[str]:
+        return [encoder.column for encoder in self.encoders]
+
+    @property
+    def output_names(self) -> List[str]:
+        return [name for encoder in self.encoders for name in encoder.output_names]
+
+    def partial_fit(self, columns: Mapping[str, Sequence], y: np.ndarray, folds: Optional[np.ndarray] = None):
+        """Accumulate statistics from one batch of training rows."""
+        for encoder in self.encoders:
+            encoder.partial_fit(as_strings(columns[encoder.column]), y, folds)
+        return self
+
+    def finish(self):
+        for encoder in self.encoders:
+            encoder.finish()
+        return self
+
+    def fit(self, columns: Mapping[str, Sequence], y: np.ndarray, folds: Optional[np.ndarray] = None):
+        return self.partial_fit(columns, y, folds).finish()
+
+    def transform(self, columns: Mapping[str, Sequence], folds: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Encoded output columns by name."""
+        out = {}
+        for encoder in self.encoders:
+            encoded = encoder.transform(as_strings(columns[encoder.column]), folds)
+            for j, name in enumerate(encoder.output_names):
+                out[name] = encoded[:, j]
+        return out
+
+    def to_dict(self) -> dict:
+        return {
+            "encoders": [
+                {"kind": encoder.kind, "column": encoder.column, **encoder.state()} for encoder in self.encoders
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EncoderPipeline":
+        encoders = []
+        for entry in data["encoders"]:
+            options = {"order": entry["order"]} if entry["kind"] == "ordinal" else {}
+            encoder = _make_encoder(entry["kind"], entry["column"], options)
+            encoder.load_state(entry)
+            encoders.append(encoder)
+        return cls(encoders)
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "EncoderPipeline":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,172 @@
+"""
+Per-prediction explanations from LightGBM tree-path contributions.
+
+``Booster.predict(X, pred_contrib=True)`` runs TreeSHAP over the whole batch
+in native code and returns one contribution per input column plus the base
+value; the contributions sum to the raw prediction. Encoded columns
+(``building_type=mansion``, ``prefecture_te``) are summed back onto their
+source feature, the top ``top_k`` by magnitude are kept, and the result is
+cached per feature vector in an LRU so repeated listings skip the model.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# feature -> (ja, en), per feature_config.yaml
+FEATURE_LABELS = {
+    "total_area_sqm": ("専有面積", "floor area"),
+    "year_built": ("築年", "year built"),
+    "minutes_to_station": ("駅徒歩分", "walk to station"),
+    "latitude": ("緯度", "latitude"),
+    "longitude": ("経度", "longitude"),
+    "distance_to_cbd_km": ("都心距離", "distance to city centre"),
+    "price_per_sqm_area_avg": ("周辺成約単価", "nearby sale prices"),
+    "prefecture": ("都道府県", "prefecture"),
+    "municipality": ("市区町村", "municipality"),
+    "building_type": ("物件種別", "building type"),
+    "structure_type": ("構造", "structure"),
+    "earthquake_standard": ("耐震基準", "earthquake standard"),
+    "floor_plan_type": ("間取り", "floor plan"),
+}
+
+
+def feature_label(name: str, language: str = "en") -> str:
+    labels = FEATURE_LABELS.get(name)
+    if labels is None:
+        return name
+    return labels[0] if language == "ja" else labels[1]
+
+
+def source_features(columns: Sequence[str], encoder=None) -> Tuple[List[str], np.ndarray]:
+    """
+    Source feature names and, per model column, the index of its source
+    (several one-hot columns share one source).
+    """
+    owner = {}
+    if encoder is not None:
+        for enc in encoder.encoders:
+            owner.update({name: enc.column for name in enc.output_names})
+    sources: List[str] = []
+    index = np.empty(len(columns), dtype=np.intp)
+    for j, column in enumerate(columns):
+        source = owner.get(column, column)
+        if source not in sources:
+            sources.append(source)
+        index[j] = sources.index(source)
+    return sources, index
+
+
+class ExplanationCache:
+    """Thread-safe LRU of contribution rows keyed by the raw feature vector bytes."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        out = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                out.append(value)
+        return out
+
+    def put_many(self, keys: Sequence[bytes], values: np.ndarray):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for key, value in zip(keys, values):
+                # Copy so an entry does not pin the whole batch array
+                self._entries[key] = np.array(value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TreeExplainer:
+    def __init__(self, model, columns: Sequence[str], encoder=None, top_k: int = 5, cache_size: int = 10000):
+        self.model = model
+        self.sources, source_index = source_features(columns, encoder)
+        # (columns, sources) 0/1 matrix: one matmul sums encoded columns per source
+        self._grouping = np.eye(len(self.sources))[source_index]
+        self.top_k = min(top_k, len(self.sources))
+        self.cache = ExplanationCache(cache_size)
+
+    def contributions(self, X: np.ndarray) -> np.ndarray:
+        """
+        (n, len(sources) + 1) contributions per source feature, base value
+        last. Only rows missing from the cache go to the model, in one call.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        # The row bytes are the key: dict hashing makes lookups O(1), and
+        # unlike a digest there is no chance of two listings colliding.
+        keys = [row.tobytes() for row in X]
+        cached = self.cache.get_many(keys)
+        out = np.empty((len(X), len(self.sources) + 1))
+        missing = [i for i, value in enumerate(cached) if value is None]
+        for i, value in enumerate(cached):
+            if value is not None:
+                out[i] = value
+        if missing:
+            raw = np.asarray(self.model.predict(X[missing], pred_contrib=True), dtype=np.float64)
+            grouped = np.column_stack([raw[:, :-1] @ self._grouping, raw[:, -1]])
+            out[missing] = grouped
+            self.cache.put_many([keys[i] for i in missing], grouped)
+        return out
+
+    def top_factors(self, X: np.ndarray) -> List[List[Tuple[str, float]]]:
+        """The top_k (source feature, contribution) pairs per row, largest magnitude first."""
+        contributions = self.contributions(X)[:, :-1]
+        order = np.argsort(-np.abs(contributions), axis=1, kind="stable")[:, :self.top_k]
+        values = np.take_along_axis(contributions, order, axis=1)
+        return [
+            [(self.sources[j], float(v)) for j, v in zip(row_order, row_values)]
+            for row_order, row_values in zip(order.tolist(), values.tolist())
+        ]
+
+
+def _format_yen(amount: float, language: str) -> str:
+    sign = "+" if amount >= 0 else "-"
+    if language == "ja":
+        return f"{sign}{abs(amount) / 10000:,.0f}万円"
+    return f"{sign}¥{abs(amount):,.0f}"
+
+
+def describe(factors: Sequence[Tuple[str, float]], language: str = "en") -> str:
+    """One-line summary of the main price factors."""
+    parts = [f"{feature_label(name, language)} {_format_yen(value, language)}" for name, value in factors]
+    if language == "ja":
+        return "主な価格要因: " + "、".join(parts)
+    return "Main price factors: " + ", ".join(parts) + "."
+
+
+def factor_dicts(factors: Sequence[Tuple[str, float]]) -> List[Dict]:
+    return [
+        {
+            "feature": name,
+            "label_ja": feature_label(name, "ja"),
+            "label_en": feature_label(name, "en"),
+            "contribution": int(round(value)),
+        }
+        for name, value in factors
+    ]
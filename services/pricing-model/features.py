@@ -0,0 +1,113 @@
+"""
+Feature definitions shared by training (train.py) and serving (main.py).
+
+Derived features are computed from raw columns with vectorized NumPy, and
+categorical columns go through a fitted EncoderPipeline, so the same code
+builds a 10M-row training matrix and a single request row.
+"""
+from typing import List, Mapping, Optional, Sequence
+
+import numpy as np
+
+# Raw listing columns, in the order the original model was trained on
+BASE_FEATURES = ["total_area_sqm", "year_built", "minutes_to_station", "latitude", "longitude"]
+
+# Central business districts (lat, lon) for distance_to_cbd_km
+CBD_COORDINATES = {
+    "tokyo": (35.6812, 139.7671),   # Tokyo Station
+    "osaka": (34.7025, 135.4959),   # Umeda
+    "nagoya": (35.1709, 136.8815),  # Nagoya Station
+}
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _cbd_distances_km(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """(n, len(CBD_COORDINATES)) great-circle distances, in km."""
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))[:, None]
+    lon = np.radians(np.asarray(longitude, dtype=np.float64))[:, None]
+    cbd = np.radians(np.array(list(CBD_COORDINATES.values())))
+    cbd_lat, cbd_lon = cbd[:, 0][None, :], cbd[:, 1][None, :]
+    a = np.sin((cbd_lat - lat) / 2) ** 2 + np.cos(lat) * np.cos(cbd_lat) * np.sin((cbd_lon - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def distance_to_cbd_km(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """Great-circle distance to the nearest CBD, in km."""
+    return _cbd_distances_km(latitude, longitude).min(axis=1)
+
+
+def nearest_cbd(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """Index into CBD_COORDINATES of the nearest CBD (the listing's region)."""
+    return _cbd_distances_km(latitude, longitude).argmin(axis=1)
+
+
+# name -> (input columns, function)
+DERIVED_FEATURES = {
+    "distance_to_cbd_km": (("latitude", "longitude"), distance_to_cbd_km),
+}
+
+# Columns the training pipeline fits on
+TRAINING_FEATURES = BASE_FEATURES + list(DERIVED_FEATURES)
+
+# Mean ¥/sqm of nearby past transactions; computed by the caller from a
+# comps.CompsIndex and passed in as a column
+COMPS_FEATURE = "price_per_sqm_area_avg"
+
+
+def source_columns(names: Sequence[str], encoder=None) -> list:
+    """Raw columns needed to build the given features."""
+    encoded = set(encoder.output_names) if encoder is not None else set()
+    needed = list(encoder.input_columns) if encoded.intersection(names) else []
+    for name in names:
+        if name in encoded:
+            continue
+        for column in DERIVED_FEATURES[name][0] if name in DERIVED_FEATURES else (name,):
+            if column not in needed:
+                needed.append(column)
+    return needed
+
+
+def feature_matrix(
+    columns: Mapping[str, np.ndarray], names: Sequence[str], encoder=None, folds: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    (n, len(names)) float64 matrix from raw columns, computing derived
+    features and categorical encodings (see encoders.py). ``folds`` selects
+    out-of-fold target encoding for training rows.
+    """
+    n = len(next(iter(columns.values()))) if columns else 0
+    encoded = encoder.transform(columns, folds) if encoder is not None else {}
+    out = np.empty((n, len(names)), dtype=np.float64)
+    for j, name in enumerate(names):
+        if name in encoded:
+            out[:, j] = encoded[name]
+        elif name in DERIVED_FEATURES:
+            inputs, fn = DERIVED_FEATURES[name]
+            out[:, j] = fn(*(columns[column] for column in inputs))
+        else:
+            out[:, j] = columns[name]
+    return out
+
+
+def is_known_feature(name: str, encoder=None) -> bool:
+    return (
+        name in BASE_FEATURES
+        or name in DERIVED_FEATURES
+        or name == COMPS_FEATURE
+        or (encoder is not None and name in encoder.output_names)
+    )
+
+
+def model_feature_columns(model, encoder=None) -> List[str]:
+    """The model's input columns by name; unnamed models get BASE_FEATURES."""
+    if hasattr(model, "feature_name"):
+        names = model.feature_name()
+    else:
+        names = getattr(model, "feature_names", None)
+    if not names or all(name.startswith("Column_") for name in names):
+        return BASE_FEATURES
+    unknown = [name for name in names if not is_known_feature(name, encoder)]
+    if unknown:
+        raise ValueError(f"Model uses unknown features: {', '.join(unknown)}")
+    return list(names)
@@ -0,0 +1,76 @@
+"""
+Split-conformal prediction intervals for the pricing model.
+
+``train.py`` holds out a calibration set and records, per bin of predicted
+price, the empirical quantiles of the relative residual ``actual / predicted
+- 1``. Serving turns a batch of point predictions into intervals with one
+``searchsorted`` and two gathers, so intervals cost no extra model calls.
+
+Quantiles use the finite-sample split-conformal correction, so each bin
+covers at least ``1 - alpha`` of exchangeable new points.
+"""
+import json
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+
+def _conformal_quantile(values: np.ndarray, level: float) -> float:
+    """The ceil((n + 1) * level)-th smallest value (the largest if out of range)."""
+    values = np.sort(values)
+    rank = min(math.ceil((len(values) + 1) * level), len(values))
+    return float(values[max(rank, 1) - 1])
+
+
+class ConformalTable:
+    def __init__(self, alpha: float, bin_edges: List[float], lower: List[float], upper: List[float]):
+        self.alpha = alpha
+        # Interior edges between bins; len(bin_edges) == len(lower) - 1
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self.upper = np.asarray(upper, dtype=np.float64)
+
+    @classmethod
+    def fit(
+        cls, predictions: np.ndarray, actuals: np.ndarray, alpha: float = 0.1, min_bin_size: int = 50, max_bins: int = 10
+    ) -> "ConformalTable":
+        predictions = np.asarray(predictions, dtype=np.float64)
+        ratios = np.asarray(actuals, dtype=np.float64) / predictions - 1
+        n_bins = max(1, min(max_bins, len(predictions) // min_bin_size))
+        edges = np.quantile(predictions, np.linspace(0, 1, n_bins + 1)[1:-1])
+        bins = np.searchsorted(edges, predictions, side="right")
+        lower, upper = [], []
+        for b in range(n_bins):
+            in_bin = ratios[bins == b]
+            if not len(in_bin):
+                # Tied predictions can leave a bin empty; use every residual.
+                in_bin = ratios
+            # Lower tail: the conformal quantile of the negated ratios.
+            lower.append(-_conformal_quantile(-in_bin, 1 - alpha / 2))
+            upper.append(_conformal_quantile(in_bin, 1 - alpha / 2))
+        return cls(alpha, edges.tolist(), lower, upper)
+
+    def interval(self, predictions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Lower and upper bounds for a batch of point predictions."""
+        predictions = np.asarray(predictions, dtype=np.float64)
+        bins = np.searchsorted(self.bin_edges, predictions, side="right")
+        return predictions * (1 + self.lower[bins]), predictions * (1 + self.upper[bins])
+
+    def to_dict(self) -> dict:
+        return {
+            "alpha": self.alpha,
+            "bin_edges": self.bin_edges.tolist(),
+            "lower": self.lower.tolist(),
+            "upper": self.upper.tolist(),
+        }
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "ConformalTable":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["alpha"], data["bin_edges"], data["lower"], data["upper"])
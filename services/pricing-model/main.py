@@ -1,26 +1,238 @@
+import asyncio
 import os
+import threading
+import time
+
 import joblib
-import pandas as pd
-from fastapi import FastAPI, HTTPException
+import numpy as np
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+from batcher import PredictBatcher
+from drift import DriftMonitor, DriftReference, drifted_features
+from features import BASE_FEATURES, COMPS_FEATURE, feature_matrix, model_feature_columns
+from comps import CompsIndex
+from compiled import CompiledEnsemble, max_abs_error, sample_feature_rows
+from encoders import EncoderPipeline
+from explain import TreeExplainer, describe, factor_dicts
+from intervals import ConformalTable
+from registry import ModelBundle, ModelRegistry
 
 app = FastAPI(title="IKIGAI Pricing Model Service")
 
 # Model path
 MODEL_PATH = "model.joblib"
-model = None
+
+# Conformal interval table written by train.py next to the model
+CONFORMAL_PATH = "conformal.json"
+
+# Categorical encoders written by train.py next to the model
+ENCODER_PATH = "encoders.json"
+
+# Past transactions for comparable-sales lookup (see comps.py) written by
+# train.py next to the model; registry versions carry their own copy
+COMPS_PATH = os.getenv("PRICING_COMPS_PATH", "comps.npz")
+
+# Training-time feature distribution for the /drift PSI check
+DRIFT_REFERENCE_PATH = "drift_reference.json"
+DRIFT_PSI_THRESHOLD = float(os.getenv("PRICING_DRIFT_PSI_THRESHOLD", "0.2"))
+
+# Relative half-width used when no conformal table is available
+FALLBACK_INTERVAL = 0.1
+
+# Prediction engine: "lightgbm" (Booster.predict) or "compiled" (compiled.py)
+PRICING_ENGINE = os.getenv("PRICING_ENGINE", "lightgbm").lower()
+COMPILED_ENGINE_RTOL = float(os.getenv("PRICING_COMPILED_RTOL", "1e-6"))
+
+# Top factors per explanation and LRU size of the per-feature-vector cache
+EXPLAIN_TOP_K = int(os.getenv("PRICING_EXPLAIN_TOP_K", "5"))
+EXPLAIN_CACHE_SIZE = int(os.getenv("PRICING_EXPLAIN_CACHE_SIZE", "10000"))
+
+# Versioned model registry (see registry.py); unset serves MODEL_PATH directly
+MODEL_REGISTRY_DIR = os.getenv("PRICING_MODEL_REGISTRY")
+REGISTRY_POLL_S = float(os.getenv("PRICING_REGISTRY_POLL_S", "30"))
+ADMIN_TOKEN = os.getenv("PRICING_ADMIN_TOKEN")
+
+# Startup warm-up: rounds of synthetic requests through the serving path
+# before /ready reports true (0 skips the warm-up)
+WARMUP_ROUNDS = int(os.getenv("PRICING_WARMUP_ROUNDS", "20"))
+WARMUP_BATCH_SIZES = (1, 8, 64)
+model_registry = ModelRegistry(MODEL_REGISTRY_DIR) if MODEL_REGISTRY_DIR else None
+
+# The bundle serving requests. Reloads build a new bundle off the request path
+# and replace this reference; in-flight requests keep the one they started with.
+active_bundle = ModelBundle()
+last_reload_error = None
+_reload_lock = threading.Lock()
+registry_watcher = None
+warmup_task = None
+# Set once the startup warm-up has finished; /ready answers 503 until then
+ready = False
+warmup_report = None
+
+
+def compile_model(booster):
+    """
+    Compile the booster and check it against Booster.predict on rows sampled
+    from the training ranges; returns the booster itself if either step fails.
+    """
+    try:
+        compiled = CompiledEnsemble.from_booster(booster)
+        dump = booster.dump_model()
+    except ValueError as e:
+        print(f"Compiled engine unavailable ({e}), using LightGBM")
+        return booster
+    sample = sample_feature_rows(dump)
+    scale = float(np.max(np.abs(booster.predict(sample)), initial=1.0))
+    error = max_abs_error(compiled, booster, sample)
+    if error > COMPILED_ENGINE_RTOL * scale:
+        print(f"Compiled engine mismatch (max abs error {error:.3g}), using LightGBM")
+        return booster
+    return compiled
+
+
+def make_explainer(model, columns, encoder, warmup) -> Optional[TreeExplainer]:
+    """A TreeExplainer if the model supports pred_contrib, warmed up on the given rows."""
+    try:
+        explainer = TreeExplainer(model, columns, encoder, top_k=EXPLAIN_TOP_K, cache_size=EXPLAIN_CACHE_SIZE)
+        explainer.top_factors(warmup)
+    except Exception as e:
+        print(f"Explanations unavailable ({e})")
+        return None
+    return explainer
+
+
+def make_drift_monitor(reference: Optional[DriftReference], columns) -> Optional[DriftMonitor]:
+    if reference is None:
+        return None
+    if reference.features != list(columns):
+        print("Drift reference does not match the model's features, drift monitoring off")
+        return None
+    return DriftMonitor(reference)
+
+
+def prepare_bundle(
+    version,
+    model,
+    conformal,
+    encoder: Optional[EncoderPipeline] = None,
+    drift_reference: Optional[DriftReference] = None,
+    comps: Optional[CompsIndex] = None,
+) -> ModelBundle:
+    """
+    Compile (if configured), validate and warm up a model before it serves.
+    A model that uses price_per_sqm_area_avg needs the comps index it was
+    trained with.
+    """
+    booster = model
+    if PRICING_ENGINE == "compiled":
+        model = compile_model(model)
+    columns = model_feature_columns(model, encoder)
+    if COMPS_FEATURE in columns and comps is None:
+        raise ValueError(f"Model {version} uses {COMPS_FEATURE} but has no comparable-sales index")
+    warmup_columns = dict(zip(FEATURE_COLUMNS, WARMUP_FEATURES.T))
+    if encoder is not None:
+        # Unknown categories exercise the prior / missing-value path
+        warmup_columns.update({column: [None] * len(WARMUP_FEATURES) for column in encoder.input_columns})
+    if COMPS_FEATURE in columns:
+        warmup_columns[COMPS_FEATURE] = comps.area_average(warmup_columns["latitude"], warmup_columns["longitude"])
+    warmup = feature_matrix(warmup_columns, columns, encoder)
+    for rows in (1, len(warmup)):
+        prices = np.asarray(model.predict(warmup[:rows]))
+        if prices.shape != (rows,) or not np.all(np.isfinite(prices)) or np.any(prices <= 0):
+            raise ValueError(f"Model {version} failed validation: implausible prices {prices[:3]}")
+    return ModelBundle(
+        version=version,
+        model=model,
+        conformal=conformal,
+        engine="compiled" if isinstance(model, CompiledEnsemble) else "lightgbm",
+        feature_columns=columns,
+        encoder=encoder,
+        # Contributions always come from the booster, whichever engine serves
+        explainer=make_explainer(booster, columns, encoder, warmup[:1]),
+        drift=make_drift_monitor(drift_reference, columns),
+        comps=comps,
+    )
+
+
+def reload_model(version: Optional[str] = None) -> bool:
+    """
+    Load, validate and swap in a model: the given registry version, the
+    registry's active version, or MODEL_PATH without a registry. Returns
+    whether the serving model changed.
+    """
+    global active_bundle, last_reload_error
+    with _reload_lock:
+        if model_registry is not None:
+            version = version or model_registry.active_version()
+            if version is None or version == active_bundle.version:
+                return False
+        elif not os.path.exists(MODEL_PATH):
+            return False
+        try:
+            if model_registry is not None:
+                model, conformal, encoder, drift_reference, comps = model_registry.read(version)
+            else:
+                version = "local"
+                model = joblib.load(MODEL_PATH)
+                conformal = ConformalTable.load(CONFORMAL_PATH) if os.path.exists(CONFORMAL_PATH) else None
+                encoder = EncoderPipeline.load(ENCODER_PATH) if os.path.exists(ENCODER_PATH) else None
+                drift_reference = (
+                    DriftReference.load(DRIFT_REFERENCE_PATH) if os.path.exists(DRIFT_REFERENCE_PATH) else None
+                )
+                comps = CompsIndex.load(COMPS_PATH) if os.path.exists(COMPS_PATH) else None
+            bundle = prepare_bundle(version, model, conformal, encoder, drift_reference, comps)
+        except Exception as e:
+            last_reload_error = {"version": version, "error": str(e)}
+            raise
+        active_bundle = bundle
+        last_reload_error = None
+        print(f"Model {version} loaded successfully ({bundle.engine} engine)")
+        return True
+
+
+def poll_registry():
+    """Reload if the registry's active version changed and was not already rejected."""
+    version = model_registry.active_version()
+    if version is None or version == active_bundle.version:
+        return
+    if last_reload_error is not None and last_reload_error["version"] == version:
+        return
+    try:
+        reload_model(version)
+    except Exception as e:
+        print(f"Model {version} rejected: {e}")
+
+
+async def _watch_registry():
+    while True:
+        await asyncio.sleep(REGISTRY_POLL_S)
+        await run_in_threadpool(poll_registry)
 
 # Load model on startup
 @app.on_event("startup")
 def load_model():
-    global model
-    if os.path.exists(MODEL_PATH):
-        model = joblib.load(MODEL_PATH)
-        print("Model loaded successfully")
-    else:
+    try:
+        loaded = reload_model()
+    except Exception as e:
+        print(f"Model failed to load ({e}), using dummy predictor")
+        return
+    if not loaded:
         print("Model not found, using dummy predictor")
 
+@app.on_event("startup")
+async def start_registry_watcher():
+    global registry_watcher
+    if model_registry is not None and REGISTRY_POLL_S > 0:
+        registry_watcher = asyncio.get_running_loop().create_task(_watch_registry())
+
+@app.on_event("startup")
+async def start_warmup():
+    global warmup_task
+    warmup_task = asyncio.get_running_loop().create_task(warm_up())
+
 class PropertyFeatures(BaseModel):
     total_area_sqm: float
     year_built: int
@@ -29,11 +241,31 @@ class PropertyFeatures(BaseModel):
     longitude: float
     building_type: str  
     region: str = "tokyo" # tokyo, osaka, nagoya
+    # Optional categoricals, encoded per feature_config.yaml when the model uses them
+    prefecture: Optional[str] = None
+    municipality: Optional[str] = None
+    floor_plan_type: Optional[str] = None # 1R, 1K, 1LDK, 2LDK, ...
+    structure_type: Optional[str] = None # RC, SRC, steel, wood
+    earthquake_standard: Optional[str] = None # old, new, grade1-3
     
+class PriceFactor(BaseModel):
+    feature: str
+    label_ja: str
+    label_en: str
+    contribution: int # yen, signed
+
 class PredictionResponse(BaseModel):
     predicted_price: int
     confidence_interval: List[int]
     explanation: str
+    explanation_ja: Optional[str] = None
+    factors: Optional[List[PriceFactor]] = None # top contributions, largest first
+
+class BatchPredictionRequest(BaseModel):
+    items: List[PropertyFeatures]
+
+class BatchPredictionResponse(BaseModel):
+    predictions: List[PredictionResponse]
 
 # Constants
 REGION_MULTIPLIERS = {
@@ -56,38 +288,400 @@ RENOVATION_COSTS = {
     "full": 150000 # per sqm for full renovation
 }
 
+# Renovation cost tables as (scope, quality, region) tensors, so a full quote
+# grid for an area is one fused array operation: fixed + area * per_sqm.
+RENOVATION_SCOPES = ["full", "kitchen", "bath", "toilet", "wallpaper", "flooring"]
+RENOVATION_QUALITIES = list(QUALITY_MULTIPLIERS)
+RENOVATION_REGIONS = list(REGION_MULTIPLIERS)
+WALL_AREA_FACTOR = 3 # approx wall area per sqm of floor
+RENOVATION_DURATION_WEEKS = {"full": 8, "kitchen": 1, "bath": 2, "toilet": 1, "wallpaper": 2, "flooring": 2}
+
+_scope_fixed = np.array([0, RENOVATION_COSTS["kitchen"], RENOVATION_COSTS["bath"], RENOVATION_COSTS["toilet"], 0, 0], dtype=np.float64)
+_scope_per_sqm = np.array([
+    RENOVATION_COSTS["full"], 0, 0, 0,
+    RENOVATION_COSTS["wallpaper"] * WALL_AREA_FACTOR, RENOVATION_COSTS["flooring"],
+], dtype=np.float64)
+_quality_region = np.multiply.outer(
+    np.array([QUALITY_MULTIPLIERS[q] for q in RENOVATION_QUALITIES]),
+    np.array([REGION_MULTIPLIERS[r] for r in RENOVATION_REGIONS]),
+)
+RENOVATION_FIXED_TENSOR = _scope_fixed[:, None, None] * _quality_region
+RENOVATION_PER_SQM_TENSOR = _scope_per_sqm[:, None, None] * _quality_region
+
 BASE_PRICE_PER_SQM_TOKYO = 1000000
 
+# Default model input columns, for models without feature names (see features.py)
+FEATURE_COLUMNS = BASE_FEATURES
+
+# Representative listings used to validate and warm up a model before it serves
+WARMUP_FEATURES = np.array([
+    [25.0, 1985, 15, 35.62, 139.62],
+    [55.0, 2005, 8, 35.68, 139.72],
+    [90.0, 2020, 3, 35.69, 139.78],
+] * 22, dtype=np.float64)
+
+MAX_BATCH_SIZE = int(os.getenv("PRICING_MAX_BATCH_SIZE", "10000"))
+
+# Dynamic batching of concurrent single /predict calls (0 disables)
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PRICING_PREDICT_BATCH_MAX_SIZE", "64"))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("PRICING_PREDICT_BATCH_MAX_WAIT_MS", "2"))
+
+
+def build_feature_matrix(
+    items: List[PropertyFeatures],
+    columns: Optional[List[str]] = None,
+    encoder: Optional[EncoderPipeline] = None,
+    comps: Optional[CompsIndex] = None,
+) -> np.ndarray:
+    """Stack request features into one contiguous (n, n_features) float64 matrix."""
+    raw = np.array(
+        [[getattr(item, column) for column in FEATURE_COLUMNS] for item in items],
+        dtype=np.float64,
+    ).reshape(len(items), len(FEATURE_COLUMNS))
+    if columns is None or columns == FEATURE_COLUMNS:
+        return raw
+    # Derived features (e.g. distance_to_cbd_km) and encodings are computed as in training
+    raw_columns = dict(zip(FEATURE_COLUMNS, raw.T))
+    if COMPS_FEATURE in columns:
+        if comps is None:
+            raise ValueError(f"{COMPS_FEATURE} needs a comparable-sales index")
+        raw_columns[COMPS_FEATURE] = comps.area_average(raw_columns["latitude"], raw_columns["longitude"])
+    if encoder is not None:
+        for column in encoder.input_columns:
+            raw_columns[column] = [getattr(item, column, None) for item in items]
+    return feature_matrix(raw_columns, columns, encoder)
+
+
+def predict_with_intervals(
+    items: List[PropertyFeatures], bundle: Optional[ModelBundle] = None, X: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    (n, 3) array of point, lower and upper prices for a batch, from a single
+    model.predict call; the interval is a conformal table lookup on the point.
+    Pass bundle and X to score against an already built feature matrix.
+    """
+    bundle = bundle or active_bundle
+    multipliers = np.array([REGION_MULTIPLIERS.get(item.region.lower(), 1.0) for item in items])
+    if bundle.model:
+        if X is None:
+            X = build_feature_matrix(items, bundle.feature_columns, bundle.encoder, bundle.comps)
+        point = bundle.model.predict(X)
+        if bundle.drift is not None:
+            bundle.drift.record(X)
+    else:
+        # Dummy logic if no model trained yet
+        point = np.array([item.total_area_sqm for item in items]) * BASE_PRICE_PER_SQM_TOKYO
+    if bundle.model and bundle.conformal is not None:
+        lower, upper = bundle.conformal.interval(point)
+    else:
+        lower, upper = point * (1 - FALLBACK_INTERVAL), point * (1 + FALLBACK_INTERVAL)
+    # Apply regional adjustment to model output if model determines base price (simplified)
+    return np.column_stack([point, lower, upper]) * multipliers[:, None]
+
+
+def predict_prices(items: List[PropertyFeatures]) -> np.ndarray:
+    """Predicted prices for a batch, with a single model.predict call."""
+    return predict_with_intervals(items)[:, 0]
+
+
+def explain_items(
+    items: List[PropertyFeatures], bundle: Optional[ModelBundle] = None, X: Optional[np.ndarray] = None
+) -> list:
+    """
+    Top price factors per item as (feature, yen contribution) pairs, from one
+    pred_contrib call for the rows not already cached; None per item when the
+    model cannot be explained.
+    """
+    bundle = bundle or active_bundle
+    if bundle.explainer is None:
+        return [None] * len(items)
+    multipliers = [REGION_MULTIPLIERS.get(item.region.lower(), 1.0) for item in items]
+    if X is None:
+        X = build_feature_matrix(items, bundle.feature_columns, bundle.encoder, bundle.comps)
+    factors = bundle.explainer.top_factors(X)
+    return [
+        [(name, value * multiplier) for name, value in row]
+        for row, multiplier in zip(factors, multipliers)
+    ]
+
+
+def score_items(items: List[PropertyFeatures], explain: List[bool]) -> Tuple[np.ndarray, list]:
+    """
+    Prices and top factors (for the items with explain set) from one read of
+    active_bundle and one feature matrix, so a model swap mid-request cannot
+    pair one version's price with another's explanation.
+    """
+    bundle = active_bundle
+    X = build_feature_matrix(items, bundle.feature_columns, bundle.encoder, bundle.comps) if bundle.model else None
+    predictions = predict_with_intervals(items, bundle, X)
+    factors = [None] * len(items)
+    rows = [i for i, wanted in enumerate(explain) if wanted]
+    if rows and bundle.explainer is not None:
+        explained = explain_items([items[i] for i in rows], bundle, X[rows] if len(rows) < len(items) else X)
+        for i, row in zip(rows, explained):
+            factors[i] = row
+    return predictions, factors
+
+
+def score_requests(requests: List[Tuple[PropertyFeatures, bool]]) -> list:
+    """(prediction row, factors) per queued /predict call, for the batcher."""
+    predictions, factors = score_items([item for item, _ in requests], [explain for _, explain in requests])
+    return list(zip(predictions, factors))
+
+
+predict_batcher = (
+    PredictBatcher(score_requests, max_batch=PREDICT_BATCH_MAX_SIZE, max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS)
+    if PREDICT_BATCH_MAX_SIZE > 1
+    else None
+)
+
+
+def to_response(features: PropertyFeatures, prediction, factors=None) -> PredictionResponse:
+    """Build the response from one (point, lower, upper) row and optional top factors."""
+    point, lower, upper = prediction
+    if not factors:
+        return PredictionResponse(
+            predicted_price=int(point),
+            confidence_interval=[int(lower), int(upper)],
+            explanation=f"Based on size and location trends for {features.region.title()}."
+        )
+    return PredictionResponse(
+        predicted_price=int(point),
+        confidence_interval=[int(lower), int(upper)],
+        explanation=describe(factors, "en"),
+        explanation_ja=describe(factors, "ja"),
+        factors=factor_dicts(factors),
+    )
+
+def warmup_items(n: int, offset: float = 0.0) -> List[PropertyFeatures]:
+    """n synthetic listings from WARMUP_FEATURES, sizes shifted by offset to miss the explanation cache."""
+    regions = list(REGION_MULTIPLIERS)
+    items = []
+    for i in range(n):
+        values = dict(zip(FEATURE_COLUMNS, WARMUP_FEATURES[i % len(WARMUP_FEATURES)].tolist()))
+        values["total_area_sqm"] += offset
+        items.append(PropertyFeatures(**values, building_type="mansion", region=regions[i % len(regions)]))
+    return items
+
+
+def _cold_warm(samples_ms: List[float]) -> dict:
+    """Latency of the first call and the median of the rest."""
+    return {"cold": round(samples_ms[0], 3), "warm": round(float(np.median(samples_ms[1:])), 3)}
+
+
+def _cold_warm_ms(fn, rounds: int) -> dict:
+    """Time fn over rounds + 1 calls; fn gets the round number."""
+    samples = []
+    for round_ in range(rounds + 1):
+        start = time.perf_counter()
+        fn(round_)
+        samples.append((time.perf_counter() - start) * 1000)
+    return _cold_warm(samples)
+
+
+def warm_up_batches(rounds: int) -> dict:
+    """Cold vs warm latency of /predict/batch, with and without explanations, per batch size."""
+    latency = {}
+    for explain in (False, True):
+        for size in WARMUP_BATCH_SIZES:
+            def call(round_):
+                request = BatchPredictionRequest(items=warmup_items(size, offset=round_ * 0.01))
+                predict_price_batch(request, explain=explain)
+            latency[f"batch{size}{'_explain' if explain else ''}"] = _cold_warm_ms(call, rounds)
+    return latency
+
+
+async def warm_up():
+    """
+    Run synthetic requests through the active model, encoders, explainer and
+    the /predict batcher, then mark the service ready. Drift counts are reset
+    afterwards so the synthetic rows do not show up in /drift.
+    """
+    global ready, warmup_report
+    if WARMUP_ROUNDS <= 0:
+        ready = True
+        return
+    bundle = active_bundle
+    start = time.perf_counter()
+    try:
+        latency = await run_in_threadpool(warm_up_batches, WARMUP_ROUNDS)
+        samples = []
+        for round_ in range(WARMUP_ROUNDS + 1):
+            item = warmup_items(1, offset=round_ * 0.01)[0]
+            request_start = time.perf_counter()
+            await predict_price(item)
+            samples.append((time.perf_counter() - request_start) * 1000)
+        latency["single"] = _cold_warm(samples)
+    except Exception as e:
+        warmup_report = {"model_version": bundle.version, "error": str(e)}
+        print(f"Warm-up failed ({e}), not ready")
+        return
+    if bundle.drift is not None:
+        bundle.drift.reset()
+    warmup_report = {
+        "model_version": bundle.version,
+        "rounds": WARMUP_ROUNDS,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        "latency_ms": latency,
+    }
+    ready = True
+    print(f"Warm-up done in {warmup_report['duration_ms']:.0f} ms: " + ", ".join(
+        f"{stage} {ms['cold']:.1f} -> {ms['warm']:.1f} ms" for stage, ms in latency.items()
+    ))
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    if predict_batcher is not None:
+        await predict_batcher.close()
+    if registry_watcher is not None:
+        registry_watcher.cancel()
+    if warmup_task is not None:
+        warmup_task.cancel()
+
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "model_loaded": model is not None}
+    bundle = active_bundle
+    return {
+        "status": "ok",
+        "ready": ready,
+        "model_loaded": bundle.model is not None,
+        "model_version": bundle.version,
+        "engine": bundle.engine,
+        "intervals": "conformal" if bundle.model and bundle.conformal is not None else "fixed",
+        "last_reload_error": last_reload_error,
+        "batching": predict_batcher.stats() if predict_batcher is not None else None,
+        "explanations": bundle.explainer.cache.stats() if bundle.explainer is not None else None,
+        "comps_transactions": len(bundle.comps) if bundle.comps is not None else None,
+    }
+
+@app.get("/ready")
+def readiness_check():
+    """200 once the startup warm-up has finished, 503 before (or if it failed)."""
+    if not ready:
+        raise HTTPException(status_code=503, detail=warmup_report or "Warming up")
+    return {"ready": True, "model_version": active_bundle.version, "warmup": warmup_report}
 
 @app.post("/predict", response_model=PredictionResponse)
-def predict_price(features: PropertyFeatures):
+async def predict_price(features: PropertyFeatures, explain: bool = True):
+    """Price one property; explain=false skips the factor breakdown."""
     try:
-        multiplier = REGION_MULTIPLIERS.get(features.region.lower(), 1.0)
-        
-        if model:
-            # Prepare input dataframe matching training schema
-            input_data = features.dict()
-            input_data.pop("building_type", None)
-            input_data.pop("region", None)
-            input_df = pd.DataFrame([input_data])
-            prediction = model.predict(input_df)[0]
-            # Apply regional adjustment to model output if model determines base price (simplified)
-            prediction = prediction * multiplier
+        if predict_batcher is not None:
+            prediction, factors = await predict_batcher.submit((features, explain))
         else:
-            # Dummy logic if no model trained yet
-            prediction = features.total_area_sqm * BASE_PRICE_PER_SQM_TOKYO * multiplier
-            
-        return PredictionResponse(
-            predicted_price=int(prediction),
-            confidence_interval=[int(prediction * 0.9), int(prediction * 1.1)],
-            explanation=f"Based on size and location trends for {features.region.title()}."
+            predictions, explained = await run_in_threadpool(score_items, [features], [explain])
+            prediction, factors = predictions[0], explained[0]
+        return to_response(features, prediction, factors)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+def predict_price_batch(request: BatchPredictionRequest, explain: bool = True):
+    """Score many properties with one vectorized model call (plus one pred_contrib call if explain)."""
+    if len(request.items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413, detail=f"Batch size exceeds maximum of {MAX_BATCH_SIZE}"
+        )
+    if not request.items:
+        return BatchPredictionResponse(predictions=[])
+    try:
+        predictions, factors = score_items(request.items, [explain] * len(request.items))
+        return BatchPredictionResponse(
+            predictions=[to_response(f, p, e) for f, p, e in zip(request.items, predictions.tolist(), factors)]
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/drift")
+def drift_report():
+    """PSI of live model inputs since load (or the last reset) against the training reference."""
+    bundle = active_bundle
+    if bundle.drift is None:
+        raise HTTPException(status_code=404, detail="No drift reference for the active model")
+    start = time.perf_counter()
+    report = bundle.drift.psi()
+    drifted = drifted_features(report, DRIFT_PSI_THRESHOLD)
+    return {
+        "model_version": bundle.version,
+        "since": bundle.drift.started_at,
+        "rows": report["rows"],
+        "threshold": DRIFT_PSI_THRESHOLD,
+        "psi": report["features"],
+        "drifted": drifted,
+        "compute_us": round((time.perf_counter() - start) * 1e6, 1),
+    }
+
+@app.post("/admin/drift/reset")
+def reset_drift(x_admin_token: Optional[str] = Header(None)):
+    """Start a new drift window, e.g. after each weekly check."""
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    bundle = active_bundle
+    if bundle.drift is None:
+        raise HTTPException(status_code=404, detail="No drift reference for the active model")
+    bundle.drift.reset()
+    return {"model_version": bundle.version, "since": bundle.drift.started_at}
+
+class CompsRequest(BaseModel):
+    latitude: float
+    longitude: float
+    radius_km: float = 1.0
+    k: int = 10
+    built_after: Optional[int] = None # year built, inclusive
+
+class Comparable(BaseModel):
+    latitude: float
+    longitude: float
+    distance_km: float
+    year_built: int
+    price_per_sqm: int
+
+class CompsResponse(BaseModel):
+    comps: List[Comparable]
+    area_price_per_sqm: Optional[int] # mean of the returned comps
+    query_us: float
+
+@app.post("/comps", response_model=CompsResponse)
+def find_comps(request: CompsRequest):
+    """The k nearest past transactions within radius_km, nearest first, from the active model's index."""
+    index = active_bundle.comps
+    if index is None:
+        raise HTTPException(status_code=503, detail="No comparable-sales index loaded")
+    if request.radius_km <= 0 or request.k < 1:
+        raise HTTPException(status_code=400, detail="radius_km and k must be positive")
+    start = time.perf_counter()
+    positions, distances = index.query(
+        request.latitude, request.longitude, request.radius_km, request.k, request.built_after
+    )
+    elapsed = time.perf_counter() - start
+    prices = index.price_per_sqm[positions]
+    return CompsResponse(
+        comps=[
+            Comparable(latitude=lat, longitude=lon, distance_km=round(d, 3), year_built=year, price_per_sqm=int(price))
+            for lat, lon, d, year, price in zip(
+                index.latitude[positions].tolist(), index.longitude[positions].tolist(), distances.tolist(),
+                index.year_built[positions].tolist(), prices.tolist(),
+            )
+        ],
+        area_price_per_sqm=int(prices.mean()) if len(prices) else None,
+        query_us=round(elapsed * 1e6, 1),
+    )
+
+class ReloadRequest(BaseModel):
+    version: Optional[str] = None
+
+@app.post("/admin/reload")
+async def reload_model_endpoint(request: Optional[ReloadRequest] = None, x_admin_token: Optional[str] = Header(None)):
+    """Load, validate and swap in a model version without dropping requests."""
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    try:
+        changed = await run_in_threadpool(reload_model, request.version if request else None)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Model rejected: {e}")
+    return {"changed": changed, "model_version": active_bundle.version}
+
 class RenovationRequest(BaseModel):
     total_area_sqm: float
     scope: str # full, kitchen, bath, wallpaper, flooring
@@ -142,6 +736,53 @@ def estimate_renovation(request: RenovationRequest):
         duration_weeks=duration
     )
 
+class RenovationMatrixRequest(BaseModel):
+    total_area_sqm: float
+    combinations: List[List[str]] = [] # e.g. [["kitchen", "bath", "flooring"]]
+
+class CombinedRenovationQuote(BaseModel):
+    scopes: List[str]
+    costs: List[List[int]] # quality x region
+    duration_weeks: int
+
+class RenovationMatrixResponse(BaseModel):
+    scopes: List[str]
+    qualities: List[str]
+    regions: List[str]
+    costs: List[List[List[int]]] # scope x quality x region
+    combined: List[CombinedRenovationQuote]
+
+@app.post("/renovate/matrix", response_model=RenovationMatrixResponse)
+def estimate_renovation_matrix(request: RenovationMatrixRequest):
+    """Every scope x quality x region cost for one area, plus combined-scope quotes."""
+    scope_index = {scope: i for i, scope in enumerate(RENOVATION_SCOPES)}
+    selection = np.zeros((len(request.combinations), len(RENOVATION_SCOPES)))
+    for row, scopes in enumerate(request.combinations):
+        unknown = [scope for scope in scopes if scope not in scope_index]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown renovation scope(s): {', '.join(unknown)}")
+        selection[row, [scope_index[scope] for scope in set(scopes)]] = 1
+
+    grid = RENOVATION_FIXED_TENSOR + request.total_area_sqm * RENOVATION_PER_SQM_TENSOR
+    # One matmul prices every combination: (C, S) @ (S, Q * R)
+    combined = (selection @ grid.reshape(len(RENOVATION_SCOPES), -1)).reshape(-1, *grid.shape[1:])
+
+    return RenovationMatrixResponse(
+        scopes=RENOVATION_SCOPES,
+        qualities=RENOVATION_QUALITIES,
+        regions=RENOVATION_REGIONS,
+        costs=grid.astype(np.int64).tolist(),
+        combined=[
+            CombinedRenovationQuote(
+                scopes=scopes,
+                costs=costs,
+                # Trades work one after another
+                duration_weeks=sum(RENOVATION_DURATION_WEEKS[scope] for scope in set(scopes)),
+            )
+            for scopes, costs in zip(request.combinations, combined.astype(np.int64).tolist())
+        ],
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
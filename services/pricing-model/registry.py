@@ -0,0 +1,144 @@
+"""
+Versioned local model registry.
+
+Layout::
+
+    <root>/
+        CURRENT              # name of the version to serve (optional)
+        2024q3/model.joblib
+        2024q3/conformal.json
+        2024q3/encoders.json
+        2024q3/drift_reference.json
+        2024q3/comps.npz     # comps index of models using price_per_sqm_area_avg
+        2024q4/model.joblib
+        ...
+
+Without a CURRENT pointer the newest version (natural sort order) is served.
+``publish`` stages a version under a temporary name and renames it into
+place, then rewrites CURRENT with ``os.replace``, so a watcher never sees a
+half-written version.
+"""
+import os
+import re
+import shutil
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+import joblib
+
+from comps import CompsIndex
+from drift import DriftReference
+from encoders import EncoderPipeline
+from intervals import ConformalTable
+
+MODEL_FILE = "model.joblib"
+CONFORMAL_FILE = "conformal.json"
+ENCODER_FILE = "encoders.json"
+DRIFT_FILE = "drift_reference.json"
+COMPS_FILE = "comps.npz"
+CURRENT_FILE = "CURRENT"
+
+
+@dataclass
+class ModelBundle:
+    """Everything one prediction needs, swapped in as a single reference."""
+    version: Optional[str] = None
+    model: Any = None
+    conformal: Optional[ConformalTable] = None
+    engine: Optional[str] = None
+    # Model input columns; None means main.FEATURE_COLUMNS
+    feature_columns: Optional[List[str]] = None
+    encoder: Optional[EncoderPipeline] = None
+    # explain.TreeExplainer over the LightGBM booster; None if unsupported
+    explainer: Any = None
+    # drift.DriftMonitor of this model's live inputs; None without a reference
+    drift: Any = None
+    # comps.CompsIndex the model's price_per_sqm_area_avg is computed from
+    comps: Optional[CompsIndex] = None
+    loaded_at: float = field(default_factory=time.time)
+
+
+def _version_key(version: str) -> Tuple:
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"(\d+)", version) if part)
+
+
+class ModelRegistry:
+    def __init__(self, root: str):
+        self.root = root
+
+    def versions(self) -> List[str]:
+        """Published versions, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        names = [
+            name for name in os.listdir(self.root)
+            if not name.startswith(".") and os.path.isfile(os.path.join(self.root, name, MODEL_FILE))
+        ]
+        return sorted(names, key=_version_key)
+
+    def active_version(self) -> Optional[str]:
+        pointer = os.path.join(self.root, CURRENT_FILE)
+        if os.path.exists(pointer):
+            with open(pointer) as f:
+                version = f.read().strip()
+            if version:
+                return version
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def read(
+        self, version: str
+    ) -> Tuple[Any, Optional[ConformalTable], Optional[EncoderPipeline], Optional[DriftReference], Optional[CompsIndex]]:
+        """Load a version's model and (if present) its conformal table, encoders, drift reference and comps index."""
+        directory = os.path.join(self.root, version)
+        model_path = os.path.join(directory, MODEL_FILE)
+        if not os.path.isfile(model_path):
+            raise FileNotFoundError(f"Model version {version} not found in {self.root}")
+        conformal_path = os.path.join(directory, CONFORMAL_FILE)
+        conformal = ConformalTable.load(conformal_path) if os.path.exists(conformal_path) else None
+        encoder_path = os.path.join(directory, ENCODER_FILE)
+        encoder = EncoderPipeline.load(encoder_path) if os.path.exists(encoder_path) else None
+        drift_path = os.path.join(directory, DRIFT_FILE)
+        drift_reference = DriftReference.load(drift_path) if os.path.exists(drift_path) else None
+        comps_path = os.path.join(directory, COMPS_FILE)
+        comps = CompsIndex.load(comps_path) if os.path.exists(comps_path) else None
+        return joblib.load(model_path), conformal, encoder, drift_reference, comps
+
+    def publish(
+        self,
+        version: str,
+        model_path: str,
+        conformal_path: Optional[str] = None,
+        activate: bool = True,
+        encoder_path: Optional[str] = None,
+        drift_path: Optional[str] = None,
+        comps_path: Optional[str] = None,
+    ):
+        """Copy a trained model into the registry and optionally make it current."""
+        target = os.path.join(self.root, version)
+        if os.path.exists(target):
+            raise FileExistsError(f"Model version {version} already exists")
+        staging = os.path.join(self.root, f".staging-{version}")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        shutil.copy2(model_path, os.path.join(staging, MODEL_FILE))
+        if conformal_path and os.path.exists(conformal_path):
+            shutil.copy2(conformal_path, os.path.join(staging, CONFORMAL_FILE))
+        if encoder_path and os.path.exists(encoder_path):
+            shutil.copy2(encoder_path, os.path.join(staging, ENCODER_FILE))
+        if drift_path and os.path.exists(drift_path):
+            shutil.copy2(drift_path, os.path.join(staging, DRIFT_FILE))
+        if comps_path and os.path.exists(comps_path):
+            shutil.copy2(comps_path, os.path.join(staging, COMPS_FILE))
+        os.replace(staging, target)
+        if activate:
+            self.activate(version)
+
+    def activate(self, version: str):
+        if version not in self.versions():
+            raise FileNotFoundError(f"Model version {version} not found in {self.root}")
+        tmp = os.path.join(self.root, f".{CURRENT_FILE}.tmp")
+        with open(tmp, "w") as f:
+            f.write(version + "\n")
+        os.replace(tmp, os.path.join(self.root, CURRENT_FILE))
@@ -0,0 +1,78 @@
+"""
+Tests for batch price prediction.
+"""
+import sys
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+lgb = pytest.importorskip("lightgbm")
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+import main
+from registry import ModelBundle
+
+
+def _train_booster(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "total_area_sqm": rng.uniform(20, 100, n),
+        "year_built": rng.integers(1980, 2024, n),
+        "minutes_to_station": rng.integers(1, 20, n),
+        "latitude": rng.uniform(35.6, 35.7, n),
+        "longitude": rng.uniform(139.6, 139.8, n),
+    })
+    price = df["total_area_sqm"] * 1_000_000 * (1 - (2024 - df["year_built"]) * 0.01)
+    return lgb.train({"objective": "regression", "verbosity": -1}, lgb.Dataset(df, label=price), 20)
+
+
+def _item(i):
+    return {
+        "total_area_sqm": 30 + i,
+        "year_built": 1990 + i % 30,
+        "minutes_to_station": 1 + i % 15,
+        "latitude": 35.65,
+        "longitude": 139.7,
+        "building_type": "mansion",
+        "region": ["tokyo", "osaka", "nagoya"][i % 3],
+    }
+
+
+@pytest.fixture
+def client_with_model(monkeypatch):
+    monkeypatch.setattr(main, "active_bundle", ModelBundle(version="test", model=_train_booster()))
+    return TestClient(main.app)
+
+
+def test_batch_matches_single_predictions(client_with_model):
+    items = [_item(i) for i in range(12)]
+    batch = client_with_model.post("/predict/batch", json={"items": items}).json()["predictions"]
+    singles = [client_with_model.post("/predict", json=item).json() for item in items]
+    assert batch == singles
+
+
+def test_feature_matrix_matches_training_dataframe(client_with_model):
+    items = [main.PropertyFeatures(**_item(i)) for i in range(5)]
+    frame = pd.DataFrame([{c: getattr(it, c) for c in main.FEATURE_COLUMNS} for it in items])
+    np.testing.assert_allclose(
+        main.active_bundle.model.predict(main.build_feature_matrix(items)), main.active_bundle.model.predict(frame)
+    )
+
+
+def test_batch_applies_region_multiplier(client_with_model):
+    tokyo, osaka = _item(0), dict(_item(0), region="osaka")
+    preds = client_with_model.post("/predict/batch", json={"items": [tokyo, osaka]}).json()["predictions"]
+    assert preds[1]["predicted_price"] < preds[0]["predicted_price"]
+
+
+def test_empty_and_oversized_batches(client_with_model, monkeypatch):
+    assert client_with_model.post("/predict/batch", json={"items": []}).json() == {"predictions": []}
+    monkeypatch.setattr(main, "MAX_BATCH_SIZE", 2)
+    response = client_with_model.post("/predict/batch", json={"items": [_item(i) for i in range(3)]})
+    assert response.status_code == 413
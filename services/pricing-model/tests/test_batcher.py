@@ -0,0 +1,90 @@
+"""
+Tests for dynamic batching of single /predict calls.
+"""
+import asyncio
+import sys
+import os
+
+import pytest
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from batcher import PredictBatcher
+
+
+def _recording_predict(calls):
+    def predict(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+    return predict
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_one_batch():
+    calls = []
+    batcher = PredictBatcher(_recording_predict(calls), max_batch=64, max_wait_ms=20)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+    assert results == [i * 10 for i in range(10)]
+    assert calls == [list(range(10))]
+    assert batcher.stats()["avg_batch_size"] == 10
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_max_batch_caps_batch_size():
+    calls = []
+    batcher = PredictBatcher(_recording_predict(calls), max_batch=4, max_wait_ms=1000)
+    results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(10))), 5)
+    assert results == [i * 10 for i in range(10)]
+    assert max(len(c) for c in calls) <= 4
+    assert sorted(i for c in calls for i in c) == list(range(10))
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_lone_request_is_not_held_past_max_wait():
+    batcher = PredictBatcher(_recording_predict([]), max_batch=64, max_wait_ms=5)
+    start = asyncio.get_running_loop().time()
+    assert await batcher.submit(3) == 30
+    assert asyncio.get_running_loop().time() - start < 1
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller_in_the_batch():
+    def failing(items):
+        raise RuntimeError("model exploded")
+
+    batcher = PredictBatcher(failing, max_batch=8, max_wait_ms=10)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    # The worker keeps serving after a failed batch.
+    batcher.predict_fn = _recording_predict([])
+    assert await batcher.submit(1) == 10
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_requests_arriving_during_scoring_form_the_next_batch():
+    calls = []
+    release = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def slow_predict(items):
+        calls.append(list(items))
+        if len(calls) == 1:
+            asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+        return [item * 10 for item in items]
+
+    batcher = PredictBatcher(slow_predict, max_batch=64, max_wait_ms=0)
+    first = asyncio.ensure_future(batcher.submit(0))
+    while not calls:
+        await asyncio.sleep(0.001)
+    rest = [asyncio.ensure_future(batcher.submit(i)) for i in range(1, 6)]
+    await asyncio.sleep(0.01)
+    release.set()
+    assert await first == 0
+    assert await asyncio.gather(*rest) == [10, 20, 30, 40, 50]
+    assert calls == [[0], [1, 2, 3, 4, 5]]
+    await batcher.close()
@@ -0,0 +1,112 @@
+"""
+Tests for the compiled tree-ensemble engine.
+"""
+import sys
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+lgb = pytest.importorskip("lightgbm")
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+import compiled
+from compiled import CompiledEnsemble, max_abs_error, sample_feature_rows
+
+
+def _pricing_booster(n=1000, rounds=50, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.uniform(20, 100, n),
+        rng.integers(1980, 2024, n),
+        rng.integers(1, 20, n),
+        rng.uniform(35.6, 35.7, n),
+        rng.uniform(139.6, 139.8, n),
+    ])
+    price = X[:, 0] * 1_000_000 * (1 - (2024 - X[:, 1]) * 0.01) * (1 - X[:, 2] * 0.02)
+    return lgb.train({"objective": "regression", "verbosity": -1}, lgb.Dataset(X, label=price), rounds)
+
+
+def _missing_booster(zero_as_missing):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(2000, 4))
+    X[rng.random(X.shape) < 0.2] = np.nan
+    X[rng.random(X.shape) < 0.2] = 0.0
+    y = np.nan_to_num(X).sum(axis=1) + np.isnan(X[:, 0]) * 3
+    params = {"objective": "regression", "verbosity": -1, "zero_as_missing": zero_as_missing}
+    return lgb.train(params, lgb.Dataset(X, label=y), 30), X
+
+
+@pytest.fixture(scope="module")
+def booster():
+    return _pricing_booster()
+
+
+@pytest.mark.parametrize("rows", [1, 5, 3000])
+def test_matches_booster_predict(booster, rows):
+    engine = CompiledEnsemble.from_booster(booster, delegate_batches=False)
+    X = sample_feature_rows(booster.dump_model(), n=rows)
+    expected = booster.predict(X)
+    np.testing.assert_allclose(engine.predict(X), expected, rtol=1e-9)
+    np.testing.assert_allclose(engine.predict_rows(X), expected, rtol=1e-9)
+    np.testing.assert_allclose(engine.predict_vectorized(X, chunk_rows=1000), expected, rtol=1e-9)
+
+
+def test_batches_are_delegated_to_the_booster(booster):
+    calls = []
+    engine = CompiledEnsemble(booster.dump_model(), lambda X: calls.append(len(X)) or booster.predict(X))
+    X = sample_feature_rows(booster.dump_model(), n=compiled.SCALAR_MAX_ROWS + 3)
+    engine.predict(X[:compiled.SCALAR_MAX_ROWS])
+    assert calls == []
+    engine.predict(X)
+    assert calls == [len(X)]
+
+
+@pytest.mark.parametrize("zero_as_missing", [False, True])
+@pytest.mark.parametrize("rows", [4, 2000])
+def test_missing_value_routing_matches_booster(zero_as_missing, rows):
+    booster, X = _missing_booster(zero_as_missing)
+    engine = CompiledEnsemble.from_booster(booster, delegate_batches=False)
+    assert max_abs_error(engine, booster, X[:rows]) < 1e-9
+
+
+def test_nan_in_model_without_missing_rules_is_treated_as_zero(booster):
+    engine = CompiledEnsemble.from_booster(booster)
+    X = sample_feature_rows(booster.dump_model(), n=50)
+    X[::2, 2] = np.nan
+    assert max_abs_error(engine, booster, X) < 1e-6
+
+
+def test_rejects_unsupported_objective():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 3))
+    booster = lgb.train({"objective": "binary", "verbosity": -1}, lgb.Dataset(X, label=X[:, 0] > 0), 5)
+    with pytest.raises(ValueError):
+        CompiledEnsemble.from_booster(booster)
+
+
+def test_rejects_wrong_feature_count(booster):
+    with pytest.raises(ValueError):
+        CompiledEnsemble.from_booster(booster).predict(np.zeros((2, 3)))
+
+
+def test_service_serves_compiled_engine(booster, monkeypatch):
+    pytest.importorskip("fastapi")
+    import main
+    from registry import ModelBundle
+
+    served = main.compile_model(booster)
+    assert isinstance(served, CompiledEnsemble)
+    monkeypatch.setattr(main, "active_bundle", ModelBundle(version="test", model=served))
+    items = [
+        main.PropertyFeatures(
+            total_area_sqm=40 + i, year_built=2000 + i, minutes_to_station=5, latitude=35.65,
+            longitude=139.7, building_type="mansion", region="osaka",
+        )
+        for i in range(3)
+    ]
+    expected = booster.predict(main.build_feature_matrix(items)) * main.REGION_MULTIPLIERS["osaka"]
+    np.testing.assert_allclose(main.predict_prices(items), expected, rtol=1e-9)
+    np.testing.assert_allclose(main.predict_prices(items[:1]), expected[:1], rtol=1e-9)
@@ -0,0 +1,119 @@
+"""
+Tests for the comparable-sales spatial index.
+"""
+import sys
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from comps import CompsIndex, haversine_km
+
+
+def _transactions(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = np.array([[35.68, 139.77], [34.70, 135.50]])
+    which = rng.integers(0, 2, n)
+    return (
+        centres[which, 0] + rng.normal(0, 0.05, n),
+        centres[which, 1] + rng.normal(0, 0.06, n),
+        rng.integers(1960, 2024, n),
+        rng.uniform(3e5, 2e6, n),
+    )
+
+
+@pytest.fixture(scope="module")
+def index_and_data():
+    data = _transactions()
+    return CompsIndex(*data), data
+
+
+def test_query_matches_brute_force(index_and_data):
+    index, (lat, lon, year, _) = index_and_data
+    rng = np.random.default_rng(1)
+    for _ in range(100):
+        q = rng.integers(len(lat))
+        qlat, qlon = lat[q] + rng.normal(0, 0.01), lon[q] + rng.normal(0, 0.01)
+        radius, k, built_after = float(rng.choice([0.3, 1.0, 3.0])), int(rng.choice([1, 10, 50])), 1990
+        positions, distances = index.query(qlat, qlon, radius, k, built_after)
+        brute = haversine_km(qlat, qlon, lat, lon)
+        mask = (brute <= radius) & (year >= built_after)
+        np.testing.assert_allclose(distances, np.sort(brute[mask])[:k])
+        assert np.all(index.year_built[positions] >= built_after)
+
+
+def test_exclude_drops_own_row(index_and_data):
+    index, (lat, lon, _, price) = index_and_data
+    positions, distances = index.query(lat[5], lon[5], 1.0, 1)
+    assert index.ids[positions[0]] == 5 and distances[0] == 0
+    positions, distances = index.query(lat[5], lon[5], 1.0, 1, exclude=5)
+    assert index.ids[positions[0]] != 5 and distances[0] > 0
+
+
+def test_area_average(index_and_data):
+    index, (lat, lon, _, price) = index_and_data
+    averages = index.area_average(np.array([lat[0], 0.0]), np.array([lon[0], 0.0]), radius_km=1.0, k=5)
+    positions, _ = index.query(lat[0], lon[0], 1.0, 5)
+    assert averages[0] == pytest.approx(index.price_per_sqm[positions].mean())
+    assert np.isnan(averages[1])  # nothing near (0, 0)
+
+
+@pytest.mark.parametrize("chunk_pairs", [1 << 21, 500])
+def test_area_average_matches_per_point_queries(index_and_data, monkeypatch, chunk_pairs):
+    import comps
+
+    monkeypatch.setattr(comps, "AREA_CHUNK_PAIRS", chunk_pairs)
+    index, (lat, lon, _, _) = index_and_data
+    rng = np.random.default_rng(2)
+    rows = rng.integers(0, len(lat), 300)
+    qlat = np.append(lat[rows] + rng.normal(0, 0.01, len(rows)), [0.0, 36.5])
+    qlon = np.append(lon[rows] + rng.normal(0, 0.01, len(rows)), [0.0, 140.0])
+    exclude = np.append(rows, [-1, -1])
+    for radius, k, excluded in ((1.0, 20, None), (0.3, 5, exclude), (3.0, 50, exclude)):
+        expected = []
+        for i in range(len(qlat)):
+            positions, _ = index.query(qlat[i], qlon[i], radius, k, exclude=None if excluded is None else int(excluded[i]))
+            expected.append(index.price_per_sqm[positions].mean() if len(positions) else np.nan)
+        np.testing.assert_allclose(index.area_average(qlat, qlon, radius, k, excluded), expected, rtol=1e-12)
+
+
+def test_save_load_round_trip(index_and_data, tmp_path):
+    index, (lat, lon, _, _) = index_and_data
+    path = str(tmp_path / "comps.npz")
+    index.save(path)
+    loaded = CompsIndex.load(path)
+    assert len(loaded) == len(index)
+    for q in range(0, 1000, 97):
+        a, b = index.query(lat[q], lon[q], 1.0, 10), loaded.query(lat[q], lon[q], 1.0, 10)
+        np.testing.assert_array_equal(a[1], b[1])
+
+
+def test_comps_endpoint_and_request_feature(index_and_data, monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    import main
+    from features import COMPS_FEATURE, TRAINING_FEATURES
+
+    index, (lat, lon, _, _) = index_and_data
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "active_bundle", main.ModelBundle())
+    body = {"latitude": float(lat[0]), "longitude": float(lon[0]), "radius_km": 1.0, "k": 5, "built_after": 2000}
+    assert client.post("/comps", json=body).status_code == 503
+
+    monkeypatch.setattr(main, "active_bundle", main.ModelBundle(comps=index))
+    response = client.post("/comps", json=body).json()
+    assert 1 <= len(response["comps"]) <= 5
+    assert all(c["year_built"] >= 2000 for c in response["comps"])
+    distances = [c["distance_km"] for c in response["comps"]]
+    assert distances == sorted(distances)
+
+    item = main.PropertyFeatures(
+        total_area_sqm=50, year_built=2000, minutes_to_station=5, latitude=float(lat[0]),
+        longitude=float(lon[0]), building_type="mansion",
+    )
+    row = main.build_feature_matrix([item], TRAINING_FEATURES + [COMPS_FEATURE], comps=index)
+    assert row[0, -1] == pytest.approx(index.area_average(lat[:1], lon[:1])[0])
@@ -0,0 +1,147 @@
+"""
+Tests for PSI drift monitoring.
+"""
+import sys
+import os
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from drift import FLUSH_ROWS, DriftMonitor, DriftReference, drifted_features
+
+
+def _sample(n, seed, shift=0.0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.normal(50 + shift, 10, n), rng.integers(0, 2, n).astype(np.float64)])
+    X[rng.random(n) < 0.05, 1] = np.nan
+    return X
+
+
+def _naive_psi(reference, live, edges):
+    psi = []
+    for j in range(reference.shape[1]):
+        def shares(X):
+            column = X[:, j]
+            counts = [np.sum(np.searchsorted(edges[j], column[~np.isnan(column)], side="right") == b)
+                      for b in range(len(edges[j]) + 1)]
+            return np.maximum(np.array(counts + [np.isnan(column).sum()]) / len(column), 1e-4)
+        expected, actual = shares(reference), shares(live)
+        psi.append(float(np.sum((actual - expected) * np.log(actual / expected))))
+    return psi
+
+
+def test_reference_bins_and_missing_share():
+    X = _sample(5000, seed=0)
+    reference = DriftReference.fit(X, ["area", "flag"], bins=10)
+    assert len(reference.edges[0]) == 9
+    # Tied quantiles of a binary column collapse to at most two edges
+    assert len(reference.edges[1]) <= 2
+    assert reference.proportions[1][-1] == pytest.approx(np.isnan(X[:, 1]).mean())
+    for proportions in reference.proportions:
+        assert proportions.sum() == pytest.approx(1.0)
+
+
+def test_psi_matches_direct_computation():
+    reference_rows = _sample(5000, seed=0)
+    reference = DriftReference.fit(reference_rows, ["area", "flag"])
+    monitor = DriftMonitor(reference)
+    live = _sample(3000, seed=1, shift=8)
+    for lo in range(0, len(live), 250):
+        monitor.record(live[lo:lo + 250])
+    report = monitor.psi()
+    assert report["rows"] == 3000
+    expected = _naive_psi(reference_rows, live, reference.edges)
+    assert list(report["features"].values()) == pytest.approx(expected)
+    assert drifted_features(report, 0.2) == ["area"]
+
+
+def test_same_distribution_is_stable():
+    monitor = DriftMonitor(DriftReference.fit(_sample(20000, seed=0), ["area", "flag"]))
+    monitor.record(_sample(20000, seed=1))
+    assert max(monitor.psi()["features"].values()) < 0.01
+
+
+def test_threads_record_into_separate_shards():
+    monitor = DriftMonitor(DriftReference.fit(_sample(1000, seed=0), ["area", "flag"]))
+    rows = _sample(100, seed=1)
+
+    def worker():
+        for _ in range(50):
+            monitor.record(rows)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(1 for shard in monitor._shards if shard.counts.any()) == 4
+    assert monitor.psi()["rows"] == 4 * 50 * 100
+    monitor.reset()
+    assert monitor.psi()["rows"] == 0
+
+
+def test_short_lived_threads_share_a_bounded_set_of_shards():
+    monitor = DriftMonitor(DriftReference.fit(_sample(1000, seed=0), ["area", "flag"]), shards=4)
+    rows = _sample(3, seed=1)
+    for _ in range(50):
+        threads = [threading.Thread(target=monitor.record, args=(rows,)) for _ in range(40)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert len(monitor._shards) == 4
+    # Buffered rows stay below FLUSH_ROWS per shard; the rest is binned
+    assert all(shard.pending_rows < FLUSH_ROWS for shard in monitor._shards)
+    assert monitor.psi()["rows"] == 2000 * 3
+
+
+def test_save_load_round_trip(tmp_path):
+    reference = DriftReference.fit(_sample(1000, seed=0), ["area", "flag"])
+    path = str(tmp_path / "drift_reference.json")
+    reference.save(path)
+    loaded = DriftReference.load(path)
+    assert loaded.features == reference.features
+    for a, b in zip(loaded.edges + loaded.proportions, reference.edges + reference.proportions):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_drift_endpoint_reports_served_rows(monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("lightgbm")
+    from fastapi.testclient import TestClient
+    import main
+    import train
+
+    result = train.train_from_mock(n=500, rounds=5)
+    monkeypatch.setattr(
+        main, "active_bundle",
+        main.prepare_bundle("test", result.model, None, result.encoder, result.drift_reference, result.comps),
+    )
+    client = TestClient(main.app)
+    item = {
+        "total_area_sqm": 95, "year_built": 2020, "minutes_to_station": 2, "latitude": 35.65,
+        "longitude": 139.7, "building_type": "mansion",
+    }
+    for _ in range(20):
+        client.post("/predict", params={"explain": "false"}, json=item)
+    report = client.get("/drift").json()
+    assert report["rows"] == 20 and report["model_version"] == "test"
+    # Every request is the same large, new flat: area drifts hard
+    assert "total_area_sqm" in report["drifted"]
+    assert client.post("/admin/drift/reset").status_code == 200
+    assert client.get("/drift").json()["rows"] == 0
+
+
+def test_drift_endpoint_without_reference(monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    import main
+    from registry import ModelBundle
+
+    monkeypatch.setattr(main, "active_bundle", ModelBundle())
+    assert TestClient(main.app).get("/drift").status_code == 404
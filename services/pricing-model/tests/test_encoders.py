@@ -0,0 +1,121 @@
+"""
+Tests for the categorical encoder pipeline shared by training and serving.
+"""
+import sys
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from encoders import OOF_FOLDS, EncoderPipeline, OneHotEncoder, OrdinalEncoder, TargetEncoder, as_strings, fold_ids
+
+
+def _columns(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "prefecture": rng.choice(["tokyo", "osaka", "chiba"], n),
+        "building_type": rng.choice(["mansion", "kodate", "land"], n),
+        "earthquake_standard": rng.choice(["old", "new", "grade1", "grade2", "grade3"], n),
+    }, rng.uniform(1e7, 5e7, n)
+
+
+def test_target_encoder_smooths_towards_prior():
+    values = as_strings(["a", "a", "b", None])
+    y = np.array([10.0, 20.0, 40.0, 50.0])
+    encoder = TargetEncoder("c", smoothing=2).partial_fit(values, y).finish()
+    prior = y.mean()
+    encoded = encoder.transform(as_strings(["a", "b", "zzz", None]))[:, 0]
+    assert encoded[0] == pytest.approx((30 + 2 * prior) / 4)
+    assert encoded[1] == pytest.approx((40 + 2 * prior) / 3)
+    # Unseen and missing categories get the prior
+    assert encoded[2] == encoded[3] == pytest.approx(prior)
+
+
+def test_partial_fit_over_chunks_matches_single_fit():
+    columns, y = _columns()
+    folds = fold_ids(np.arange(len(y)))
+    whole = EncoderPipeline.from_spec(list(columns)).fit(columns, y, folds)
+    chunked = EncoderPipeline.from_spec(list(columns))
+    for lo in range(0, len(y), 150):
+        part = slice(lo, lo + 150)
+        chunked.partial_fit({k: v[part] for k, v in columns.items()}, y[part], folds[part])
+    chunked.finish()
+    a, b = whole.transform(columns, folds), chunked.transform(columns, folds)
+    assert list(a) == list(b)
+    for name in a:
+        np.testing.assert_allclose(a[name], b[name])
+
+
+def test_out_of_fold_encoding_excludes_own_fold():
+    values = as_strings(np.array(["a"] * 10))
+    y = np.arange(10, dtype=np.float64)
+    folds = fold_ids(np.arange(10))
+    encoder = TargetEncoder("c", smoothing=0).partial_fit(values, y, folds).finish()
+    encoded = encoder.transform(values, folds)[:, 0]
+    for i in range(10):
+        others = y[folds != folds[i]]
+        assert encoded[i] == pytest.approx(others.mean())
+    # Without folds (serving) the full mean is used
+    assert encoder.transform(values)[0, 0] == pytest.approx(y.mean())
+    assert encoder.oof_tables.shape == (OOF_FOLDS, 2)
+
+
+def test_one_hot_and_ordinal_unknowns():
+    onehot = OneHotEncoder("building_type").partial_fit(as_strings(["mansion", "kodate"])).finish()
+    assert onehot.output_names == ["building_type=kodate", "building_type=mansion"]
+    np.testing.assert_array_equal(
+        onehot.transform(as_strings(["mansion", "land", None])), [[0, 1], [0, 0], [0, 0]]
+    )
+    ordinal = OrdinalEncoder("earthquake_standard", ["old", "new", "grade1"])
+    ranks = ordinal.transform(as_strings(["grade1", "old", "new", "unknown"]))[:, 0]
+    np.testing.assert_array_equal(ranks[:3], [2, 0, 1])
+    assert np.isnan(ranks[3])
+
+
+def test_batch_encoding_matches_row_by_row():
+    columns, y = _columns()
+    pipeline = EncoderPipeline.from_spec(list(columns)).fit(columns, y)
+    batch = pipeline.transform(columns)
+    for i in range(0, len(y), 37):
+        row = pipeline.transform({k: [v[i]] for k, v in columns.items()})
+        for name in batch:
+            assert row[name][0] == pytest.approx(batch[name][i], nan_ok=True)
+
+
+def test_save_load_round_trip(tmp_path):
+    columns, y = _columns()
+    pipeline = EncoderPipeline.from_spec(list(columns)).fit(columns, y, fold_ids(np.arange(len(y))))
+    path = str(tmp_path / "encoders.json")
+    pipeline.save(path)
+    loaded = EncoderPipeline.load(path)
+    assert loaded.output_names == pipeline.output_names
+    a, b = pipeline.transform(columns), loaded.transform(columns)
+    for name in a:
+        np.testing.assert_array_equal(a[name], b[name])
+
+
+def test_service_encodes_requests_like_training():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("lightgbm")
+    import main
+    from features import COMPS_FEATURE, feature_matrix
+    import train
+
+    result = train.train_from_mock(n=500, rounds=5)
+    encoder = result.encoder
+    bundle = main.prepare_bundle("test", result.model, None, encoder, comps=result.comps)
+    items = [
+        main.PropertyFeatures(
+            total_area_sqm=50 + i, year_built=2000, minutes_to_station=5, latitude=35.65, longitude=139.7,
+            building_type=building, prefecture=prefecture, earthquake_standard="grade1",
+        )
+        for i, (building, prefecture) in enumerate([("mansion", "tokyo"), ("land", "osaka"), ("kodate", None)])
+    ]
+    served = main.build_feature_matrix(items, bundle.feature_columns, bundle.encoder, bundle.comps)
+    raw = {column: [getattr(item, column) for item in items] for column in main.FEATURE_COLUMNS + encoder.input_columns}
+    raw[COMPS_FEATURE] = result.comps.area_average(np.array(raw["latitude"]), np.array(raw["longitude"]))
+    np.testing.assert_array_equal(served, feature_matrix(raw, bundle.feature_columns, encoder))
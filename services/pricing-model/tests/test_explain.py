@@ -0,0 +1,118 @@
+"""
+Tests for TreeSHAP explanations and their cache.
+"""
+import sys
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+lgb = pytest.importorskip("lightgbm")
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from explain import ExplanationCache, TreeExplainer, describe, source_features
+import train
+
+
+@pytest.fixture(scope="module")
+def trained():
+    result = train.train_from_mock(n=800, rounds=20)
+    return result.model, result.encoder, result.comps
+
+
+def _rows(model, encoder, n=20, seed=3):
+    from features import COMPS_FEATURE, feature_matrix
+
+    columns = train.mock_columns(n, np.random.default_rng(seed))
+    columns[COMPS_FEATURE] = np.full(n, 1e6)
+    return feature_matrix(columns, model.feature_name(), encoder)
+
+
+def test_contributions_sum_to_prediction(trained):
+    model, encoder, _ = trained
+    X = _rows(model, encoder)
+    explainer = TreeExplainer(model, model.feature_name(), encoder)
+    contributions = explainer.contributions(X)
+    np.testing.assert_allclose(contributions.sum(axis=1), model.predict(X), rtol=1e-9)
+    # One-hot columns are folded into a single building_type factor
+    assert explainer.sources.count("building_type") == 1
+    assert len(explainer.sources) == len(contributions[0]) - 1
+
+
+def test_top_factors_are_largest_magnitude_first(trained):
+    model, encoder, _ = trained
+    X = _rows(model, encoder)
+    explainer = TreeExplainer(model, model.feature_name(), encoder, top_k=3)
+    factors = explainer.top_factors(X)
+    full = explainer.contributions(X)[:, :-1]
+    for row, expected in zip(factors, full):
+        assert len(row) == 3
+        magnitudes = [abs(value) for _, value in row]
+        assert magnitudes == sorted(magnitudes, reverse=True)
+        assert magnitudes[0] == pytest.approx(np.abs(expected).max())
+
+
+def test_cached_rows_skip_the_model(trained):
+    model, encoder, _ = trained
+    X = _rows(model, encoder, n=4)
+
+    class CountingModel:
+        calls = []
+
+        def predict(self, X, pred_contrib=False):
+            CountingModel.calls.append(len(X))
+            return model.predict(X, pred_contrib=pred_contrib)
+
+    explainer = TreeExplainer(CountingModel(), model.feature_name(), encoder)
+    first = explainer.contributions(X[:2])
+    second = explainer.contributions(X)
+    assert CountingModel.calls == [2, 2]  # only the two new rows were scored
+    np.testing.assert_array_equal(first, second[:2])
+    assert explainer.cache.stats()["hits"] == 2
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ExplanationCache(max_entries=2)
+    cache.put_many([b"a", b"b"], np.ones((2, 3)))
+    cache.get_many([b"a"])
+    cache.put_many([b"c"], np.ones((1, 3)))
+    assert [value is not None for value in cache.get_many([b"a", b"b", b"c"])] == [True, False, True]
+
+
+def test_source_features_without_encoder():
+    sources, index = source_features(["total_area_sqm", "year_built"])
+    assert sources == ["total_area_sqm", "year_built"]
+    assert index.tolist() == [0, 1]
+
+
+def test_describe_formats_both_languages():
+    factors = [("total_area_sqm", 3_200_000.0), ("year_built", -1_150_000.0)]
+    assert describe(factors, "en") == "Main price factors: floor area +¥3,200,000, year built -¥1,150,000."
+    assert describe(factors, "ja") == "主な価格要因: 専有面積 +320万円、築年 -115万円"
+
+
+def test_predict_explains_unless_disabled(trained, monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    import main
+
+    model, encoder, comps = trained
+    monkeypatch.setattr(main, "active_bundle", main.prepare_bundle("test", model, None, encoder, comps=comps))
+    client = TestClient(main.app)
+    item = {
+        "total_area_sqm": 60, "year_built": 2005, "minutes_to_station": 6, "latitude": 35.66,
+        "longitude": 139.7, "building_type": "mansion", "region": "osaka", "prefecture": "osaka",
+    }
+    explained = client.post("/predict", json=item).json()
+    assert len(explained["factors"]) == main.EXPLAIN_TOP_K
+    assert explained["explanation"].startswith("Main price factors")
+    assert explained["explanation_ja"].startswith("主な価格要因")
+
+    fast = client.post("/predict", params={"explain": "false"}, json=item).json()
+    assert fast["factors"] is None and fast["predicted_price"] == explained["predicted_price"]
+
+    batch = client.post("/predict/batch", json={"items": [item]}).json()["predictions"]
+    assert batch[0]["factors"] == explained["factors"]
+    assert client.get("/health").json()["explanations"]["hits"] >= 1
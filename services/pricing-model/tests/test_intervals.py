@@ -0,0 +1,86 @@
+"""
+Tests for conformal prediction intervals.
+"""
+import sys
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from intervals import ConformalTable
+
+
+def _noisy(n, seed):
+    """Predictions with multiplicative noise that grows with price."""
+    rng = np.random.default_rng(seed)
+    predicted = rng.uniform(20e6, 100e6, n)
+    actual = predicted * (1 + rng.normal(0, 0.02 + 0.1 * (predicted - 20e6) / 80e6))
+    return predicted, actual
+
+
+def test_intervals_reach_nominal_coverage():
+    table = ConformalTable.fit(*_noisy(4000, seed=0), alpha=0.1)
+    predicted, actual = _noisy(20000, seed=1)
+    lower, upper = table.interval(predicted)
+    covered = (actual >= lower) & (actual <= upper)
+    assert covered.mean() >= 0.88
+    assert np.all(lower <= predicted) and np.all(predicted <= upper)
+
+
+def test_intervals_widen_with_heteroscedastic_noise():
+    table = ConformalTable.fit(*_noisy(4000, seed=0), alpha=0.1)
+    lower, upper = table.interval(np.array([25e6, 95e6]))
+    relative_width = (upper - lower) / np.array([25e6, 95e6])
+    assert relative_width[1] > 2 * relative_width[0]
+
+
+def test_small_calibration_set_uses_one_bin():
+    table = ConformalTable.fit(*_noisy(30, seed=0), alpha=0.1)
+    assert len(table.lower) == 1 and len(table.bin_edges) == 0
+    lower, upper = table.interval(np.array([50e6]))
+    assert lower[0] < 50e6 < upper[0]
+
+
+def test_save_load_round_trip(tmp_path):
+    table = ConformalTable.fit(*_noisy(1000, seed=0), alpha=0.2)
+    path = str(tmp_path / "conformal.json")
+    table.save(path)
+    loaded = ConformalTable.load(path)
+    predicted = np.linspace(10e6, 120e6, 50)
+    for a, b in zip(table.interval(predicted), loaded.interval(predicted)):
+        np.testing.assert_array_equal(a, b)
+    assert loaded.alpha == 0.2
+
+
+def test_service_uses_table_in_the_same_pass(monkeypatch):
+    pytest.importorskip("fastapi")
+    import main
+    from registry import ModelBundle
+
+    class CountingModel:
+        calls = 0
+
+        def predict(self, X):
+            CountingModel.calls += 1
+            return X[:, 0] * 1_000_000
+
+    table = ConformalTable(0.1, [50e6], [-0.05, -0.2], [0.05, 0.3])
+    monkeypatch.setattr(main, "active_bundle", ModelBundle(version="test", model=CountingModel(), conformal=table))
+    items = [
+        main.PropertyFeatures(
+            total_area_sqm=area, year_built=2000, minutes_to_station=5, latitude=35.65,
+            longitude=139.7, building_type="mansion", region="osaka",
+        )
+        for area in (30, 80)
+    ]
+    rows = main.predict_with_intervals(items)
+    assert CountingModel.calls == 1
+    multiplier = main.REGION_MULTIPLIERS["osaka"]
+    np.testing.assert_allclose(rows[0], np.array([30e6, 28.5e6, 31.5e6]) * multiplier)
+    np.testing.assert_allclose(rows[1], np.array([80e6, 64e6, 104e6]) * multiplier)
+    response = main.to_response(items[1], rows[1])
+    assert response.confidence_interval == [int(rows[1][1]), int(rows[1][2])]
@@ -0,0 +1,188 @@
+"""
+Tests for the versioned model registry and hot reload.
+"""
+import sys
+import os
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+joblib = pytest.importorskip("joblib")
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+import main
+from registry import ModelBundle, ModelRegistry
+
+
+class PricePerSqm:
+    """Picklable stand-in model: price proportional to area."""
+
+    def __init__(self, price_per_sqm):
+        self.price_per_sqm = price_per_sqm
+
+    def predict(self, X):
+        return np.asarray(X)[:, 0] * self.price_per_sqm
+
+
+def _publish(registry, tmp_path, version, model, activate=True):
+    path = str(tmp_path / f"{version}.joblib")
+    joblib.dump(model, path)
+    registry.publish(version, path, activate=activate)
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    monkeypatch.setattr(main, "model_registry", registry)
+    monkeypatch.setattr(main, "active_bundle", ModelBundle())
+    monkeypatch.setattr(main, "last_reload_error", None)
+    monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+    return registry
+
+
+def _features(area=50):
+    return main.PropertyFeatures(
+        total_area_sqm=area, year_built=2000, minutes_to_station=5, latitude=35.65,
+        longitude=139.7, building_type="mansion", region="tokyo",
+    )
+
+
+def test_versions_sort_naturally_and_current_pointer_wins(registry, tmp_path):
+    for version in ("v2", "v10", "v9"):
+        _publish(registry, tmp_path, version, PricePerSqm(1), activate=False)
+    assert registry.versions() == ["v2", "v9", "v10"]
+    assert registry.active_version() == "v10"
+    registry.activate("v9")
+    assert registry.active_version() == "v9"
+    with pytest.raises(FileExistsError):
+        _publish(registry, tmp_path, "v9", PricePerSqm(1))
+    with pytest.raises(FileNotFoundError):
+        registry.activate("v11")
+
+
+def test_reload_swaps_to_the_active_version(registry, tmp_path):
+    _publish(registry, tmp_path, "2024q3", PricePerSqm(1_000_000))
+    assert main.reload_model() is True
+    assert main.predict_prices([_features(50)])[0] == pytest.approx(50_000_000)
+
+    _publish(registry, tmp_path, "2024q4", PricePerSqm(2_000_000))
+    main.poll_registry()
+    assert main.active_bundle.version == "2024q4"
+    assert main.predict_prices([_features(50)])[0] == pytest.approx(100_000_000)
+    assert main.reload_model() is False
+
+
+def test_invalid_model_is_rejected_and_old_one_keeps_serving(registry, tmp_path):
+    _publish(registry, tmp_path, "good", PricePerSqm(1_000_000))
+    main.reload_model()
+    _publish(registry, tmp_path, "negative", PricePerSqm(-1))
+    main.poll_registry()
+    assert main.active_bundle.version == "good"
+    assert main.last_reload_error["version"] == "negative"
+
+    health = TestClient(main.app).get("/health").json()
+    assert health["model_version"] == "good"
+    assert health["last_reload_error"]["version"] == "negative"
+
+
+def test_in_flight_prediction_finishes_on_the_old_model(registry, tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    class Slow(PricePerSqm):
+        def predict(self, X):
+            started.set()
+            release.wait(5)
+            return super().predict(X)
+
+    main.active_bundle = ModelBundle(version="old", model=Slow(1_000_000))
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(price=main.predict_prices([_features(10)])[0]))
+    worker.start()
+    assert started.wait(5)
+
+    _publish(registry, tmp_path, "new", PricePerSqm(5_000_000))
+    assert main.reload_model() is True
+    release.set()
+    worker.join(5)
+    assert result["price"] == pytest.approx(10_000_000)
+    assert main.predict_prices([_features(10)])[0] == pytest.approx(50_000_000)
+
+
+class AreaExplainer:
+    """Stand-in explainer: one factor carrying the model's price per sqm."""
+
+    def __init__(self, price_per_sqm):
+        self.price_per_sqm = price_per_sqm
+
+    def top_factors(self, X):
+        return [[("total_area_sqm", self.price_per_sqm)] for _ in range(len(X))]
+
+
+@pytest.mark.parametrize("path", ["/predict", "/predict/batch"])
+def test_swap_between_price_and_explanation_does_not_mix_versions(registry, monkeypatch, path):
+    new = ModelBundle(version="new", model=PricePerSqm(5_000_000), explainer=AreaExplainer(5_000_000))
+
+    class SwapsOnPredict(PricePerSqm):
+        def predict(self, X):
+            main.active_bundle = new
+            return super().predict(X)
+
+    main.active_bundle = ModelBundle(
+        version="old", model=SwapsOnPredict(1_000_000), explainer=AreaExplainer(1_000_000)
+    )
+    monkeypatch.setattr(main, "predict_batcher", main.PredictBatcher(main.score_requests, max_batch=8))
+    item = {
+        "total_area_sqm": 10, "year_built": 2000, "minutes_to_station": 5, "latitude": 35.65,
+        "longitude": 139.7, "building_type": "mansion", "region": "tokyo",
+    }
+    response = TestClient(main.app).post(path, json={"items": [item]} if path.endswith("batch") else item).json()
+    body = response["predictions"][0] if path.endswith("batch") else response
+    assert body["predicted_price"] == 10_000_000
+    assert body["factors"][0]["contribution"] == 1_000_000
+    assert main.active_bundle is new
+
+
+def test_admin_reload_endpoint(registry, tmp_path, monkeypatch):
+    _publish(registry, tmp_path, "a", PricePerSqm(1_000_000))
+    _publish(registry, tmp_path, "b", PricePerSqm(1_500_000), activate=False)
+    client = TestClient(main.app)
+
+    response = client.post("/admin/reload")
+    assert response.json() == {"changed": True, "model_version": "a"}
+    response = client.post("/admin/reload", json={"version": "b"})
+    assert response.json() == {"changed": True, "model_version": "b"}
+    assert client.get("/health").json()["model_version"] == "b"
+    assert client.post("/admin/reload", json={"version": "missing"}).status_code == 404
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    assert client.post("/admin/reload", json={"version": "a"}).status_code == 403
+    response = client.post("/admin/reload", json={"version": "a"}, headers={"X-Admin-Token": "secret"})
+    assert response.json()["model_version"] == "a"
+
+
+def test_version_serves_its_own_comps_index(registry, tmp_path):
+    pytest.importorskip("lightgbm")
+    import train
+
+    result = train.train_from_mock(n=500, rounds=5)
+    paths = {name: str(tmp_path / name) for name in ("model.joblib", "encoders.json", "comps.npz")}
+    joblib.dump(result.model, paths["model.joblib"])
+    result.encoder.save(paths["encoders.json"])
+    result.comps.save(paths["comps.npz"])
+
+    registry.publish("no-comps", paths["model.joblib"], encoder_path=paths["encoders.json"])
+    with pytest.raises(ValueError, match="comparable-sales index"):
+        main.reload_model()
+    assert main.active_bundle.version is None
+
+    registry.publish(
+        "with-comps", paths["model.joblib"], encoder_path=paths["encoders.json"], comps_path=paths["comps.npz"]
+    )
+    assert main.reload_model() is True
+    assert len(main.active_bundle.comps) == len(result.comps)
+    assert TestClient(main.app).get("/health").json()["comps_transactions"] == len(result.comps)
@@ -0,0 +1,59 @@
+"""
+Tests for the renovation cost matrix endpoint.
+"""
+import sys
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+import main
+
+client = TestClient(main.app)
+
+
+@pytest.mark.parametrize("scope", ["full", "kitchen", "bath", "wallpaper", "flooring"])
+def test_matrix_agrees_with_single_scope_quotes(scope):
+    matrix = client.post("/renovate/matrix", json={"total_area_sqm": 72.5}).json()
+    s = matrix["scopes"].index(scope)
+    for q, quality in enumerate(matrix["qualities"]):
+        for r, region in enumerate(matrix["regions"]):
+            single = client.post("/renovate", json={
+                "total_area_sqm": 72.5, "scope": scope, "quality": quality, "region": region,
+            }).json()
+            assert abs(matrix["costs"][s][q][r] - single["estimated_cost"]) <= 1
+
+
+def test_grid_shape_covers_every_scope_quality_and_region():
+    matrix = client.post("/renovate/matrix", json={"total_area_sqm": 50}).json()
+    assert len(matrix["costs"]) == len(main.RENOVATION_SCOPES)
+    assert all(len(per_quality) == len(main.QUALITY_MULTIPLIERS) for per_quality in matrix["costs"])
+    assert all(len(row) == len(main.REGION_MULTIPLIERS) for per_quality in matrix["costs"] for row in per_quality)
+    assert matrix["combined"] == []
+
+
+def test_combined_quote_sums_scopes():
+    matrix = client.post("/renovate/matrix", json={
+        "total_area_sqm": 60,
+        "combinations": [["kitchen", "bath", "flooring"], ["toilet"], ["kitchen", "kitchen"]],
+    }).json()
+    index = {scope: i for i, scope in enumerate(matrix["scopes"])}
+    kitchen_bath_flooring, toilet, kitchen_once = matrix["combined"]
+    for q in range(len(matrix["qualities"])):
+        for r in range(len(matrix["regions"])):
+            expected = sum(matrix["costs"][index[s]][q][r] for s in ("kitchen", "bath", "flooring"))
+            assert abs(kitchen_bath_flooring["costs"][q][r] - expected) <= 2
+            assert kitchen_once["costs"][q][r] == matrix["costs"][index["kitchen"]][q][r]
+    assert kitchen_bath_flooring["duration_weeks"] == 1 + 2 + 2
+    assert toilet["costs"][0][0] == main.RENOVATION_COSTS["toilet"]
+
+
+def test_unknown_scope_is_rejected():
+    response = client.post("/renovate/matrix", json={"total_area_sqm": 60, "combinations": [["pool"]]})
+    assert response.status_code == 400
@@ -0,0 +1,109 @@
+"""
+Tests for shared feature derivation and the streaming parquet training path.
+"""
+import sys
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+lgb = pytest.importorskip("lightgbm")
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from features import COMPS_FEATURE, TRAINING_FEATURES, distance_to_cbd_km, feature_matrix
+import train
+
+
+def test_distance_to_nearest_cbd():
+    # Tokyo Station, Umeda, Shinjuku (about 6 km from Tokyo Station)
+    distances = distance_to_cbd_km(np.array([35.6812, 34.7025, 35.6896]), np.array([139.7671, 135.4959, 139.7006]))
+    assert distances[0] == pytest.approx(0, abs=1e-6)
+    assert distances[1] == pytest.approx(0, abs=1e-6)
+    assert distances[2] == pytest.approx(6.1, abs=0.2)
+
+
+def test_feature_matrix_appends_derived_columns():
+    columns = train.mock_columns(10, np.random.default_rng(0))
+    X = feature_matrix(columns, TRAINING_FEATURES)
+    assert X.shape == (10, len(TRAINING_FEATURES))
+    np.testing.assert_array_equal(X[:, 0], columns["total_area_sqm"])
+    np.testing.assert_allclose(X[:, -1], distance_to_cbd_km(columns["latitude"], columns["longitude"]))
+
+
+def _write_parquet(path, n, row_group_size):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    columns = train.mock_columns(n, np.random.default_rng(1))
+    pq.write_table(pa.table(columns), path, row_group_size=row_group_size)
+    return columns
+
+
+def test_streamed_dataset_matches_in_memory_training(tmp_path):
+    path = str(tmp_path / "train.parquet")
+    columns = _write_parquet(path, 3000, row_group_size=700)
+    reader = train.ParquetFeatureReader(path)
+    assert reader.num_rows == 3000 and len(reader.group_rows) == 5
+
+    X = feature_matrix(columns, TRAINING_FEATURES)
+    np.testing.assert_array_equal(reader.rows(650, 1500), X[650:1500])
+
+    streamed = train.build_parquet_dataset(reader, 2400, reader.labels()[:2400])
+    in_memory = lgb.Dataset(X[:2400], label=columns["price"][:2400], feature_name=TRAINING_FEATURES, params=train.PARAMS)
+    a = lgb.train(train.PARAMS, streamed, num_boost_round=10)
+    b = lgb.train(train.PARAMS, in_memory, num_boost_round=10)
+    np.testing.assert_allclose(a.predict(X), b.predict(X))
+
+
+def test_binary_cache_is_written_and_reused(tmp_path, capsys):
+    path = str(tmp_path / "train.parquet")
+    _write_parquet(path, 2000, row_group_size=500)
+    cache = str(tmp_path / "train.bin")
+
+    result = train.train_from_parquet(path, rounds=5, binary_cache=cache, calibration_rows=300)
+    assert os.path.exists(cache)
+    assert result.model.feature_name() == TRAINING_FEATURES + result.encoder.output_names
+    assert result.encoder.input_columns == ["prefecture", "building_type", "earthquake_standard"]
+    assert len(result.conformal.lower) >= 1
+
+    train.train_from_parquet(path, rounds=5, binary_cache=cache, calibration_rows=300)
+    assert "Loaded binned dataset" in capsys.readouterr().out
+
+
+def test_service_builds_derived_features_for_named_models():
+    pytest.importorskip("fastapi")
+    import main
+
+    result = train.train_from_mock(n=500, rounds=5)
+    encoder = result.encoder
+    bundle = main.prepare_bundle("test", result.model, None, encoder, comps=result.comps)
+    assert bundle.feature_columns == TRAINING_FEATURES + [COMPS_FEATURE] + encoder.output_names
+    item = main.PropertyFeatures(
+        total_area_sqm=50, year_built=2000, minutes_to_station=5, latitude=35.65,
+        longitude=139.7, building_type="mansion", prefecture="osaka",
+    )
+    row = main.build_feature_matrix([item], bundle.feature_columns, bundle.encoder, bundle.comps)
+    assert row.shape == (1, len(bundle.feature_columns))
+    derived = bundle.feature_columns.index("distance_to_cbd_km")
+    assert row[0, derived] == pytest.approx(distance_to_cbd_km(np.array([35.65]), np.array([139.7]))[0])
+    assert row[0, bundle.feature_columns.index("building_type=mansion")] == 1
+    assert np.isnan(row[0, bundle.feature_columns.index("earthquake_standard_ord")])
+
+
+def test_model_with_unknown_encoded_column_is_rejected_without_encoder():
+    pytest.importorskip("fastapi")
+    import main
+
+    result = train.train_from_mock(n=500, rounds=5)
+    with pytest.raises(ValueError):
+        main.prepare_bundle("test", result.model, None, comps=result.comps)
+
+
+def test_model_using_comps_is_rejected_without_an_index():
+    pytest.importorskip("fastapi")
+    import main
+
+    result = train.train_from_mock(n=500, rounds=5)
+    with pytest.raises(ValueError, match=COMPS_FEATURE):
+        main.prepare_bundle("test", result.model, None, result.encoder)
@@ -0,0 +1,67 @@
+"""
+Tests for the startup warm-up and /ready.
+"""
+import sys
+import os
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("lightgbm")
+
+_service_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, _service_dir)
+
+from fastapi.testclient import TestClient
+
+import main
+import train
+
+
+@pytest.fixture
+def not_ready(monkeypatch):
+    monkeypatch.setattr(main, "ready", False)
+    monkeypatch.setattr(main, "warmup_report", None)
+    monkeypatch.setattr(main, "WARMUP_ROUNDS", 3)
+    monkeypatch.setattr(main, "predict_batcher", None)
+
+
+def test_ready_only_after_warm_up(not_ready, monkeypatch):
+    result = train.train_from_mock(n=500, rounds=5)
+    bundle = main.prepare_bundle("test", result.model, result.conformal, result.encoder, result.drift_reference, result.comps)
+    monkeypatch.setattr(main, "active_bundle", bundle)
+    client = TestClient(main.app)
+    assert client.get("/ready").status_code == 503
+    assert client.get("/health").json()["ready"] is False
+
+    asyncio.run(main.warm_up())
+    response = client.get("/ready")
+    assert response.status_code == 200
+    report = response.json()["warmup"]
+    assert report["model_version"] == "test" and report["rounds"] == 3
+    assert set(report["latency_ms"]) == {
+        "batch1", "batch8", "batch64", "batch1_explain", "batch8_explain", "batch64_explain", "single",
+    }
+    for latency in report["latency_ms"].values():
+        assert latency["cold"] > 0 and latency["warm"] > 0
+    # Synthetic rows are not live traffic
+    assert bundle.drift.psi()["rows"] == 0
+    assert client.get("/health").json()["ready"] is True
+
+
+def test_failed_warm_up_stays_not_ready(not_ready, monkeypatch):
+    def broken(items, bundle=None, X=None):
+        raise RuntimeError("model exploded")
+
+    monkeypatch.setattr(main, "predict_with_intervals", broken)
+    asyncio.run(main.warm_up())
+    response = TestClient(main.app).get("/ready")
+    assert response.status_code == 503
+    assert "model exploded" in response.json()["detail"]["error"]
+
+
+def test_zero_rounds_skips_warm_up(not_ready, monkeypatch):
+    monkeypatch.setattr(main, "WARMUP_ROUNDS", 0)
+    asyncio.run(main.warm_up())
+    assert TestClient(main.app).get("/ready").status_code == 200
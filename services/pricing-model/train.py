@@ -1,39 +1,313 @@
-import pandas as pd
-import lightgbm as lgb
-import joblib
-import numpy as np
+"""
+Train the pricing model.
 
-# Mock training data
-data = {
-    "total_area_sqm": np.random.uniform(20, 100, 1000),
-    "year_built": np.random.randint(1980, 2024, 1000),
-    "minutes_to_station": np.random.randint(1, 20, 1000),
-    "latitude": np.random.uniform(35.6, 35.7, 1000),
-    "longitude": np.random.uniform(139.6, 139.8, 1000),
-    "price": [] # Target
-}
+    python train.py                                  # mock data (Docker build)
+    python train.py --parquet data/train.parquet     # stream parquet row groups
 
-# Simple formula for "real" price
-for i in range(1000):
-    p = (data["total_area_sqm"][i] * 1000000) * \
-        (1 - (2024 - data["year_built"][i]) * 0.01) * \
-        (1 - data["minutes_to_station"][i] * 0.02)
-    data["price"].append(p)
+Parquet input is streamed one row group at a time through lightgbm.Sequence,
+so the raw table never has to fit in memory: only LightGBM's binned dataset,
+the label column and one decoded row group are held at once. The binned
+dataset is cached with save_binary (--binary-cache) and reused while the
+parquet file is unchanged. The most recent rows (the tail of the file) are
+held out to calibrate the conformal intervals.
 
-df = pd.DataFrame(data)
+Categorical columns (encoders.py) are fitted on the training rows in a first
+pass. Training rows get out-of-fold target encodings so the model never sees
+a row's own price through its category mean; calibration rows and serving
+use the full tables. The fitted pipeline is saved as encoders.json.
 
-X = df.drop("price", axis=1)
-y = df["price"]
+The calibration rows also become the drift reference (drift_reference.json):
+the per-feature bins that serving compares live inputs against.
 
-# Train LightGBM
-train_data = lgb.Dataset(X, label=y)
-params = {
+Mock training also indexes its listings as past transactions (comps.npz) and
+adds price_per_sqm_area_avg, each row's comps excluding its own sale.
+"""
+import argparse
+import os
+import resource
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+
+from comps import CompsIndex
+from drift import DriftReference
+from encoders import EncoderPipeline, fold_ids
+from features import COMPS_FEATURE, TRAINING_FEATURES, feature_matrix, source_columns
+from intervals import ConformalTable
+from registry import ModelRegistry
+
+PARAMS = {
     "objective": "regression",
     "metric": "rmse",
     "verbosity": -1
 }
-model = lgb.train(params, train_data, num_boost_round=100)
 
-# Save model
-joblib.dump(model, "model.joblib")
-print("Dummy model trained and saved to model.joblib")
+
+@dataclass
+class TrainingResult:
+    """A trained model and the artifacts saved next to it."""
+    model: Any
+    conformal: ConformalTable
+    encoder: EncoderPipeline
+    drift_reference: DriftReference
+    comps: Optional[CompsIndex] = None
+
+
+MOCK_BUILDING_TYPES = np.array(["mansion", "kodate", "land"])
+MOCK_PREFECTURES = np.array(["tokyo", "kanagawa", "saitama", "chiba", "osaka"])
+MOCK_EARTHQUAKE_STANDARDS = np.array(["old", "new", "grade1", "grade2", "grade3"])
+
+
+def mock_columns(n: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """Mock listings with a simple formula for the "real" price."""
+    building = rng.integers(0, len(MOCK_BUILDING_TYPES), n)
+    prefecture = rng.integers(0, len(MOCK_PREFECTURES), n)
+    earthquake = rng.integers(0, len(MOCK_EARTHQUAKE_STANDARDS), n)
+    columns = {
+        "total_area_sqm": rng.uniform(20, 100, n),
+        "year_built": rng.integers(1980, 2024, n),
+        "minutes_to_station": rng.integers(1, 20, n),
+        "latitude": rng.uniform(35.6, 35.7, n),
+        "longitude": rng.uniform(139.6, 139.8, n),
+        "building_type": MOCK_BUILDING_TYPES[building],
+        "prefecture": MOCK_PREFECTURES[prefecture],
+        "earthquake_standard": MOCK_EARTHQUAKE_STANDARDS[earthquake],
+    }
+    columns["price"] = (
+        columns["total_area_sqm"] * 1000000
+        * (1 - (2024 - columns["year_built"]) * 0.01)
+        * (1 - columns["minutes_to_station"] * 0.02)
+        * np.array([1.0, 1.2, 0.6])[building]
+        * np.array([1.3, 1.0, 0.9, 0.9, 1.1])[prefecture]
+        * (1 + 0.03 * earthquake)
+        # Neighbourhood effect that distance to the CBD alone does not capture
+        * (1 + 0.15 * np.sin(columns["latitude"] * 150) * np.cos(columns["longitude"] * 120))
+    )
+    return columns
+
+
+class ParquetFeatureReader:
+    """Decodes parquet row groups into feature matrices, caching only the latest one."""
+
+    def __init__(
+        self,
+        path: str,
+        features: List[str] = TRAINING_FEATURES,
+        label: str = "price",
+        encoder: Optional[EncoderPipeline] = None,
+    ):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.file = pq.ParquetFile(path)
+        self.label = label
+        self.encoder = encoder
+        self.features = list(features) + (encoder.output_names if encoder is not None else [])
+        self.group_rows = [self.file.metadata.row_group(i).num_rows for i in range(self.file.num_row_groups)]
+        self.group_starts = np.concatenate([[0], np.cumsum(self.group_rows)]).astype(np.int64)
+        self._cached_group = None
+        self._cached = None
+
+    @property
+    def num_rows(self) -> int:
+        return int(self.group_starts[-1])
+
+    def group_columns(self, group: int, columns: List[str]) -> Dict[str, np.ndarray]:
+        table = self.file.read_row_group(group, columns=columns)
+        return {name: table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names}
+
+    def group_matrix(self, group: int, out_of_fold: bool = False) -> np.ndarray:
+        """
+        Feature matrix of one row group. ``out_of_fold`` target-encodes each
+        row without its own fold (training rows).
+        """
+        key = (group, out_of_fold)
+        if key != self._cached_group:
+            columns = self.group_columns(group, source_columns(self.features, self.encoder))
+            folds = None
+            if out_of_fold:
+                start = self.group_starts[group]
+                folds = fold_ids(np.arange(start, start + self.group_rows[group]))
+            self._cached = None  # release the previous group before decoding the next
+            self._cached = feature_matrix(columns, self.features, self.encoder, folds)
+            self._cached_group = key
+        return self._cached
+
+    def sequences(self, start: int, stop: int, out_of_fold: bool = False) -> List["RowRangeSequence"]:
+        """Sequences covering rows [start, stop), one per row group touched."""
+        out = []
+        for group, (first, rows) in enumerate(zip(self.group_starts[:-1], self.group_rows)):
+            lo, hi = max(start, first), min(stop, first + rows)
+            if lo < hi:
+                out.append(RowRangeSequence(self, group, int(lo - first), int(hi - first), out_of_fold))
+        return out
+
+    def rows(self, start: int, stop: int) -> np.ndarray:
+        return np.concatenate([seq[0:len(seq)] for seq in self.sequences(start, stop)])
+
+    def fit_encoder(self, stop: int, labels: np.ndarray) -> EncoderPipeline:
+        """Fit encoders for the categorical columns in the file on rows [0, stop)."""
+        encoder = EncoderPipeline.from_spec(self.file.schema_arrow.names)
+        if encoder.encoders:
+            for seq in self.sequences(0, stop):
+                start = int(self.group_starts[seq.group])
+                columns = self.group_columns(seq.group, encoder.input_columns)
+                rows = slice(seq.start, seq.stop)
+                encoder.partial_fit(
+                    {name: values[rows] for name, values in columns.items()},
+                    labels[start + seq.start:start + seq.stop],
+                    fold_ids(np.arange(start + seq.start, start + seq.stop)),
+                )
+        encoder.finish()
+        self.encoder = encoder
+        self.features = self.features + encoder.output_names
+        self._cached_group = self._cached = None
+        return encoder
+
+    def labels(self) -> np.ndarray:
+        return np.concatenate([
+            self.file.read_row_group(group, columns=[self.label]).column(0).to_numpy()
+            for group in range(self.file.num_row_groups)
+        ]).astype(np.float64)
+
+
+class RowRangeSequence(lgb.Sequence):
+    """Rows [start, stop) of one row group, decoded on first access."""
+
+    def __init__(self, reader: ParquetFeatureReader, group: int, start: int, stop: int, out_of_fold: bool = False):
+        self.reader = reader
+        self.group = group
+        self.start = start
+        self.stop = stop
+        self.out_of_fold = out_of_fold
+        # Push each row group to LightGBM in one call
+        self.batch_size = stop - start
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __getitem__(self, idx):
+        rows = self.reader.group_matrix(self.group, self.out_of_fold)[self.start:self.stop]
+        if isinstance(idx, list):
+            return rows[np.asarray(idx)]
+        return rows[idx]
+
+
+def build_parquet_dataset(reader: ParquetFeatureReader, stop: int, label: np.ndarray, binary_cache: str = None) -> lgb.Dataset:
+    """Binned dataset over rows [0, stop), reusing a binary cache when it is current."""
+    if binary_cache and os.path.exists(binary_cache) and os.path.getmtime(binary_cache) >= os.path.getmtime(reader.path):
+        cached = lgb.Dataset(binary_cache, params=PARAMS).construct()
+        if cached.num_data() == stop:
+            print(f"Loaded binned dataset from {binary_cache}")
+            return cached
+    dataset = lgb.Dataset(
+        reader.sequences(0, stop, out_of_fold=True), label=label, feature_name=reader.features, params=PARAMS
+    ).construct()
+    if binary_cache:
+        if os.path.exists(binary_cache):
+            os.remove(binary_cache)
+        dataset.save_binary(binary_cache)
+    return dataset
+
+
+def train_from_parquet(path: str, rounds: int, binary_cache: str = None, calibration_rows: int = 200_000):
+    reader = ParquetFeatureReader(path)
+    n = reader.num_rows
+    holdout = min(calibration_rows, n // 5)
+    stop = n - holdout
+    labels = reader.labels()
+    encoder = reader.fit_encoder(stop, labels)
+
+    dataset = build_parquet_dataset(reader, stop, labels[:stop], binary_cache)
+    model = lgb.train(PARAMS, dataset, num_boost_round=rounds)
+    calibration = reader.rows(stop, n)
+    conformal = ConformalTable.fit(model.predict(calibration), labels[stop:], alpha=0.1)
+    return TrainingResult(model, conformal, encoder, DriftReference.fit(calibration, reader.features))
+
+
+def train_from_mock(n: int = 1000, rounds: int = 100):
+    columns = mock_columns(n, np.random.default_rng())
+    y = columns["price"]
+
+    # The listings double as past transactions; each row's area average leaves out its own sale
+    comps = CompsIndex(columns["latitude"], columns["longitude"], columns["year_built"], y / columns["total_area_sqm"])
+    columns[COMPS_FEATURE] = comps.area_average(columns["latitude"], columns["longitude"], exclude=np.arange(n))
+
+    # Hold out a calibration set for the conformal prediction intervals
+    holdout = np.random.default_rng(0).permutation(n)[: n // 5]
+    train_mask = np.ones(n, dtype=bool)
+    train_mask[holdout] = False
+    train_rows = np.flatnonzero(train_mask)
+    train_columns = {name: values[train_rows] for name, values in columns.items()}
+    holdout_columns = {name: values[holdout] for name, values in columns.items()}
+
+    # Encoders see only training rows, which are encoded out-of-fold
+    encoder = EncoderPipeline.from_spec(list(columns)).fit(train_columns, y[train_rows], fold_ids(train_rows))
+    features = TRAINING_FEATURES + [COMPS_FEATURE] + encoder.output_names
+    X_train = feature_matrix(train_columns, features, encoder, fold_ids(train_rows))
+    X_holdout = feature_matrix(holdout_columns, features, encoder)
+
+    # Train LightGBM
+    train_data = lgb.Dataset(X_train, label=y[train_rows], feature_name=features)
+    model = lgb.train(PARAMS, train_data, num_boost_round=rounds)
+    # 90% intervals from residuals on the calibration set
+    conformal = ConformalTable.fit(model.predict(X_holdout), y[holdout], alpha=0.1)
+    return TrainingResult(model, conformal, encoder, DriftReference.fit(X_holdout, features), comps)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parquet", help="Training data; streamed by row group")
+    parser.add_argument("--binary-cache", help="LightGBM binary dataset cache path")
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--calibration-rows", type=int, default=200_000)
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.parquet:
+        result = train_from_parquet(args.parquet, args.rounds, args.binary_cache, args.calibration_rows)
+    else:
+        result = train_from_mock(rounds=args.rounds)
+
+    # Save model
+    model_path = os.path.join(args.output_dir, "model.joblib")
+    conformal_path = os.path.join(args.output_dir, "conformal.json")
+    encoder_path = os.path.join(args.output_dir, "encoders.json")
+    drift_path = os.path.join(args.output_dir, "drift_reference.json")
+    joblib.dump(result.model, model_path)
+    print(f"Model trained and saved to {model_path}")
+    result.conformal.save(conformal_path)
+    print(f"Conformal interval table saved to {conformal_path}")
+    result.encoder.save(encoder_path)
+    print(f"Categorical encoders saved to {encoder_path}")
+    result.drift_reference.save(drift_path)
+    print(f"Drift reference saved to {drift_path}")
+    comps_path = None
+    if result.comps is not None:
+        comps_path = os.path.join(args.output_dir, "comps.npz")
+        result.comps.save(comps_path)
+        print(f"Comparable-sales index ({len(result.comps)} transactions) saved to {comps_path}")
+    print(f"Training took {time.perf_counter() - start:.1f}s, peak RSS {peak_rss_mb():.0f} MB")
+
+    # Publish to the versioned registry; running services pick it up without a restart
+    registry_dir = os.getenv("PRICING_MODEL_REGISTRY")
+    if registry_dir:
+        version = os.getenv("MODEL_VERSION", time.strftime("%Y%m%d-%H%M%S"))
+        ModelRegistry(registry_dir).publish(
+            version, model_path, conformal_path, encoder_path=encoder_path, drift_path=drift_path, comps_path=comps_path
+        )
+        print(f"Published model version {version} to {registry_dir}")
+
+
+if __name__ == "__main__":
+    main()